@@ -1,12 +1,52 @@
 from pydantic import BaseSettings, Field, validator
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     API_KEY: str = Field(..., env="API_KEY")
     DATABASE_URL: str = Field(default="sqlite+aiosqlite:///./app.db", env="DATABASE_URL")
     ALLOWED_ORIGINS: List[str] = Field(default=["http://localhost", "http://localhost:5173"], env="ALLOWED_ORIGINS")
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
+    STABLE_AUDIO_BASE_URL: str = Field(default="https://api.stableaudio.com/v1", env="STABLE_AUDIO_BASE_URL")
+    STABLE_AUDIO_POLL_INTERVAL: float = Field(default=2.0, env="STABLE_AUDIO_POLL_INTERVAL")
     AUDIO_STORAGE_PATH: str = Field(default="app/static/audio", env="AUDIO_STORAGE_PATH")
+    TRANSCODE_CACHE_PATH: str = Field(default="app/static/transcodes", env="TRANSCODE_CACHE_PATH")
+    TRANSCODE_CACHE_MAX_BYTES: int = Field(default=2 * 1024**3, env="TRANSCODE_CACHE_MAX_BYTES")
+    # Local read-through cache in front of audio storage; unset disables it
+    STORAGE_CACHE_PATH: Optional[str] = Field(default=None, env="STORAGE_CACHE_PATH")
+    STORAGE_CACHE_MAX_BYTES: int = Field(default=5 * 1024**3, env="STORAGE_CACHE_MAX_BYTES")
+    TRANSCODE_WORKERS: int = Field(default=2, env="TRANSCODE_WORKERS")
+    JOB_JOURNAL_PATH: str = Field(default="app/data/jobs", env="JOB_JOURNAL_PATH")
+    UPLOAD_STORAGE_PATH: str = Field(default="app/data/uploads", env="UPLOAD_STORAGE_PATH")
+    UPLOAD_MAX_BYTES: int = Field(default=100 * 1024**2, env="UPLOAD_MAX_BYTES")
+    UPLOAD_EXPIRY_SECONDS: float = Field(default=24 * 3600, env="UPLOAD_EXPIRY_SECONDS")
+    REFERENCE_CACHE_PATH: str = Field(default="app/data/references", env="REFERENCE_CACHE_PATH")
+    REFERENCE_SAMPLE_RATE: int = Field(default=44100, env="REFERENCE_SAMPLE_RATE")
+    REFERENCE_CHANNELS: int = Field(default=2, env="REFERENCE_CHANNELS")
+    REFERENCE_MAX_SECONDS: float = Field(default=30.0, env="REFERENCE_MAX_SECONDS")
+    REFERENCE_ASSET_TTL_SECONDS: float = Field(default=7 * 86400, env="REFERENCE_ASSET_TTL_SECONDS")
+    LIBRARY_STATS_PATH: str = Field(default="app/data/library_stats.json", env="LIBRARY_STATS_PATH")
+    HLS_STORAGE_PATH: str = Field(default="app/static/hls", env="HLS_STORAGE_PATH")
+    HLS_SEGMENT_SECONDS: int = Field(default=6, env="HLS_SEGMENT_SECONDS")
+    FFMPEG_BINARY: str = Field(default="ffmpeg", env="FFMPEG_BINARY")
+    EVENT_BUS_URL: Optional[str] = Field(default=None, env="EVENT_BUS_URL")
+    GENERATION_WORKERS: int = Field(default=2, env="GENERATION_WORKERS")
+    ADMISSION_MAX_QUEUE: int = Field(default=50, env="ADMISSION_MAX_QUEUE")
+    ADMISSION_MAX_WAIT_SECONDS: float = Field(default=300.0, env="ADMISSION_MAX_WAIT_SECONDS")
+    USER_MAX_CONCURRENT_GENERATIONS: int = Field(default=4, env="USER_MAX_CONCURRENT_GENERATIONS")
+    USER_GENERATIONS_PER_MINUTE: float = Field(default=30.0, env="USER_GENERATIONS_PER_MINUTE")
+    USER_GENERATION_BURST: float = Field(default=10.0, env="USER_GENERATION_BURST")
+    HEAVY_AUDIO_MAX_INFLIGHT: int = Field(default=16, env="HEAVY_AUDIO_MAX_INFLIGHT")
+    STORAGE_CHECK_TTL: float = Field(default=5.0, env="STORAGE_CHECK_TTL")
+    BATCH_MAX_PARALLEL: int = Field(default=2, env="BATCH_MAX_PARALLEL")
+    PROGRESS_MAX_RATE: float = Field(default=10.0, env="PROGRESS_MAX_RATE")
+    WS_SEND_QUEUE_SIZE: int = Field(default=256, env="WS_SEND_QUEUE_SIZE")
+    WS_SLOW_CONSUMER_POLICY: str = Field(default="coalesce", env="WS_SLOW_CONSUMER_POLICY")
+    WS_HEARTBEAT_INTERVAL: float = Field(default=20.0, env="WS_HEARTBEAT_INTERVAL")
+    # 0 disables slow-request profiling / loop stall detection
+    SLOW_REQUEST_THRESHOLD_MS: float = Field(default=0, env="SLOW_REQUEST_THRESHOLD_MS")
+    SLOW_REQUEST_SAMPLE_INTERVAL_MS: float = Field(default=10, env="SLOW_REQUEST_SAMPLE_INTERVAL_MS")
+    LOOP_STALL_THRESHOLD_MS: float = Field(default=250, env="LOOP_STALL_THRESHOLD_MS")
+    PROFILE_MAX_SECONDS: float = Field(default=300, env="PROFILE_MAX_SECONDS")
 
     @validator("ALLOWED_ORIGINS", pre=True)
     def split_origins(cls, v):
@@ -1,10 +1,14 @@
+from functools import lru_cache
 from fastapi import Depends, Request
-from app.config.database import get_db
 from app.services.audio_generation import AudioGenerationService
 
 def get_db_session():
+    # SQLAlchemy and the engine are only loaded by routes that use the database
+    from app.config.database import get_db
     return Depends(get_db)
 
+# Shared so the concurrency limit and queue position apply across requests
+@lru_cache()
 def get_audio_generation_service():
     return AudioGenerationService()
 
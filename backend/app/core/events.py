@@ -1,22 +1,234 @@
-from typing import Callable, Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional, Awaitable
 import asyncio
+import logging
+import orjson
+from app.config.settings import settings
 
-class EventEmitter:
+logger = logging.getLogger(__name__)
+
+Listener = Callable[..., Awaitable[Any]]
+
+class EventBus:
     def __init__(self):
-        self._listeners: Dict[str, List[Callable[..., Any]]] = {}
-        self._lock = asyncio.Lock()
+        self._listeners: Dict[str, List[Listener]] = {}
+
+    def on(self, event: str, listener: Listener):
+        # Registration is synchronous so it can happen at import time
+        self._listeners.setdefault(event, []).append(listener)
+        return listener
 
-    async def on(self, event: str, listener: Callable[..., Any]):
-        async with self._lock:
-            if event not in self._listeners:
-                self._listeners[event] = []
-            self._listeners[event].append(listener)
+    def off(self, event: str, listener: Listener):
+        listeners = self._listeners.get(event, [])
+        if listener in listeners:
+            listeners.remove(listener)
 
     async def emit(self, event: str, *args, **kwargs):
-        async with self._lock:
-            listeners = self._listeners.get(event, []).copy()
-        for listener in listeners:
-            await listener(*args, **kwargs)
+        raise NotImplementedError
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def _dispatch(self, event: str, args: List[Any], kwargs: Dict[str, Any]):
+        listeners = list(self._listeners.get(event, ()))
+        if not listeners:
+            return
+        # Listeners run concurrently; one failing listener doesn't affect the others
+        results = await asyncio.gather(*(listener(*args, **kwargs) for listener in listeners), return_exceptions=True)
+        for listener, result in zip(listeners, results):
+            if isinstance(result, Exception):
+                logger.error(f"Event listener {getattr(listener, '__name__', listener)} failed for {event}: {result}")
+
+class EventEmitter(EventBus):
+    # In-process bus: events only reach listeners in this worker
+    async def emit(self, event: str, *args, **kwargs):
+        await self._dispatch(event, list(args), kwargs)
+
+# --- Cross-process transport ---
+class Subscription:
+    def __aiter__(self):
+        return self
+    async def __anext__(self) -> bytes:
+        raise NotImplementedError
+    async def close(self) -> None:
+        pass
+
+class Broker:
+    async def publish(self, channel: str, data: bytes) -> None:
+        raise NotImplementedError
+    async def subscribe(self, channel: str) -> Subscription:
+        # Must only return once the subscription is live
+        raise NotImplementedError
+    async def close(self) -> None:
+        pass
+
+class _LocalSubscription(Subscription):
+    def __init__(self, broker: "LocalBroker", channel: str):
+        self._broker = broker
+        self._channel = channel
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def __anext__(self) -> bytes:
+        return await self.queue.get()
+
+    async def close(self) -> None:
+        subscribers = self._broker._subscribers.get(self._channel, [])
+        if self in subscribers:
+            subscribers.remove(self)
+
+class LocalBroker(Broker):
+    # In-memory stand-in for Redis pub/sub; share one instance between buses to simulate workers
+    def __init__(self):
+        self._subscribers: Dict[str, List[_LocalSubscription]] = {}
+
+    async def publish(self, channel: str, data: bytes) -> None:
+        for sub in self._subscribers.get(channel, ()):
+            sub.queue.put_nowait(data)
+
+    async def subscribe(self, channel: str) -> Subscription:
+        sub = _LocalSubscription(self, channel)
+        self._subscribers.setdefault(channel, []).append(sub)
+        return sub
+
+class _RedisSubscription(Subscription):
+    def __init__(self, pubsub, channel: str):
+        self._pubsub = pubsub
+        self._channel = channel
+        self._messages = pubsub.listen()
+
+    async def __anext__(self) -> bytes:
+        async for message in self._messages:
+            if message.get("type") == "message":
+                return message["data"]
+        raise StopAsyncIteration
+
+    async def close(self) -> None:
+        await self._pubsub.unsubscribe(self._channel)
+        await self._pubsub.close()
+
+class RedisBroker(Broker):
+    def __init__(self, url: str):
+        # Optional dependency, only needed when EVENT_BUS_URL points at Redis
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url)
+
+    async def publish(self, channel: str, data: bytes) -> None:
+        await self._redis.publish(channel, data)
+
+    async def subscribe(self, channel: str) -> Subscription:
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(channel)
+        return _RedisSubscription(pubsub, channel)
+
+    async def close(self) -> None:
+        await self._redis.close()
+
+class BrokerEventBus(EventBus):
+    # Events are published to a shared broker and delivered to listeners in every worker.
+    # Outgoing events are buffered and sent in batches to cut per-event broker round trips.
+    def __init__(self, broker: Broker, channel: str = "tumburu:events", max_batch: int = 100, flush_interval: float = 0.01, retry_initial: float = 0.5, retry_max: float = 30.0):
+        super().__init__()
+        self.broker = broker
+        self.channel = channel
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        # Backoff between attempts to resubscribe after the broker connection drops
+        self.retry_initial = retry_initial
+        self.retry_max = retry_max
+        self._buffer: List[List[Any]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._pending_flushes: set = set()
+        self._subscriber: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._subscriber is None:
+            subscription = await self.broker.subscribe(self.channel)
+            self._subscriber = asyncio.create_task(self._consume(subscription))
+
+    async def stop(self):
+        await self.flush()
+        if self._pending_flushes:
+            await asyncio.gather(*self._pending_flushes, return_exceptions=True)
+        if self._subscriber is not None:
+            self._subscriber.cancel()
+            try:
+                await self._subscriber
+            except asyncio.CancelledError:
+                pass
+            self._subscriber = None
+        await self.broker.close()
+
+    async def emit(self, event: str, *args, **kwargs):
+        self._buffer.append([event, list(args), kwargs])
+        if len(self._buffer) >= self.max_batch:
+            await self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self._schedule_flush)
+
+    async def flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            await self.broker.publish(self.channel, orjson.dumps(batch, default=str))
+        except Exception as e:
+            logger.error(f"Failed to publish {len(batch)} events: {e}")
+
+    def _schedule_flush(self):
+        self._flush_handle = None
+        task = asyncio.create_task(self.flush())
+        self._pending_flushes.add(task)
+        task.add_done_callback(self._pending_flushes.discard)
+
+    async def _consume(self, subscription: Optional[Subscription]):
+        # Runs until stop() cancels it. A lost subscription (e.g. a broker restart)
+        # is logged and re-established with backoff instead of silently ending
+        # cross-worker delivery; events published meanwhile are missed.
+        delay = self.retry_initial
+        while True:
+            if subscription is None:
+                try:
+                    subscription = await self.broker.subscribe(self.channel)
+                except Exception as e:
+                    logger.error(f"Resubscribing to {self.channel} failed, retrying in {delay:.1f}s: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.retry_max)
+                    continue
+                logger.info(f"Resubscribed to {self.channel}")
+            try:
+                async for data in subscription:
+                    delay = self.retry_initial
+                    try:
+                        batch = orjson.loads(data)
+                    except orjson.JSONDecodeError as e:
+                        logger.error(f"Dropping malformed event batch: {e}")
+                        continue
+                    await asyncio.gather(*(self._dispatch(event, args, kwargs) for event, args, kwargs in batch))
+                logger.error(f"Event subscription to {self.channel} ended, resubscribing in {delay:.1f}s")
+            except Exception as e:
+                logger.error(f"Event subscription to {self.channel} failed, resubscribing in {delay:.1f}s: {e}")
+            finally:
+                try:
+                    await subscription.close()
+                except Exception as e:
+                    logger.warning(f"Closing event subscription failed: {e}")
+                subscription = None
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.retry_max)
+
+def create_event_bus(url: Optional[str] = None) -> EventBus:
+    if not url:
+        return EventEmitter()
+    if url == "local://":
+        return BrokerEventBus(LocalBroker())
+    if url.startswith(("redis://", "rediss://")):
+        return BrokerEventBus(RedisBroker(url))
+    raise ValueError(f"Unsupported event bus URL: {url}")
 
-# Singleton event emitter for generation events
-emitter = EventEmitter()
+# Singleton event bus for generation events
+emitter: EventBus = create_event_bus(settings.EVENT_BUS_URL)
@@ -0,0 +1,98 @@
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# Process-wide metrics. Hot paths only touch pre-bound histogram/counter children;
+# anything that can be read off live objects (queues, caches, disk) is collected at
+# scrape time instead, so it costs nothing between scrapes.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SLOW_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+FAST_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+THROUGHPUT_BUCKETS = (64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests currently being served")
+
+UPSTREAM_REQUEST_SECONDS = Histogram(
+    "upstream_request_duration_seconds", "Stable Audio API call latency by endpoint",
+    ["method", "endpoint", "status"], buckets=LATENCY_BUCKETS,
+)
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Stable Audio API retries", ["endpoint", "reason"])
+
+GENERATION_QUEUE_DEPTH = Gauge("generation_queue_depth", "Generations waiting for a concurrency slot")
+GENERATION_ACTIVE = Gauge("generation_active", "Generations holding a concurrency slot")
+GENERATION_QUEUE_WAIT_SECONDS = Histogram("generation_queue_wait_seconds", "Time spent waiting for a concurrency slot", buckets=SLOW_BUCKETS)
+GENERATION_SECONDS = Histogram("generation_duration_seconds", "End-to-end generation time", ["outcome"], buckets=SLOW_BUCKETS)
+
+DOWNLOAD_BYTES = Counter("upstream_download_bytes_total", "Audio bytes downloaded from the upstream")
+DOWNLOAD_THROUGHPUT = Histogram("upstream_download_throughput_bytes_per_second", "Per-download throughput", buckets=THROUGHPUT_BUCKETS)
+
+AUDIO_PROCESSING_SECONDS = Histogram(
+    "audio_processing_duration_seconds", "Audio validation and decode time by operation",
+    ["operation"], buckets=FAST_BUCKETS,
+)
+
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Requests shed by admission control", ["reason"])
+
+class _ScrapeCollector:
+    # Gauges whose values are read from callbacks at scrape time
+    def __init__(self):
+        self._sources: List[Tuple[str, str, Tuple[str, ...], Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]]] = []
+
+    def add(self, name: str, documentation: str, labels: Tuple[str, ...], func: Callable[[], Iterable[Tuple[Tuple[str, ...], float]]]):
+        self._sources.append((name, documentation, labels, func))
+
+    def collect(self):
+        for name, documentation, labels, func in self._sources:
+            family = GaugeMetricFamily(name, documentation, labels=list(labels))
+            try:
+                for values, value in func():
+                    family.add_metric(list(values), value)
+            except Exception:
+                # A broken source must never fail the whole scrape
+                continue
+            yield family
+
+_scrape = _ScrapeCollector()
+REGISTRY.register(_scrape)
+
+def scrape_gauge(name: str, documentation: str, func: Callable[[], float]) -> None:
+    _scrape.add(name, documentation, (), lambda: [((), func())])
+
+def scrape_gauges(name: str, documentation: str, labels: Tuple[str, ...], func: Callable[[], Dict[Tuple[str, ...], float]]) -> None:
+    _scrape.add(name, documentation, labels, lambda: func().items())
+
+def render() -> Tuple[bytes, str]:
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+class MetricsMiddleware:
+    # Plain ASGI middleware: no per-request task or body buffering, and streaming
+    # responses are timed until their last chunk is sent.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_PROGRESS.dec()
+            # FastAPI stores the matched route in the scope; use its template to keep label cardinality bounded
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(scope["method"], getattr(route, "path", "unmatched"), str(status)).observe(time.perf_counter() - start)
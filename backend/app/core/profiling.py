@@ -0,0 +1,253 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import uuid
+from collections import Counter, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import logging
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Stack-sampling profiler in the py-spy style: a daemon thread reads
+# sys._current_frames() on a fixed interval, so the profiled code runs unmodified
+# and the overhead is bounded by the sample rate. Output is the "collapsed stacks"
+# format (frame;frame;frame count) read by flamegraph.pl, speedscope and inferno.
+
+_labels: Dict[Any, str] = {}
+_CWD = os.getcwd() + os.sep
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(_CWD):
+            filename = filename[len(_CWD):]
+        else:
+            filename = os.sep.join(filename.split(os.sep)[-2:])
+        label = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        _labels[code] = label
+    return label
+
+def collapse_frame(frame, max_depth: int = 128) -> str:
+    parts = []
+    while frame is not None and len(parts) < max_depth:
+        parts.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    parts.reverse()
+    return ";".join(parts)
+
+def render_collapsed(counts: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+class StackSampler:
+    # Aggregating sampler for on-demand profiles; thread_id=None samples every thread
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.started_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            for tid, frame in sys._current_frames().items():
+                if tid == own or (self.thread_id is not None and tid != self.thread_id):
+                    continue
+                stack = collapse_frame(frame)
+                if self.thread_id is None:
+                    if tid not in names:
+                        names = {t.ident: t.name for t in threading.enumerate()}
+                    stack = f"thread:{names.get(tid, tid)};{stack}"
+                self._record(now, stack)
+            self.samples += 1
+
+    def _record(self, now: float, stack: str) -> None:
+        self.counts[stack] += 1
+
+class RingSampler(StackSampler):
+    # Continuous low-rate sampling of one thread into a bounded ring buffer, so a
+    # profile for any recent time window can be cut out after the fact.
+    def __init__(self, interval: float = 0.01, thread_id: Optional[int] = None, window: float = 60.0):
+        super().__init__(interval, thread_id)
+        self.ring: Deque[Tuple[float, str]] = deque(maxlen=max(int(window / interval), 1))
+
+    def _record(self, now: float, stack: str) -> None:
+        self.ring.append((now, stack))
+
+    def between(self, start: float, end: float) -> Counter:
+        return Counter(stack for ts, stack in list(self.ring) if start <= ts <= end)
+
+class SlowRequestRecorder:
+    # Requests slower than the threshold keep the loop-thread samples taken while
+    # they ran. Samples show everything the loop did in that window, which includes
+    # concurrent requests; with a single slow request that is usually the culprit.
+    def __init__(self, threshold: float, interval: float = 0.01, keep: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.records: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self.sampler: Optional[RingSampler] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0 and self.sampler is not None
+
+    def start(self) -> None:
+        if self.threshold <= 0:
+            return
+        # Called from the event loop thread, which is the one we sample
+        self.sampler = RingSampler(self.interval, threading.get_ident(), window=max(self.threshold * 20, 60.0))
+        self.sampler.start()
+
+    def stop(self) -> None:
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+
+    def observe(self, method: str, path: str, start: float, end: float, status: int) -> None:
+        if not self.enabled or end - start < self.threshold:
+            return
+        counts = self.sampler.between(start, end)
+        record = {
+            "id": uuid.uuid4().hex[:12],
+            "method": method,
+            "path": path,
+            "status": status,
+            "duration_ms": round((end - start) * 1000, 1),
+            "at": time.time(),
+            "samples": sum(counts.values()),
+            "profile": render_collapsed(counts),
+        }
+        self.records.append(record)
+        logger.warning(f"Slow request {method} {path}: {record['duration_ms']}ms ({record['samples']} samples, profile {record['id']})")
+
+    def get(self, record_id: str) -> Optional[Dict[str, Any]]:
+        for record in self.records:
+            if record["id"] == record_id:
+                return record
+        return None
+
+class LoopWatchdog:
+    # A heartbeat coroutine stamps the time on every tick; a watcher thread notices
+    # when the stamp goes stale (the loop is stuck in one callback) and captures
+    # the loop thread's stack and the running task while it is still blocked.
+    def __init__(self, threshold: float, keep: int = 50):
+        self.threshold = threshold
+        self.tick = threshold / 2
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self._beat = 0.0
+        self._reported_beat = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        if self.threshold <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="LoopWatchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.tick
+            await asyncio.sleep(self.tick)
+            now = time.perf_counter()
+            lag = now - expected
+            if self._reported_beat == self._beat and self.stalls:
+                # The stall we reported has ended; record how long it really lasted
+                self.stalls[-1]["blocked_ms"] = round(lag * 1000, 1)
+                logger.warning(f"Event loop unblocked after {self.stalls[-1]['blocked_ms']}ms (was in {self.stalls[-1]['task']})")
+            self._beat = now
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.tick / 2):
+            beat = self._beat
+            stale = time.perf_counter() - beat - self.tick
+            if stale < self.threshold or self._reported_beat == beat:
+                continue
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            task = None
+            try:
+                current = asyncio.current_task(self._loop)
+                if current is not None:
+                    coro = current.get_coro()
+                    task = f"{current.get_name()} {getattr(coro, '__qualname__', coro)}"
+            except RuntimeError:
+                pass
+            self.stalls.append({
+                "at": time.time(),
+                "blocked_ms": round(stale * 1000, 1),
+                "task": task or "callback",
+                "stack": collapse_frame(frame) if frame is not None else "",
+            })
+            logger.warning(f"Event loop blocked for over {stale * 1000:.0f}ms in {task or 'a non-task callback'}:\n{stack}")
+
+class SlowRequestMiddleware:
+    def __init__(self, app, recorder: SlowRequestRecorder):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.recorder.enabled:
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.recorder.observe(scope["method"], scope["path"], start, time.perf_counter(), status)
+
+slow_requests = SlowRequestRecorder(
+    threshold=settings.SLOW_REQUEST_THRESHOLD_MS / 1000,
+    interval=settings.SLOW_REQUEST_SAMPLE_INTERVAL_MS / 1000,
+)
+loop_watchdog = LoopWatchdog(threshold=settings.LOOP_STALL_THRESHOLD_MS / 1000)
@@ -0,0 +1,42 @@
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Type
+import orjson
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+
+# Hot endpoints return records the app built and validated itself (request
+# bodies are validated on the way in), so re-validating them through
+# response_model and jsonable_encoder on the way out is pure overhead. These
+# helpers emit such records straight through orjson; routes keep response_model
+# for the OpenAPI schema, which FastAPI ignores when a Response is returned.
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NDJSON_BATCH = 500
+
+class Shape:
+    # The field list of a response model, used to project stored records onto
+    # it (dropping internal keys) without constructing model instances
+    def __init__(self, model: Type[BaseModel]):
+        self.fields: Tuple[str, ...] = tuple(model.__fields__)
+
+    def __call__(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        return {f: record.get(f) for f in self.fields}
+
+def fast_json(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+def wants_ndjson(accept: Optional[str], format: Optional[str] = None) -> bool:
+    return format == "ndjson" or (accept is not None and NDJSON_MEDIA_TYPE in accept)
+
+def ndjson(items: Iterable[Any], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    # One JSON document per line, sent in batches: the client can start parsing
+    # before the listing is complete and the server never holds the whole body
+    def lines() -> Iterator[bytes]:
+        batch = []
+        for item in items:
+            batch.append(orjson.dumps(item))
+            if len(batch) >= NDJSON_BATCH:
+                yield b"\n".join(batch) + b"\n"
+                batch = []
+        if batch:
+            yield b"\n".join(batch) + b"\n"
+    return StreamingResponse(lines(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
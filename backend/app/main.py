@@ -1,11 +1,20 @@
-import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from starlette.staticfiles import StaticFiles
-from app.routers import generation
+from app.routers import generation, websocket, audio, admin, upload, metrics as metrics_router
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import SlowRequestMiddleware, slow_requests, loop_watchdog
+from app.core.events import emitter
+from app.services.transcoding import transcoding_service
+from app.services.library_stats import library_stats
+from app.core.dependencies import get_audio_generation_service
 from app.config.settings import settings
+import asyncio
 import logging
+import os
 import uuid
+from pathlib import Path
 
 def setup_logging():
     logging.basicConfig(
@@ -22,7 +31,7 @@ setup_logging()
 for handler in logging.getLogger().handlers:
     handler.addFilter(CorrelationIdFilter())
 
-app = FastAPI(title="Tumburu API", version="1.0.0")
+app = FastAPI(title="Tumburu API", version="1.0.0", default_response_class=ORJSONResponse)
 
 @app.middleware("http")
 async def add_correlation_id(request: Request, call_next):
@@ -41,16 +50,52 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Resumable upload clients read these from cross-origin responses
+    expose_headers=["Location", "Upload-Offset", "Upload-Length", "Tus-Resumable"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(SlowRequestMiddleware, recorder=slow_requests)
 
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     logging.error(f"Unhandled error: {exc}")
     return {"detail": "Internal server error"}
 
-app.mount("/static/audio", StaticFiles(directory=settings.AUDIO_STORAGE_PATH), name="audio")
+# The directory is checked on first request instead of at import; startup creates it
+app.mount("/static/audio", StaticFiles(directory=settings.AUDIO_STORAGE_PATH, check_dir=False), name="audio")
 
+@app.on_event("startup")
+async def on_startup():
+    os.makedirs(settings.AUDIO_STORAGE_PATH, exist_ok=True)
+    audio.startup()
+    # Aggregates load before recovery, which counts recovered jobs as queued again;
+    # without a saved copy they are built from storage in the background
+    if not await library_stats.load():
+        library_stats.start_rebuild(Path(settings.AUDIO_STORAGE_PATH))
+    await emitter.start()
+    # Both sample the event loop thread, so they start from it
+    slow_requests.start()
+    await loop_watchdog.start()
+    # Pick up generations interrupted by the last shutdown or crash
+    await generation.recover_generations(get_audio_generation_service())
+    # Warm the transcode cache index in the background; the first transcode waits for it if needed
+    asyncio.create_task(transcoding_service.load_index())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await websocket.ws_manager.cleanup()
+    await library_stats.flush()
+    await emitter.stop()
+    slow_requests.stop()
+    await loop_watchdog.stop()
+
+app.include_router(websocket.router, prefix="/api", tags=["websocket"])
 app.include_router(generation.router, prefix="/api", tags=["generation"])
+app.include_router(audio.router)
+app.include_router(upload.router)
+app.include_router(admin.router)
+app.include_router(metrics_router.router, tags=["metrics"])
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.core.security import verify_api_key
+from app.core import profiling
+from app.services.library_stats import library_stats
+from app.config.settings import settings
+
+# Operator endpoints; each call acts on the worker process that serves it
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(verify_api_key)])
+
+_profiler: Optional[profiling.StackSampler] = None
+_loop_thread: Optional[int] = None
+
+@router.post("/profile/start")
+async def start_profile(interval_ms: float = Query(5, ge=1, le=1000), all_threads: bool = False):
+    global _profiler
+    if _profiler is not None and _profiler.running:
+        raise HTTPException(409, "Profiler already running")
+    _profiler = profiling.StackSampler(interval_ms / 1000, None if all_threads else threading.get_ident())
+    _profiler.start()
+    # Never leave a forgotten profiler running
+    asyncio.get_running_loop().call_later(settings.PROFILE_MAX_SECONDS, _stop_if_running, _profiler)
+    return {"status": "running", "interval_ms": interval_ms, "all_threads": all_threads}
+
+@router.post("/profile/stop", response_class=PlainTextResponse)
+async def stop_profile():
+    if _profiler is None or _profiler.started_at is None:
+        raise HTTPException(409, "Profiler not started")
+    await asyncio.to_thread(_profiler.stop)
+    return PlainTextResponse(profiling.render_collapsed(_profiler.counts), headers={"X-Profile-Samples": str(_profiler.samples)})
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def sample_profile(seconds: float = Query(10, gt=0, le=300), interval_ms: float = Query(5, ge=1, le=1000), all_threads: bool = False):
+    # One-shot: sample for a fixed time and return collapsed stacks
+    sampler = profiling.StackSampler(interval_ms / 1000, None if all_threads else threading.get_ident())
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        await asyncio.to_thread(sampler.stop)
+    return PlainTextResponse(profiling.render_collapsed(sampler.counts), headers={"X-Profile-Samples": str(sampler.samples)})
+
+@router.get("/slow-requests")
+async def list_slow_requests():
+    recorder = profiling.slow_requests
+    return {
+        "threshold_ms": recorder.threshold * 1000,
+        "enabled": recorder.enabled,
+        "requests": [{k: v for k, v in r.items() if k != "profile"} for r in reversed(recorder.records)],
+    }
+
+@router.get("/slow-requests/{record_id}/profile", response_class=PlainTextResponse)
+async def slow_request_profile(record_id: str):
+    record = profiling.slow_requests.get(record_id)
+    if record is None:
+        raise HTTPException(404, "Slow request not found")
+    return PlainTextResponse(record["profile"])
+
+@router.get("/loop-stalls")
+async def list_loop_stalls():
+    watchdog = profiling.loop_watchdog
+    return {"threshold_ms": watchdog.threshold * 1000, "stalls": list(reversed(watchdog.stalls))}
+
+@router.post("/library-stats/rebuild", status_code=202)
+async def rebuild_library_stats():
+    # Reconciles the aggregates with what is actually in storage; runs in the
+    # background and /api/audio/stats keeps serving (and updating) meanwhile
+    from app.routers.generation import GENERATIONS
+    live = Counter(g["status"] for g in GENERATIONS.values())
+    started = library_stats.start_rebuild(Path(settings.AUDIO_STORAGE_PATH), live)
+    return {"status": "started" if started else "already_running"}
+
+def _stop_if_running(sampler: profiling.StackSampler):
+    if sampler.running:
+        sampler.stop()
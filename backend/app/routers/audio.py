@@ -1,21 +1,73 @@
 
-from fastapi import APIRouter, UploadFile, File, Query, HTTPException, Response, status, Depends
+from fastapi import APIRouter, UploadFile, File, Query, Header, HTTPException, Response, status, Depends
 from fastapi.responses import StreamingResponse, FileResponse
 from typing import List, Optional
 from pathlib import Path
 import os
+import shutil
 import aiofiles
 import mimetypes
 import tempfile
-from ..services.file_storage import FileStorageService, LocalStorageBackend
+from ..services.file_storage import FileStorageService, LocalStorageBackend, StorageBackend
+from ..services.storage_cache import CachedStorageBackend
+from ..services.renditions import rendition_service, RENDITIONS
+from ..services.transcoding import transcoding_service, TranscodeSpec, TranscodeError
+from ..services.hls import hls_service
+from ..services.admission import heavy_audio
+from ..services.library_stats import library_stats
+from ..config.settings import settings
+from ..core import metrics
+from ..core.responses import fast_json, ndjson, wants_ndjson
 from ..utils import file_utils
 import logging
 
 router = APIRouter(prefix="/api/audio", tags=["audio"])
 
 # Dependency: get storage service
-BASE_DIR = Path(os.getenv("AUDIO_STORAGE_DIR", "app/static/audio"))
-storage = FileStorageService(LocalStorageBackend(BASE_DIR))
+BASE_DIR = Path(os.getenv("AUDIO_STORAGE_DIR", settings.AUDIO_STORAGE_PATH))
+# Built by startup(), once settings are final, so the storage cache can be chosen
+# per deployment. The other service singletons (transcoding, HLS, references,
+# uploads) are still built at import and only create their directories there.
+storage: Optional[FileStorageService] = None
+HLS_PLAYLIST_TYPE = "application/vnd.apple.mpegurl"
+
+def _disk_usage() -> dict:
+    usage = {}
+    for volume, path in (("audio", BASE_DIR), ("transcodes", transcoding_service.cache_dir)):
+        total, used, free = shutil.disk_usage(path)
+        usage[(volume, "used")] = used
+        usage[(volume, "free")] = free
+    return usage
+
+def startup():
+    global storage
+    backend: StorageBackend = LocalStorageBackend(BASE_DIR)
+    if settings.STORAGE_CACHE_PATH:
+        backend = CachedStorageBackend(backend, Path(settings.STORAGE_CACHE_PATH), max_bytes=settings.STORAGE_CACHE_MAX_BYTES)
+    storage = FileStorageService(backend, stats=library_stats)
+
+def _check_id(file_id: str) -> Path:
+    # file_id may span directories but must stay inside the library
+    rel = Path(file_id)
+    if rel.is_absolute() or ".." in rel.parts:
+        raise HTTPException(404, "File not found")
+    return rel
+
+def _source(file_id: str) -> Path:
+    file_path = BASE_DIR / _check_id(file_id)
+    if not file_path.is_file():
+        raise HTTPException(404, "File not found")
+    return file_path
+
+def _storage_cache_stats() -> dict:
+    backend = storage.backend if storage is not None else None
+    if not isinstance(backend, CachedStorageBackend):
+        return {}
+    return {(k,): v for k, v in backend.stats().items()}
+
+metrics.scrape_gauges("storage_disk_bytes", "Disk usage of the volumes holding audio", ("volume", "kind"), _disk_usage)
+metrics.scrape_gauges("storage_cache", "Local storage cache counters and size", ("stat",), _storage_cache_stats)
+metrics.scrape_gauges("transcode_cache", "Transcode cache counters and size", ("stat",), lambda: {(k,): v for k, v in transcoding_service.stats().items()})
 
 # --- Core CRUD Endpoints ---
 @router.get("/", response_model=List[dict])
@@ -25,20 +77,27 @@ async def list_audio(
     date: Optional[str] = None,
     q: Optional[str] = None,
     limit: int = 50,
-    offset: int = 0
+    offset: int = 0,
+    format: Optional[str] = None,
+    accept: Optional[str] = Header(None)
 ):
     files = await storage.list_files(user, genre, date)
     # TODO: Add filtering, search, pagination
-    return files[offset:offset+limit]
+    page = files[offset:offset+limit]
+    # Large listings can be streamed as NDJSON (Accept: application/x-ndjson or ?format=ndjson)
+    if wants_ndjson(accept, format):
+        return ndjson(page)
+    return fast_json(page)
 
-@router.get("/{file_id}")
-async def get_audio(file_id: str, range: Optional[str] = None):
-    file_path = BASE_DIR / file_id
-    if not file_path.exists():
-        raise HTTPException(404, "File not found")
+@router.get("/stats")
+async def get_library_stats(user: Optional[str] = None, genre: Optional[str] = None, date: Optional[str] = None):
+    # Served from the incrementally maintained aggregates; a filter narrows its
+    # dimension to one bucket (date is YYYY-MM-DD)
+    return fast_json(library_stats.snapshot(user, genre, date))
+
+def _serve_file(file_path: Path, range: Optional[str], media_type: Optional[str], headers: dict):
     # Range request support
     file_size = file_path.stat().st_size
-    headers = {}
     if range:
         start, end = 0, file_size - 1
         if range.startswith("bytes="):
@@ -56,8 +115,48 @@ async def get_audio(file_id: str, range: Optional[str] = None):
                     yield chunk
                     remaining -= len(chunk)
         headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-        return StreamingResponse(file_stream(), status_code=206, headers=headers, media_type=mimetypes.guess_type(str(file_path))[0])
-    return FileResponse(file_path, media_type=mimetypes.guess_type(str(file_path))[0])
+        return StreamingResponse(file_stream(), status_code=206, headers=headers, media_type=media_type)
+    return FileResponse(file_path, media_type=media_type, headers=headers)
+
+@router.get("/{file_id:path}/transcode")
+async def transcode_audio(file_id: str, format: str, bitrate: Optional[str] = None, normalize: bool = False,
+                          sample_rate: Optional[int] = None, channels: Optional[int] = None):
+    file_path = _source(file_id)
+    try:
+        spec = TranscodeSpec(format, bitrate=bitrate, normalize=normalize, sample_rate=sample_rate, channels=channels)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    headers = {"Content-Disposition": f'attachment; filename="{Path(file_id).stem}.{spec.ext}"'}
+    cached = await transcoding_service.cached(file_path, spec)
+    if cached is not None:
+        return FileResponse(cached, media_type=spec.media_type, headers=headers)
+    return heavy_audio.streaming_response(transcoding_service.stream(file_path, spec), media_type=spec.media_type, headers=headers)
+
+# --- Segmented streaming (HLS) ---
+@router.get("/{file_id:path}/hls/master.m3u8")
+async def get_hls_master(file_id: str):
+    file_path = _source(file_id)
+    playlist = await hls_service.master_playlist(file_path, file_id)
+    return Response(playlist, media_type=HLS_PLAYLIST_TYPE, headers={"Cache-Control": "public, max-age=60"})
+
+@router.get("/hls/{asset_id}/{variant}/{name}")
+async def get_hls_asset(asset_id: str, variant: str, name: str):
+    # Content-addressed: the first request for a variant segments it, everything after is a storage read
+    try:
+        data = await hls_service.stored(asset_id, variant, name)
+        if data is None:
+            # Only segmenting is heavy; stored playlists and segments never take a slot
+            source_id = await hls_service.source_file_id(asset_id)
+            source = BASE_DIR / source_id if source_id else None
+            async with heavy_audio.slot():
+                data = await hls_service.get(asset_id, variant, name, source if source and source.exists() else None)
+    except FileNotFoundError:
+        raise HTTPException(404, "Segment not found")
+    except TranscodeError as e:
+        logging.getLogger(__name__).error(f"HLS segmenting failed for {asset_id}/{variant}: {e}")
+        raise HTTPException(500, "Segmenting failed")
+    media_type = HLS_PLAYLIST_TYPE if name.endswith(".m3u8") else "audio/mp4"
+    return Response(data, media_type=media_type, headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
 @router.post("/upload", status_code=201)
 async def upload_audio(file: UploadFile = File(...), user: str = Query(...), genre: Optional[str] = None):
@@ -71,32 +170,29 @@ async def upload_audio(file: UploadFile = File(...), user: str = Query(...), gen
     # ...
     result = await storage.save_file(file, user, genre)
     tmp.unlink(missing_ok=True)
+    rendition_service.schedule(Path(result["path"]))
     return {"meta": meta, **result}
 
-@router.delete("/{file_id}", status_code=204)
+@router.delete("/{file_id:path}", status_code=204)
 async def delete_audio(file_id: str):
-    await storage.delete_file(file_id)
+    await storage.delete_file(_check_id(file_id).as_posix())
     return Response(status_code=204)
 
-@router.patch("/{file_id}")
+@router.patch("/{file_id:path}")
 async def update_audio_metadata(file_id: str, metadata: dict):
     # TODO: Update metadata/tags in DB or index
     return {"id": file_id, "updated": True}
 
 # --- Advanced Endpoints ---
-@router.get("/{file_id}/metadata")
+@router.get("/{file_id:path}/metadata")
 async def get_audio_metadata(file_id: str):
-    file_path = BASE_DIR / file_id
-    if not file_path.exists():
-        raise HTTPException(404, "File not found")
+    file_path = _source(file_id)
     meta = file_utils.extract_metadata(file_path)
     return meta
 
-@router.get("/{file_id}/thumbnail")
+@router.get("/{file_id:path}/thumbnail")
 async def get_audio_thumbnail(file_id: str):
-    file_path = BASE_DIR / file_id
-    if not file_path.exists():
-        raise HTTPException(404, "File not found")
+    file_path = _source(file_id)
     thumb = file_utils.generate_thumbnail(file_path)
     return FileResponse(thumb, media_type="image/png")
 
@@ -121,3 +217,25 @@ async def search_audio(q: str, user: Optional[str] = None, genre: Optional[str]
 async def find_similar_audio(file_id: str):
     # TODO: Implement audio similarity search
     return {"similar": []}
+
+# Library ids are storage paths (user/genre/YYYY/MM/DD/name), so this catch-all
+# is declared last: every more specific GET route above must win over it
+@router.get("/{file_id:path}")
+async def get_audio(file_id: str, range: Optional[str] = None, rendition: Optional[str] = None, accept: Optional[str] = Header(None)):
+    # Hot tracks are served from the local storage cache when one is configured
+    file_path = await storage.local_path(file_id)
+    if file_path is None:
+        raise HTTPException(404, "File not found")
+    try:
+        chosen = rendition_service.negotiate(rendition, accept)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    headers = {"Vary": "Accept", "X-Rendition": chosen or "original"}
+    if chosen is None:
+        return _serve_file(file_path, range, mimetypes.guess_type(str(file_path))[0], headers)
+    media_type = RENDITIONS[chosen].media_type
+    preview = await rendition_service.available(file_path, chosen)
+    if preview is None:
+        # Not encoded yet: stream it while ffmpeg encodes, which also fills the cache
+        return heavy_audio.streaming_response(rendition_service.stream(file_path, chosen), media_type=media_type, headers=headers)
+    return _serve_file(preview, range, media_type, headers)
@@ -1,104 +1,317 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, WebSocket, WebSocketDisconnect, BackgroundTasks
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.schemas.generation import GenerationRequest, GenerationResponse, AudioFile
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Query, Request
+from fastapi.responses import StreamingResponse
+from app.schemas.generation import GenerationRequest, GenerationResponse, GenerationBatchRequest, GenerationBatchResponse, AudioFile
 from app.services.audio_generation import AudioGenerationService
-from app.core.dependencies import get_db_session, get_audio_generation_service, get_correlation_id
-from app.models.generation import Generation, AudioFile as AudioFileModel
+from app.core.dependencies import get_audio_generation_service, get_correlation_id
+from app.services.progress import ProgressReporter, job_streams, TERMINAL_EVENTS
+from app.services.websocket_manager import serialize_message
+from app.services.renditions import rendition_service
+from app.services.admission import admission, Ticket
+from app.services.library_stats import library_stats
+from app.utils.audio_processing import check_storage_space
+from app.utils.zip_stream import stream_zip
+from app.utils import file_utils
+from app.core.responses import Shape, fast_json
 from app.config.settings import settings
 from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import aiofiles
+import asyncio
+import hashlib
+import logging
 import os
 import uuid
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+SSE_KEEPALIVE_SEC = 15
 
 # In-memory store for demo (replace with DB in production)
 GENERATIONS = {}
 AUDIO_FILES = {}
+BATCHES = {}
+_TASKS = set()
+# Generation records carry exactly the response fields and are returned as-is;
+# audio records also hold internal keys (sha256), so they are projected first
+audio_file_shape = Shape(AudioFile)
 
 @router.post("/generate", response_model=GenerationResponse)
 async def start_generation(
     req: GenerationRequest,
+    request: Request,
+    user_id: Optional[str] = Query(None),
     correlation_id: str = Depends(get_correlation_id),
     service: AudioGenerationService = Depends(get_audio_generation_service)
 ):
+    _check_references([req])
+    ticket = _admit(request, user_id, 1)
+    record = _new_generation_record()
+    GENERATIONS[record["id"]] = record
+    # Runs in the background; progress is pushed over /ws and /generate/{id}/events
+    _spawn(_run_generation(record["id"], user_id, req, service, ticket))
+    return fast_json(record)
+
+@router.post("/generate/batch", response_model=GenerationBatchResponse)
+async def start_generation_batch(
+    batch: GenerationBatchRequest,
+    request: Request,
+    user_id: Optional[str] = Query(None),
+    service: AudioGenerationService = Depends(get_audio_generation_service)
+):
+    # Every request was validated with the body; records are inserted together
+    # so a batch is never visible half-registered.
+    _check_references(batch.requests)
+    ticket = _admit(request, user_id, len(batch.requests), load=settings.BATCH_MAX_PARALLEL)
+    records = [_new_generation_record() for _ in batch.requests]
+    batch_id = uuid.uuid4().int >> 64
+    GENERATIONS.update({r["id"]: r for r in records})
+    BATCHES[batch_id] = {
+        "id": batch_id,
+        "generation_ids": [r["id"] for r in records],
+        "created_at": datetime.utcnow(),
+    }
+    _spawn(_run_batch(batch_id, user_id, list(zip(records, batch.requests)), service, ticket))
+    return fast_json(_batch_summary(BATCHES[batch_id]))
+
+@router.get("/generate/batch/{batch_id}", response_model=GenerationBatchResponse)
+async def get_generation_batch(batch_id: int):
+    batch = BATCHES.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return fast_json(_batch_summary(batch))
+
+@router.get("/generate/batch/{batch_id}/download")
+async def download_generation_batch(batch_id: int):
+    batch = BATCHES.get(batch_id)
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    files = []
+    for gen_id in batch["generation_ids"]:
+        gen = GENERATIONS[gen_id]
+        if gen["status"] == "completed":
+            filename = gen["metadata"]["filename"]
+            files.append((filename, Path(settings.AUDIO_STORAGE_PATH) / filename))
+    if not files:
+        raise HTTPException(status_code=409, detail="No completed generations in batch yet")
+    return StreamingResponse(
+        stream_zip(files),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="batch_{batch_id}.zip"'},
+    )
+
+def _new_generation_record() -> dict:
+    library_stats.generation(None, "queued")
+    return {
+        "id": uuid.uuid4().int >> 64,
+        "status": "queued",
+        "audio_url": None,
+        "metadata": None,
+        "created_at": datetime.utcnow()
+    }
+
+def _set_status(gen_id: int, status: str, **fields):
+    # Every status change goes through here so the library aggregates stay in step
+    record = GENERATIONS[gen_id]
+    library_stats.generation(record["status"], status)
+    record.update(status=status, **fields)
+
+def _check_references(requests: list):
+    missing = {r.reference_audio_id for r in requests if r.reference_audio_id and r.reference_audio_id not in AUDIO_FILES}
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Reference audio not found: {sorted(missing)}")
+
+def _admit(request: Request, user_id: Optional[str], jobs: int, load: Optional[int] = None) -> Ticket:
+    # Shed load before anything is queued; rejections carry Retry-After
+    if not check_storage_space(settings.AUDIO_STORAGE_PATH, ttl=settings.STORAGE_CHECK_TTL):
+        raise HTTPException(status_code=503, detail="Insufficient storage space", headers={"Retry-After": "60"})
+    key = user_id or (request.client.host if request.client else "anonymous")
+    return admission.admit(key, jobs, load)
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _TASKS.add(task)
+    task.add_done_callback(_TASKS.discard)
+    return task
+
+async def _run_batch(batch_id: int, user_id: Optional[str], jobs: list, service: AudioGenerationService, ticket: Ticket):
+    # Feed the shared service a few jobs at a time so a large batch doesn't
+    # jump ahead of every single-request generation queued after it.
+    slots = asyncio.Semaphore(settings.BATCH_MAX_PARALLEL)
+    async def run(record, req):
+        async with slots:
+            await _run_generation(record["id"], user_id, req, service, ticket)
+    await asyncio.gather(*(run(record, req) for record, req in jobs))
+    logger.info(f"Batch {batch_id} finished: {_batch_summary(BATCHES[batch_id])['status']}")
+
+def _batch_summary(batch: dict) -> dict:
+    generations = [GENERATIONS[gen_id] for gen_id in batch["generation_ids"]]
+    counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+    for gen in generations:
+        counts[gen["status"]] = counts.get(gen["status"], 0) + 1
+    total = len(generations)
+    done = counts["completed"] + counts["failed"]
+    if done < total:
+        status = "running" if done or counts["running"] else "queued"
+    else:
+        status = "completed" if not counts["failed"] else ("failed" if not counts["completed"] else "partial")
+    return {
+        "id": batch["id"],
+        "status": status,
+        "total": total,
+        **counts,
+        "progress": done / total if total else 1.0,
+        "generations": generations,
+        "created_at": batch["created_at"],
+    }
+
+async def recover_generations(service: AudioGenerationService):
+    # Jobs journaled by a previous process resume under their original ids, so
+    # clients polling /generate/{id} across a deploy see them finish.
+    service.reclaim_orphans()
+    for job in service.pending_jobs():
+        key = job["key"]
+        # Every worker runs this against the shared journal; each job is resumed by one
+        if not key.isdigit() or not service.claim(key):
+            continue
+        gen_id = int(key)
+        record = _new_generation_record()
+        record.update(id=gen_id, created_at=datetime.utcfromtimestamp(job["created_at"]))
+        GENERATIONS[gen_id] = record
+        _spawn(_run_generation(gen_id, job.get("owner"), None, service))
+        logger.info(f"Recovered generation {gen_id} in phase {job['phase']}")
+
+async def _run_generation(gen_id: int, user_id: Optional[str], req: Optional[GenerationRequest], service: AudioGenerationService, ticket: Optional[Ticket] = None):
     try:
-        meta = await service.generate(
-            prompt=req.prompt,
-            genre=req.genre,
-            instruments=req.instruments,
-            bpm=req.bpm,
-            duration=req.duration,
-            reference_audio_id=req.reference_audio_id
-        )
-        audio_id = uuid.uuid4().int >> 64
-        audio = {"id": audio_id, **meta}
-        AUDIO_FILES[audio_id] = audio
-        gen_id = uuid.uuid4().int >> 64
-        GENERATIONS[gen_id] = {
-            "id": gen_id,
-            "status": "completed",
-            "audio_url": meta["url"],
-            "metadata": meta,
-            "created_at": meta["created_at"]
-        }
-        # TODO: Send progress/status via WebSocket if needed
-        return GenerationResponse(
-            id=gen_id,
-            status="completed",
-            audio_url=meta["url"],
-            metadata=meta,
-            created_at=meta["created_at"]
-        )
+        await _generate(gen_id, user_id, req, service)
+    finally:
+        if ticket is not None:
+            ticket.done()
+
+async def _generate(gen_id: int, user_id: Optional[str], req: Optional[GenerationRequest], service: AudioGenerationService):
+    progress = ProgressReporter(gen_id, user_id, max_rate=settings.PROGRESS_MAX_RATE)
+    await progress.emit("generation_started", position_in_queue=service.waiting + 1)
+    _set_status(gen_id, "running")
+    try:
+        if req is None:
+            # Recovered after a restart: the request lives in the job journal
+            meta = await service.resume(str(gen_id), progress=progress)
+        else:
+            meta = await service.generate(
+                prompt=req.prompt,
+                genre=req.genre,
+                instruments=req.instruments,
+                bpm=req.bpm,
+                duration=req.duration,
+                reference=AUDIO_FILES[req.reference_audio_id] if req.reference_audio_id else None,
+                progress=progress,
+                job_key=str(gen_id),
+                owner=user_id,
+            )
     except Exception as e:
-        # Log error and return graceful error response
-        import logging
-        logging.getLogger(__name__).error(f"Generation failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Audio generation failed: {e}")
+        # Log error and surface it to status queries and subscribers
+        logger.error(f"Generation failed: {e}")
+        _set_status(gen_id, "failed", metadata={"error": f"Audio generation failed: {e}"})
+        await progress.emit("generation_failed", error=str(e), retry_available=True)
+        return
+    audio_id = uuid.uuid4().int >> 64
+    audio = {"id": audio_id, **meta}
+    AUDIO_FILES[audio_id] = audio
+    _set_status(gen_id, "completed", audio_url=meta["url"], metadata=meta)
+    output = Path(settings.AUDIO_STORAGE_PATH) / meta["filename"]
+    await library_stats.add_file(output.parent, output)
+    rendition_service.schedule(output)
+    await progress.emit("generation_completed", audio_url=meta["url"], metadata=meta)
 
 @router.get("/generate/{id}", response_model=GenerationResponse)
 async def get_generation_status(id: int):
     gen = GENERATIONS.get(id)
     if not gen:
         raise HTTPException(status_code=404, detail="Generation not found")
-    return gen
+    return fast_json(gen)
+
+@router.get("/generate/{id}/events")
+async def stream_generation_events(id: int, request: Request):
+    # Server-Sent Events fallback for clients that can't use WebSockets
+    gen = GENERATIONS.get(id)
+    if not gen:
+        raise HTTPException(status_code=404, detail="Generation not found")
+    queue = job_streams.subscribe(id)
+
+    async def event_stream():
+        try:
+            yield _sse("generation_status", gen)
+            if gen["status"] in ("completed", "failed"):
+                return
+            while not await request.is_disconnected():
+                try:
+                    event, payload = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event, payload)
+                if event in TERMINAL_EVENTS:
+                    return
+        finally:
+            job_streams.unsubscribe(id, queue)
 
-@router.get("/audio/{id}", response_model=AudioFile)
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {serialize_message(payload)}\n\n"
+
+# Integer ids only, so file names fall through to the audio library router
+@router.get("/audio/{id:int}", response_model=AudioFile)
 async def get_audio_file(id: int):
     audio = AUDIO_FILES.get(id)
     if not audio:
         raise HTTPException(status_code=404, detail="Audio file not found")
-    return audio
+    return fast_json(audio_file_shape(audio))
 
 @router.post("/upload", response_model=AudioFile)
 async def upload_reference_audio(file: UploadFile = File(...)):
-    # Save file async
-    filename = f"ref_{uuid.uuid4().hex}_{file.filename}"
-    path = os.path.join(settings.AUDIO_STORAGE_PATH, filename)
+    # Single-request upload for small files; large ones should use the resumable /api/uploads API
     os.makedirs(settings.AUDIO_STORAGE_PATH, exist_ok=True)
+    tmp_path = Path(settings.AUDIO_STORAGE_PATH) / f"upload_{uuid.uuid4().hex}.part"
+    hasher = hashlib.sha256()
     size = 0
-    async with await asyncio.to_thread(open, path, 'wb') as out:
-        content = await file.read()
-        await asyncio.to_thread(out.write, content)
-        size = len(content)
+    try:
+        async with aiofiles.open(tmp_path, "wb") as out:
+            while chunk := await file.read(1024 * 1024):
+                size += len(chunk)
+                if size > settings.UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {settings.UPLOAD_MAX_BYTES} bytes")
+                hasher.update(chunk)
+                await out.write(chunk)
+        sha256 = hasher.hexdigest()
+        path = tmp_path.with_name(f"ref_{sha256[:16]}_{safe_filename(file.filename)}")
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+    return await register_reference_audio(path, size, sha256)
+
+def safe_filename(name: Optional[str]) -> str:
+    name = "".join(c for c in Path(name or "").name if c.isalnum() or c in ("-", "_", "."))
+    return name.strip(".") or "audio"
+
+async def register_reference_audio(path: Path, size: int, sha256: str) -> dict:
+    # Validate (header probe, decode fallback off the loop) and make the file usable as reference_audio_id
+    try:
+        info = await asyncio.to_thread(file_utils.validate_audio_file, path)
+    except HTTPException:
+        path.unlink(missing_ok=True)
+        raise
     audio_id = uuid.uuid4().int >> 64
     audio = {
         "id": audio_id,
-        "filename": filename,
+        "filename": path.name,
         "size": size,
-        "duration": None,
-        "format": file.content_type,
-        "url": f"/static/audio/{filename}",
+        "duration": info["duration"],
+        "format": info["ext"],
+        "url": f"/static/audio/{path.name}",
+        "sha256": sha256,
         "created_at": datetime.utcnow()
     }
     AUDIO_FILES[audio_id] = audio
+    await library_stats.add_file(path.parent, path)
     return audio
-
-@router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    try:
-        while True:
-            await websocket.send_json({"msg": "Real-time updates not implemented in demo."})
-            await asyncio.sleep(2)
-    except WebSocketDisconnect:
-        pass
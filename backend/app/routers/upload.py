@@ -1,9 +1,99 @@
-from fastapi import APIRouter, UploadFile, File
-from app.services.file_storage import save_audio_file
+import base64
+import binascii
+from pathlib import Path
+from typing import Dict, Optional
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from starlette.requests import ClientDisconnect
+from app.services.uploads import upload_service, UploadInterrupted
+from app.routers.generation import register_reference_audio, safe_filename
+from app.schemas.generation import AudioFile
+from app.config.settings import settings
 
-router = APIRouter()
+# Resumable reference-audio uploads, following the tus 1.0 core protocol plus the
+# creation, termination and checksum extensions. Flow:
+#   POST /api/uploads               Upload-Length, Upload-Metadata -> 201 + Location
+#   HEAD /api/uploads/{id}          -> Upload-Offset (ask after any interruption)
+#   PATCH /api/uploads/{id}         Upload-Offset, body = next chunk -> 204 + Upload-Offset
+#   POST /api/uploads/{id}/finalize -> the registered AudioFile
+router = APIRouter(prefix="/api/uploads", tags=["uploads"])
 
-@router.post("/")
-async def upload(file: UploadFile = File(...)):
-    path = await save_audio_file(file.filename, file.file)
-    return {"filename": file.filename, "path": path}
+TUS_VERSION = "1.0.0"
+TUS_HEADERS = {"Tus-Resumable": TUS_VERSION}
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+@router.options("")
+async def upload_options():
+    return Response(status_code=204, headers={
+        **TUS_HEADERS,
+        "Tus-Version": TUS_VERSION,
+        "Tus-Extension": "creation,termination,checksum",
+        "Tus-Max-Size": str(upload_service.max_length),
+        "Tus-Checksum-Algorithm": "sha1,sha256,md5",
+    })
+
+@router.post("", status_code=201)
+async def create_upload(
+    response: Response,
+    upload_length: int = Header(...),
+    upload_metadata: Optional[str] = Header(None),
+):
+    upload = upload_service.create(upload_length, _parse_metadata(upload_metadata))
+    response.headers.update({**TUS_HEADERS, "Location": f"{router.prefix}/{upload['id']}", "Upload-Offset": "0"})
+    return upload
+
+@router.head("/{upload_id}")
+async def get_upload_offset(upload_id: str):
+    upload = upload_service.get(upload_id)
+    return Response(headers={
+        **TUS_HEADERS,
+        "Upload-Offset": str(upload["offset"]),
+        "Upload-Length": str(upload["length"]),
+        "Cache-Control": "no-store",
+    })
+
+@router.patch("/{upload_id}", status_code=204)
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(...),
+    content_type: Optional[str] = Header(None),
+    upload_checksum: Optional[str] = Header(None),
+):
+    if content_type != CHUNK_CONTENT_TYPE:
+        raise HTTPException(415, f"Content-Type must be {CHUNK_CONTENT_TYPE}")
+    offset = await upload_service.append(upload_id, upload_offset, _body(request), upload_checksum)
+    return Response(status_code=204, headers={**TUS_HEADERS, "Upload-Offset": str(offset)})
+
+@router.post("/{upload_id}/finalize", response_model=AudioFile)
+async def finalize_upload(upload_id: str, sha256: Optional[str] = None):
+    filename = upload_service.get(upload_id)["metadata"].get("filename")
+    result = await upload_service.finalize(upload_id, Path(settings.AUDIO_STORAGE_PATH), safe_filename(filename), sha256)
+    return await register_reference_audio(result["path"], result["size"], result["sha256"])
+
+@router.delete("/{upload_id}", status_code=204)
+async def terminate_upload(upload_id: str):
+    upload_service.get(upload_id)
+    upload_service.remove(upload_id)
+    return Response(status_code=204, headers=TUS_HEADERS)
+
+async def _body(request: Request):
+    # Stream the chunk straight through; never hold more than one receive() in memory
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                yield chunk
+    except ClientDisconnect:
+        raise UploadInterrupted()
+
+def _parse_metadata(value: Optional[str]) -> Dict[str, str]:
+    # "key base64value,key2 base64value2"; a key may appear without a value
+    metadata = {}
+    for pair in (value or "").split(","):
+        parts = pair.strip().split(" ", 1)
+        if not parts[0]:
+            continue
+        try:
+            metadata[parts[0]] = base64.b64decode(parts[1], validate=True).decode() if len(parts) > 1 else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(400, f"Malformed Upload-Metadata value for {parts[0]}")
+    return metadata
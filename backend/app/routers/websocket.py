@@ -1,12 +1,23 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
 from app.services.websocket_manager import WebSocketManager
 from app.core.events import emitter
+from app.core import metrics
+from app.config.settings import settings
 import logging
 
 router = APIRouter()
-ws_manager = WebSocketManager()
+ws_manager = WebSocketManager(
+    max_queue_size=settings.WS_SEND_QUEUE_SIZE,
+    slow_consumer_policy=settings.WS_SLOW_CONSUMER_POLICY,
+    heartbeat_interval=settings.WS_HEARTBEAT_INTERVAL,
+    heartbeat_timeout=settings.WS_HEARTBEAT_INTERVAL * 3,
+)
 logger = logging.getLogger(__name__)
 
+metrics.scrape_gauge("websocket_connections", "Open WebSocket connections", ws_manager.connection_count)
+metrics.scrape_gauge("websocket_send_queue_messages", "Messages queued across all WebSocket send queues", lambda: sum(ws_manager.queue_lengths()))
+metrics.scrape_gauge("websocket_send_queue_max", "Longest WebSocket send queue", lambda: max(ws_manager.queue_lengths(), default=0))
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket, user_id: str = Query(...)):
     # TODO: Add authentication/validation for user_id
@@ -14,7 +25,8 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str = Query(...)):
     try:
         while True:
             data = await websocket.receive_text()
-            # Optionally handle incoming messages from client
+            # Any client message (including pong replies) counts as liveness
+            ws_manager.touch(websocket, user_id)
     except WebSocketDisconnect:
         await ws_manager.disconnect(user_id, websocket)
         logger.info(f"WebSocket disconnected: {user_id}")
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, validator, conint, constr, confloat
+from pydantic import BaseModel, Field, validator, conint, constr, confloat, conlist
 from typing import Optional, List
 from datetime import datetime
 
@@ -37,3 +37,18 @@ class AudioFile(BaseModel):
 
     class Config:
         orm_mode = True
+
+class GenerationBatchRequest(BaseModel):
+    requests: conlist(GenerationRequest, min_items=1, max_items=100)
+
+class GenerationBatchResponse(BaseModel):
+    id: int
+    status: str
+    total: int
+    queued: int
+    running: int
+    completed: int
+    failed: int
+    progress: float
+    generations: List[GenerationResponse]
+    created_at: datetime
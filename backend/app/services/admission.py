@@ -0,0 +1,192 @@
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, Optional, AsyncIterator
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+import logging
+
+from app.config.settings import settings
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, amount: float, now: float) -> float:
+        # Returns 0 when the tokens were taken, otherwise seconds until they would be available
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+class Ticket:
+    # One admitted request. A batch is one ticket for several jobs whose load on the
+    # shared queue is capped at how many of them it feeds in at once.
+    def __init__(self, controller: "AdmissionController", key: str, jobs: int, load: int):
+        self.controller = controller
+        self.key = key
+        self.remaining = jobs
+        self.load = load
+
+    def done(self) -> None:
+        if self.remaining <= 0:
+            return
+        self.remaining -= 1
+        released = self.load - min(self.load, self.remaining)
+        self.load -= released
+        self.controller._finish(self, released)
+
+class AdmissionController:
+    # Decides at the door whether a generation can start soon enough to be worth
+    # queueing. Rejecting early with Retry-After keeps the wait for admitted work
+    # bounded, instead of every request slowing down together under a spike.
+    def __init__(
+        self,
+        workers: int,
+        max_queue: int = 50,
+        max_wait: float = 300.0,
+        user_max_concurrent: int = 4,
+        user_rate: float = 0.5,
+        user_burst: float = 10,
+        initial_service_time: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.workers = max(workers, 1)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.user_max_concurrent = user_max_concurrent
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self.service_time = initial_service_time
+        self.clock = clock
+        self.outstanding = 0
+        self._user_tickets: Dict[str, int] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.rejected: Dict[str, int] = {}
+
+    def estimated_wait(self, extra_load: int = 0) -> float:
+        # Jobs ahead of a new arrival that are not already on a worker, drained `workers` at a time
+        queued = max(self.outstanding + extra_load - self.workers, 0)
+        return queued / self.workers * self.service_time
+
+    def admit(self, key: str, jobs: int = 1, load: Optional[int] = None) -> Ticket:
+        now = self.clock()
+        load = jobs if load is None else min(load, jobs)
+        if self.outstanding + load > self.workers + self.max_queue:
+            self._reject(503, "queue_full", "Generation queue is full", self.service_time / self.workers)
+        wait = self.estimated_wait(load)
+        if wait > self.max_wait:
+            self._reject(503, "wait_too_long", f"Estimated wait of {wait:.0f}s exceeds limit", wait - self.max_wait)
+        if self._user_tickets.get(key, 0) >= self.user_max_concurrent:
+            self._reject(429, "user_concurrency", "Too many concurrent generations", self.service_time)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._prune_buckets(now)
+            bucket = self._buckets[key] = TokenBucket(self.user_rate, self.user_burst, now)
+        # A batch spends at most one full burst, otherwise large batches could never be admitted
+        retry = bucket.take(min(jobs, self.user_burst), now)
+        if retry:
+            self._reject(429, "user_rate", "Generation rate limit exceeded", retry)
+        self.outstanding += load
+        self._user_tickets[key] = self._user_tickets.get(key, 0) + 1
+        return Ticket(self, key, jobs, load)
+
+    def observe_service_time(self, seconds: float) -> None:
+        # EWMA of time on a worker (excluding queue wait, which would feed back into itself)
+        self.service_time = 0.8 * self.service_time + 0.2 * seconds
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "outstanding": self.outstanding,
+            "workers": self.workers,
+            "saturation": min(self.outstanding / self.workers, 1.0),
+            "estimated_wait": self.estimated_wait(),
+            "service_time": self.service_time,
+        }
+
+    def _finish(self, ticket: Ticket, released: int) -> None:
+        self.outstanding -= released
+        if ticket.remaining == 0:
+            count = self._user_tickets.get(ticket.key, 0) - 1
+            if count > 0:
+                self._user_tickets[ticket.key] = count
+            else:
+                self._user_tickets.pop(ticket.key, None)
+
+    def _prune_buckets(self, now: float) -> None:
+        # Buckets that have refilled completely carry no state worth keeping
+        if len(self._buckets) < 10000:
+            return
+        full = [k for k, b in self._buckets.items() if b.tokens + (now - b.updated) * b.rate >= b.burst]
+        for k in full:
+            del self._buckets[k]
+
+    def _reject(self, status: int, reason: str, detail: str, retry_after: float):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        metrics.ADMISSION_REJECTED.labels(reason).inc()
+        logger.warning(f"Admission rejected ({reason}): {detail}")
+        raise HTTPException(status, detail, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+class InflightLimiter:
+    # Caps concurrent heavy requests (encodes, segmenting); excess is shed with 503
+    # rather than piling up behind the worker semaphore.
+    def __init__(self, limit: int, retry_after: int = 5):
+        self.limit = limit
+        self.retry_after = retry_after
+        self.inflight = 0
+
+    def acquire(self) -> None:
+        if self.inflight >= self.limit:
+            metrics.ADMISSION_REJECTED.labels("heavy_inflight").inc()
+            raise HTTPException(503, "Server busy, try again shortly", headers={"Retry-After": str(self.retry_after)})
+        self.inflight += 1
+
+    def release(self) -> None:
+        self.inflight -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def streaming_response(self, stream: AsyncIterator[bytes], **kwargs) -> StreamingResponse:
+        # Takes a slot (or sheds with 503) for a streamed body. The release lives in the
+        # response rather than the body generator, whose finally never runs if the
+        # client goes away or the send fails before the first chunk.
+        self.acquire()
+        return _SlotStreamingResponse(self, stream, **kwargs)
+
+class _SlotStreamingResponse(StreamingResponse):
+    def __init__(self, limiter: InflightLimiter, content: AsyncIterator[bytes], **kwargs):
+        super().__init__(content, **kwargs)
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.limiter.release()
+
+admission = AdmissionController(
+    workers=settings.GENERATION_WORKERS,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    max_wait=settings.ADMISSION_MAX_WAIT_SECONDS,
+    user_max_concurrent=settings.USER_MAX_CONCURRENT_GENERATIONS,
+    user_rate=settings.USER_GENERATIONS_PER_MINUTE / 60,
+    user_burst=settings.USER_GENERATION_BURST,
+)
+heavy_audio = InflightLimiter(settings.HEAVY_AUDIO_MAX_INFLIGHT)
+
+metrics.scrape_gauges("admission", "Generation admission state", ("stat",), lambda: {(k,): v for k, v in admission.stats().items()})
+metrics.scrape_gauge("heavy_audio_inflight", "In-flight encode/segment requests", lambda: heavy_audio.inflight)
@@ -1,3 +1,49 @@
+import asyncio
+import math
+import wave
+from array import array
+from pathlib import Path
+from typing import Any, Dict
+
+from app.utils import audio_headers
+
+# Level analysis reads at most this many samples, evenly spread over the file
+MAX_LEVEL_SAMPLES = 500_000
+
 async def analyze_audio(file_path: str) -> dict:
-    # Dummy analysis
-    return {"duration": 10, "bpm": 120}
+    return await asyncio.to_thread(_analyze, Path(file_path))
+
+def _analyze(path: Path) -> Dict[str, Any]:
+    info = audio_headers.probe(path)
+    features: Dict[str, Any] = {
+        "duration": info.duration,
+        "sample_rate": info.sample_rate,
+        "channels": info.channels,
+        "format": info.format,
+    }
+    if info.format == "wav":
+        features.update(_pcm_levels(path))
+    return features
+
+def _pcm_levels(path: Path) -> Dict[str, float]:
+    # Peak and RMS in dBFS for 16-bit PCM
+    with wave.open(str(path), "rb") as w:
+        if w.getsampwidth() != 2:
+            return {}
+        frames = w.getnframes()
+        total = frames * w.getnchannels()
+        stride = max(1, total // MAX_LEVEL_SAMPLES)
+        peak, squares, count = 0, 0, 0
+        while block := w.readframes(65536):
+            samples = array("h", block)[::stride]
+            if samples:
+                peak = max(peak, max(samples), -min(samples))
+                squares += sum(s * s for s in samples)
+                count += len(samples)
+    if not count:
+        return {}
+    return {"peak_db": _dbfs(peak), "rms_db": _dbfs(math.sqrt(squares / count))}
+
+def _dbfs(value: float):
+    # None for digital silence rather than -inf, which JSON can't carry
+    return round(20 * math.log10(value / 32768), 2) if value else None
@@ -2,65 +2,224 @@
 
 import asyncio
 import os
+import time
 import uuid
 from datetime import datetime
-from typing import Optional, Dict, Any
+from pathlib import Path
+from typing import Optional, Dict, Any, List
 from app.config.settings import settings
-from app.services.stable_audio import StableAudioClient, StableAudioAPIError
+from app.services.stable_audio import StableAudioClient, StableAudioAPIError, UnknownAssetError
+from app.services.progress import ProgressReporter
+from app.core import metrics
+from app.services.admission import admission
+from app.services import job_journal
+from app.services.job_journal import JobJournal
+from app.services.references import reference_cache
 from app.utils.audio_processing import validate_audio_file, cleanup_file, check_storage_space, is_corrupted
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Journal the downloaded byte count at most this often; on resume the partial
+# file's own size is what counts, so this only has to be roughly current.
+JOURNAL_BYTES_INTERVAL = 4 * 1024 * 1024
+
 class AudioGenerationService:
     def __init__(self):
         self.queue = asyncio.Queue()
-        self.rate_limit = asyncio.Semaphore(2)  # Example: 2 concurrent jobs
-        self.client = StableAudioClient(api_key=settings.API_KEY)
+        self.rate_limit = asyncio.Semaphore(settings.GENERATION_WORKERS)
+        self.waiting = 0
+        self.client = StableAudioClient(
+            api_key=settings.API_KEY,
+            base_url=settings.STABLE_AUDIO_BASE_URL,
+            poll_interval=settings.STABLE_AUDIO_POLL_INTERVAL,
+        )
+        self.journal = JobJournal(Path(settings.JOB_JOURNAL_PATH))
+        self.references = reference_cache
 
-    async def generate(self, prompt: str, genre: Optional[str] = None, instruments: Optional[list] = None, bpm: Optional[int] = None, duration: Optional[float] = None, reference_audio_id: Optional[int] = None) -> dict:
+    async def generate(self, prompt: str, genre: Optional[str] = None, instruments: Optional[list] = None, bpm: Optional[int] = None, duration: Optional[float] = None, reference: Optional[Dict[str, Any]] = None, progress: Optional[ProgressReporter] = None, job_key: Optional[str] = None, owner: Optional[str] = None) -> dict:
         # 1. Validate and queue request
-        if not check_storage_space(settings.AUDIO_STORAGE_PATH):
+        if not check_storage_space(settings.AUDIO_STORAGE_PATH, ttl=settings.STORAGE_CHECK_TTL):
             raise Exception("Insufficient storage space")
-        payload = self._build_payload(prompt, genre, instruments, bpm, duration, reference_audio_id)
-        job_id = None
-        filename = f"gen_{uuid.uuid4().hex}.wav"
+        prepared = None
+        if reference is not None:
+            # Once per distinct reference audio; repeats are a cache lookup
+            if progress:
+                progress.update(stage="preparing_reference")
+            source = Path(settings.AUDIO_STORAGE_PATH) / reference["filename"]
+            prepared = await self.references.prepare(source, self.client, reference.get("sha256"))
+            # Kept so the asset can be prepared again if the upstream forgets it
+            reference = {"filename": reference["filename"], "sha256": prepared["sha256"]}
+        payload = self._build_payload(prompt, genre, instruments, bpm, duration, prepared)
+        # Everything needed to finish the job goes into the journal before any work starts
+        record = self.journal.create(
+            job_key or uuid.uuid4().hex,
+            owner=owner,
+            payload=payload,
+            reference=reference,
+            filename=f"gen_{uuid.uuid4().hex}.wav",
+            duration=duration,
+        )
+        return await self._run(record, progress)
+
+    async def resume(self, job_key: str, progress: Optional[ProgressReporter] = None) -> dict:
+        # Continue a job journaled by a previous process from its last recorded phase
+        if not self.journal.claim(job_key):
+            raise KeyError(f"No journaled job {job_key} free to resume")
+        record = self.journal.get(job_key)
+        logger.info(f"Resuming generation {job_key} from phase {record['phase']} (upstream job {record.get('upstream_id')})")
+        return await self._run(record, progress)
+
+    def pending_jobs(self) -> List[Dict[str, Any]]:
+        return self.journal.pending()
+
+    def claim(self, job_key: str) -> bool:
+        # Other workers share the journal; only the claimant resumes a job
+        return self.journal.claim(job_key)
+
+    def reclaim_orphans(self) -> int:
+        # Partial downloads no journaled job will resume are dead weight. Only
+        # generation downloads are considered (not upload_*.part or other writers),
+        # and the directory is listed before the journal: a job another worker
+        # starts meanwhile is journaled before its partial exists, so it can't
+        # look orphaned.
+        parts = list(Path(settings.AUDIO_STORAGE_PATH).glob("gen_*.part"))
+        keep = {f"{r['filename']}.part" for r in self.journal.pending()}
+        reclaimed = 0
+        for part in parts:
+            if part.name not in keep:
+                cleanup_file(str(part))
+                reclaimed += 1
+        if reclaimed:
+            logger.info(f"Reclaimed {reclaimed} orphaned partial downloads")
+        return reclaimed
+
+    async def _run(self, record: Dict[str, Any], progress: Optional[ProgressReporter]) -> dict:
+        key = record["key"]
+        filename = record["filename"]
         file_path = os.path.join(settings.AUDIO_STORAGE_PATH, filename)
+        # Downloads land beside the final name so a half-written file is never served
+        part_path = file_path + ".part"
+        started = time.perf_counter()
         try:
-            async with self.rate_limit:
-                # 2. Call Stable Audio API
-                job_id = await self.client.generate_audio(payload)
+            self.waiting += 1
+            metrics.GENERATION_QUEUE_DEPTH.inc()
+            if progress:
+                progress.update(stage="queued", position_in_queue=self.waiting)
+            try:
+                await self.rate_limit.acquire()
+            finally:
+                self.waiting -= 1
+                metrics.GENERATION_QUEUE_DEPTH.dec()
+            acquired = time.perf_counter()
+            metrics.GENERATION_QUEUE_WAIT_SECONDS.observe(acquired - started)
+            metrics.GENERATION_ACTIVE.inc()
+            try:
+                # 2. Call Stable Audio API, unless a previous run already did
+                job_id = record.get("upstream_id")
+                if job_id is None:
+                    if progress:
+                        progress.update(stage="submitting", position_in_queue=0)
+                    try:
+                        job_id = await self.client.generate_audio(record["payload"])
+                    except UnknownAssetError:
+                        if not record.get("reference"):
+                            raise
+                        # The cached (or journaled) asset id has expired upstream
+                        job_id = await self.client.generate_audio(await self._refresh_reference(record))
+                    self.journal.update(key, phase=job_journal.SUBMITTED, upstream_id=job_id)
                 # 3. Poll for completion
-                status = await self.client.poll_status(job_id)
-                if status["status"] != "completed":
-                    raise StableAudioAPIError(f"Generation failed: {status}")
-                audio_url = status["audio_url"]
-                # 4. Download audio
-                await self.client.download_audio(audio_url, file_path)
+                audio_url = record.get("audio_url")
+                resumed_url = audio_url is not None
+                if audio_url is None:
+                    audio_url = await self._poll(key, job_id, progress)
+                # 4. Download audio, continuing any partial file
+                try:
+                    await self._download(key, audio_url, part_path, progress)
+                except StableAudioAPIError:
+                    if not resumed_url:
+                        raise
+                    # A journaled download URL may have expired; ask for a fresh one
+                    audio_url = await self._poll(key, job_id, progress)
+                    await self._download(key, audio_url, part_path, progress)
                 # 5. Validate audio file
+                os.replace(part_path, file_path)
                 if not validate_audio_file(file_path) or is_corrupted(file_path):
                     cleanup_file(file_path)
                     raise Exception("Invalid or corrupted audio file")
                 size = os.path.getsize(file_path)
+                self.journal.remove(key)
+                finished = time.perf_counter()
+                metrics.GENERATION_SECONDS.labels("completed").observe(finished - started)
+                admission.observe_service_time(finished - acquired)
                 # 6. Return metadata
                 return {
                     "filename": filename,
                     "size": size,
-                    "duration": duration or 10.0,
+                    "duration": record.get("duration") or 10.0,
                     "format": "wav",
                     "url": f"/static/audio/{filename}",
                     "created_at": datetime.utcnow()
                 }
+            finally:
+                metrics.GENERATION_ACTIVE.dec()
+                self.rate_limit.release()
+        # Cancellation (shutdown) leaves the journal and partial file behind for
+        # whichever process claims the job next.
+        except asyncio.CancelledError:
+            self.journal.release(key)
+            raise
         except StableAudioAPIError as e:
+            metrics.GENERATION_SECONDS.labels("failed").observe(time.perf_counter() - started)
             logger.error(f"Stable Audio API error: {e}")
+            self._abandon(key, part_path)
             raise
         except Exception as e:
+            metrics.GENERATION_SECONDS.labels("failed").observe(time.perf_counter() - started)
             logger.error(f"Audio generation failed: {e}")
+            self._abandon(key, part_path)
             if os.path.exists(file_path):
                 cleanup_file(file_path)
             raise
 
-    def _build_payload(self, prompt, genre, instruments, bpm, duration, reference_audio_id) -> Dict[str, Any]:
+    async def _refresh_reference(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        # Upload the reference again; its transcode is still cached, so this costs
+        # one upload. The journal gets the new id so a resume doesn't repeat this.
+        reference = record["reference"]
+        self.references.invalidate(reference["sha256"], record["payload"]["reference_asset_id"])
+        source = Path(settings.AUDIO_STORAGE_PATH) / reference["filename"]
+        prepared = await self.references.prepare(source, self.client, reference["sha256"])
+        payload = {**record["payload"], "reference_asset_id": prepared["asset_id"]}
+        self.journal.update(record["key"], payload=payload)
+        return payload
+
+    async def _poll(self, key: str, job_id: str, progress: Optional[ProgressReporter]) -> str:
+        status = await self.client.poll_status(job_id, status_callback=progress.status_callback if progress else None)
+        if status["status"] != "completed":
+            raise StableAudioAPIError(f"Generation failed: {status}")
+        self.journal.update(key, phase=job_journal.DOWNLOADING, audio_url=status["audio_url"])
+        return status["audio_url"]
+
+    async def _download(self, key: str, audio_url: str, part_path: str, progress: Optional[ProgressReporter]) -> None:
+        journaled = self.journal.get(key).get("bytes_downloaded") or 0
+
+        def on_progress(downloaded: int, total: int):
+            nonlocal journaled
+            if progress:
+                progress.download_callback(downloaded, total)
+            if downloaded - journaled >= JOURNAL_BYTES_INTERVAL:
+                journaled = downloaded
+                self.journal.update(key, bytes_downloaded=downloaded, bytes_total=total or None)
+
+        size = await self.client.download_audio(audio_url, part_path, progress_callback=on_progress, resume=True)
+        self.journal.update(key, bytes_downloaded=size, bytes_total=size)
+
+    def _abandon(self, key: str, part_path: str) -> None:
+        # Terminal failure: nothing left to resume
+        self.journal.remove(key)
+        cleanup_file(part_path)
+
+    def _build_payload(self, prompt, genre, instruments, bpm, duration, reference) -> Dict[str, Any]:
         payload = {"prompt": prompt}
         if genre:
             payload["genre"] = genre
@@ -70,6 +229,6 @@ class AudioGenerationService:
             payload["bpm"] = bpm
         if duration:
             payload["duration"] = duration
-        if reference_audio_id:
-            payload["reference_audio_id"] = reference_audio_id
+        if reference:
+            payload["reference_asset_id"] = reference["asset_id"]
         return payload
@@ -7,6 +7,7 @@ from pathlib import Path
 from typing import Optional, Dict, Any, List, Union
 from datetime import datetime, timedelta
 import hashlib
+import uuid
 import logging
 
 from fastapi import UploadFile, HTTPException
@@ -16,6 +17,8 @@ logger = logging.getLogger(__name__)
 class StorageBackend:
     async def save(self, file: UploadFile, dest_path: Path) -> Path:
         raise NotImplementedError
+    async def put(self, dest_path: Path, data: bytes) -> Path:
+        raise NotImplementedError
     async def delete(self, path: Path) -> None:
         raise NotImplementedError
     async def exists(self, path: Path) -> bool:
@@ -38,6 +41,20 @@ class LocalStorageBackend(StorageBackend):
                 await out.write(chunk)
         return dest
 
+    async def put(self, dest_path: Path, data: bytes) -> Path:
+        dest = self.base_dir / dest_path
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per writer: concurrent puts of the same path each publish a whole file
+        tmp = dest.with_name(f"{dest.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            async with aiofiles.open(tmp, 'wb') as out:
+                await out.write(data)
+            os.replace(tmp, dest)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        return dest
+
     async def delete(self, path: Path) -> None:
         try:
             os.remove(self.base_dir / path)
@@ -56,8 +73,10 @@ class LocalStorageBackend(StorageBackend):
         return [p.relative_to(self.base_dir) for p in base_path.rglob('*') if p.is_file()]
 
 class FileStorageService:
-    def __init__(self, backend: StorageBackend, quota_bytes: int = 10**9):
+    def __init__(self, backend: StorageBackend, quota_bytes: int = 10**9, stats=None):
         self.backend = backend
+        # Optional LibraryStats kept in step with every save and delete
+        self.stats = stats
         self.quota_bytes = quota_bytes
         self.usage = 0
         self.lock = asyncio.Lock()
@@ -74,12 +93,15 @@ class FileStorageService:
         dest_path = dest_path.with_name(f"{file_hash[:8]}_{filename}")
         # Check quota
         async with self.lock:
-            if self.usage + file.spool_max_size > self.quota_bytes:
+            # UploadFile.size is set for multipart uploads (spool_max_size isn't an UploadFile attribute)
+            if self.usage + (file.size or 0) > self.quota_bytes:
                 raise HTTPException(507, 'Storage quota exceeded')
             # Save file
             await file.seek(0)
             saved_path = await self.backend.save(file, dest_path)
             self.usage += (self.base_dir / saved_path).stat().st_size
+        if self.stats is not None:
+            await self.stats.add_file(self.base_dir, self.base_dir / saved_path)
         return {
             'path': str(saved_path),
             'hash': file_hash,
@@ -90,10 +112,32 @@ class FileStorageService:
     async def delete_file(self, path: str) -> None:
         async with self.lock:
             await self.backend.delete(Path(path))
+        if self.stats is not None:
+            # Callers pass either the file id or the absolute path save_file returned
+            rel = Path(path)
+            if rel.is_relative_to(self.base_dir):
+                rel = rel.relative_to(self.base_dir)
+            self.stats.remove(rel.as_posix())
 
     async def get_file(self, path: str) -> bytes:
         return await self.backend.get(Path(path))
 
+    async def local_path(self, path: str) -> Optional[Path]:
+        # A readable local copy: from the read-through cache when the backend has
+        # one, otherwise (or for objects too large to cache) the file under base_dir
+        if Path(path).is_absolute() or '..' in Path(path).parts:
+            return None
+        fetch = getattr(self.backend, 'fetch', None)
+        if fetch is not None:
+            try:
+                local = await fetch(Path(path))
+            except (FileNotFoundError, IsADirectoryError):
+                return None
+            if local is not None:
+                return local
+        local = self.base_dir / path
+        return local if local.is_file() else None
+
     async def list_files(self, user: Optional[str] = None, genre: Optional[str] = None, date: Optional[str] = None) -> List[Dict[str, Any]]:
         base = Path(user or '') / (genre or '') / (date or '')
         files = await self.backend.list(base)
@@ -108,6 +152,8 @@ class FileStorageService:
             age = (now - datetime.utcfromtimestamp(stat.st_mtime)).days
             if age > max_age_days:
                 await self.backend.delete(f)
+                if self.stats is not None:
+                    self.stats.remove(f.as_posix())
             # TODO: LRU logic
 
     async def _hash_file(self, file: UploadFile) -> str:
@@ -0,0 +1,125 @@
+import re
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import Optional, Dict, Any
+import logging
+
+from app.config.settings import settings
+from app.services.file_storage import StorageBackend, LocalStorageBackend
+from app.services.transcoding import TranscodingService, TranscodeError, transcoding_service
+
+logger = logging.getLogger(__name__)
+
+# Bitrate ladder for adaptive playback; all variants are AAC-LC in fMP4 segments
+VARIANTS: Dict[str, Dict[str, Any]] = {
+    "aac_64k": {"codec": "aac", "bitrate": "64k", "bandwidth": 72000, "codecs": "mp4a.40.2"},
+    "aac_128k": {"codec": "aac", "bitrate": "128k", "bandwidth": 140000, "codecs": "mp4a.40.2"},
+    "aac_256k": {"codec": "aac", "bitrate": "256k", "bandwidth": 280000, "codecs": "mp4a.40.2"},
+}
+PLAYLIST = "index.m3u8"
+SOURCE_REF = "source"
+_ASSET_ID = re.compile(r"^[0-9a-f]{32}$")
+_ASSET_NAME = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]*$")
+
+class HlsService:
+    # Segments are produced lazily on first request, keyed by source content hash, and
+    # stored through a StorageBackend so they can live on shared or remote storage.
+    def __init__(self, storage: StorageBackend, transcoder: TranscodingService, segment_seconds: int = 6, ffmpeg: str = "ffmpeg", base_url: str = "/api/audio/hls"):
+        self.storage = storage
+        self.transcoder = transcoder
+        self.segment_seconds = segment_seconds
+        self.ffmpeg = ffmpeg
+        # Variant URIs are absolute: file ids span directories, so a relative URI
+        # would resolve to a different depth for every id
+        self.base_url = base_url
+        # Segmenting counts against the transcoder's ffmpeg limit rather than adding its own
+        self.semaphore = transcoder.semaphore
+        self._jobs: Dict[str, asyncio.Task] = {}
+
+    async def master_playlist(self, source: Path, file_id: str) -> str:
+        # Master playlist is plain text and needs no encoding; variant URIs are
+        # content-addressed so segments stay valid (and cacheable) forever.
+        digest = await self.asset_id(source)
+        ref = Path(digest) / SOURCE_REF
+        if not await self.storage.exists(ref):
+            await self.storage.put(ref, file_id.encode())
+        lines = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-INDEPENDENT-SEGMENTS"]
+        for name, variant in VARIANTS.items():
+            lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={variant["bandwidth"]},CODECS="{variant["codecs"]}"')
+            lines.append(f"{self.base_url}/{digest}/{name}/{PLAYLIST}")
+        return "\n".join(lines) + "\n"
+
+    async def asset_id(self, source: Path) -> str:
+        return (await self.transcoder.content_hash(source))[:32]
+
+    async def source_file_id(self, digest: str) -> Optional[str]:
+        if not _ASSET_ID.match(digest):
+            return None
+        ref = Path(digest) / SOURCE_REF
+        if not await self.storage.exists(ref):
+            return None
+        return (await self.storage.get(ref)).decode()
+
+    async def stored(self, digest: str, variant: str, name: str) -> Optional[bytes]:
+        # A playlist or segment that is already in storage; None if it still has to be made
+        if variant not in VARIANTS or not _ASSET_ID.match(digest) or not _ASSET_NAME.match(name):
+            raise FileNotFoundError(f"{digest}/{variant}/{name}")
+        path = Path(digest) / variant / name
+        if await self.storage.exists(path):
+            return await self.storage.get(path)
+        return None
+
+    async def get(self, digest: str, variant: str, name: str, source: Optional[Path]) -> bytes:
+        # Returns a playlist or segment, segmenting the variant first if needed
+        data = await self.stored(digest, variant, name)
+        if data is not None:
+            return data
+        path = Path(digest) / variant / name
+        if await self.storage.exists(Path(digest) / variant / PLAYLIST):
+            # Variant is complete, so this segment name doesn't exist
+            raise FileNotFoundError(str(path))
+        if source is None:
+            raise FileNotFoundError(str(path))
+        await self._segment(digest, variant, source)
+        return await self.storage.get(path)
+
+    async def _segment(self, digest: str, variant: str, source: Path) -> None:
+        key = f"{digest}/{variant}"
+        job = self._jobs.get(key)
+        if job is None:
+            job = asyncio.create_task(self._run(digest, variant, source))
+            self._jobs[key] = job
+            job.add_done_callback(lambda _: self._jobs.pop(key, None))
+        await asyncio.shield(job)
+
+    async def _run(self, digest: str, variant: str, source: Path) -> None:
+        spec = VARIANTS[variant]
+        async with self.semaphore:
+            with tempfile.TemporaryDirectory(prefix="hls_") as tmp:
+                out = Path(tmp)
+                cmd = [
+                    self.ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error",
+                    "-i", str(source), "-vn", "-c:a", spec["codec"], "-b:a", spec["bitrate"],
+                    "-f", "hls", "-hls_time", str(self.segment_seconds), "-hls_playlist_type", "vod",
+                    "-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", "init.mp4",
+                    "-hls_segment_filename", str(out / "seg_%05d.m4s"),
+                    str(out / PLAYLIST),
+                ]
+                proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+                _, stderr = await proc.communicate()
+                if proc.returncode != 0:
+                    raise TranscodeError(f"ffmpeg exited with {proc.returncode}: {stderr.decode(errors='replace').strip()[-500:]}")
+                # Upload segments first and the playlist last: its presence marks the variant complete
+                for segment in sorted(out.iterdir()):
+                    if segment.name != PLAYLIST:
+                        await self.storage.put(Path(digest) / variant / segment.name, await asyncio.to_thread(segment.read_bytes))
+                await self.storage.put(Path(digest) / variant / PLAYLIST, await asyncio.to_thread((out / PLAYLIST).read_bytes))
+        logger.info(f"Segmented {source} as {digest}/{variant}")
+
+hls_service = HlsService(
+    LocalStorageBackend(Path(settings.HLS_STORAGE_PATH)),
+    transcoding_service,
+    segment_seconds=settings.HLS_SEGMENT_SECONDS,
+    ffmpeg=settings.FFMPEG_BINARY,
+)
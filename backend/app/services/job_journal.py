@@ -0,0 +1,127 @@
+import fcntl
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import orjson
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Phases a generation passes through; a journal record survives restarts until the
+# job reaches a terminal state, so the next process can pick it up where it stopped.
+QUEUED = "queued"
+SUBMITTED = "submitted"
+DOWNLOADING = "downloading"
+PHASES = (QUEUED, SUBMITTED, DOWNLOADING)
+
+class JobJournal:
+    # One small JSON file per in-flight job, rewritten atomically on every phase change.
+    # Workers share the directory, so a job is run by whichever process holds an
+    # exclusive flock on its .lock file; the kernel drops it if that process dies.
+    def __init__(self, directory: Path, fsync: bool = True):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._claims: Dict[str, int] = {}
+
+    def create(self, key: str, **fields) -> Dict[str, Any]:
+        if not self._lock(key):
+            raise KeyError(f"Job {key} is claimed by another process")
+        now = time.time()
+        record = {"key": key, "phase": QUEUED, "created_at": now, "updated_at": now, **fields}
+        self._records[key] = record
+        self._write(record)
+        return record
+
+    def update(self, key: str, **fields) -> Dict[str, Any]:
+        record = self._records.get(key) or self.get(key)
+        if record is None:
+            raise KeyError(key)
+        record.update(fields, updated_at=time.time())
+        self._write(record)
+        return record
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if key in self._records:
+            return self._records[key]
+        path = self._path(key)
+        if not path.exists():
+            return None
+        record = orjson.loads(path.read_bytes())
+        self._records[key] = record
+        return record
+
+    def claim(self, key: str) -> bool:
+        # True if this process now owns the job; False if another one is running it
+        # or it finished between listing and claiming
+        if key in self._claims:
+            return True
+        if not self._lock(key):
+            return False
+        path = self._path(key)
+        if not path.exists():
+            self.release(key)
+            return False
+        # The previous owner may have moved it on since it was listed
+        self._records[key] = orjson.loads(path.read_bytes())
+        return True
+
+    def claimed(self, key: str) -> bool:
+        return key in self._claims
+
+    def release(self, key: str) -> None:
+        # Give the job up without finishing it, e.g. on shutdown
+        fd = self._claims.pop(key, None)
+        if fd is not None:
+            os.close(fd)
+
+    def remove(self, key: str) -> None:
+        self._records.pop(key, None)
+        self._path(key).unlink(missing_ok=True)
+        # The entry goes first: anyone locking the orphaned .lock afterwards finds no job
+        self._lock_path(key).unlink(missing_ok=True)
+        self.release(key)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        records = []
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                record = orjson.loads(path.read_bytes())
+            except (OSError, orjson.JSONDecodeError) as e:
+                # A torn write can't happen (os.replace), but don't let one bad file stop recovery
+                logger.error(f"Unreadable job journal entry {path}: {e}")
+                continue
+            if record.get("phase") in PHASES:
+                self._records[record["key"]] = record
+                records.append(record)
+        return sorted(records, key=lambda r: r.get("created_at", 0))
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _lock_path(self, key: str) -> Path:
+        return self.directory / f"{key}.lock"
+
+    def _lock(self, key: str) -> bool:
+        if key in self._claims:
+            return True
+        fd = os.open(self._lock_path(key), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._claims[key] = fd
+        return True
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        path = self._path(record["key"])
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(orjson.dumps(record))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
@@ -0,0 +1,243 @@
+import asyncio
+import os
+import time
+from stat import S_ISREG
+from datetime import datetime
+from pathlib import Path, PurePath
+from typing import Any, Dict, List, Optional, Tuple
+import orjson
+import logging
+
+from app.config.settings import settings
+from app.core import metrics
+from app.utils import audio_headers
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("user", "genre", "date")
+GENERATION_STATUSES = ("queued", "running", "completed", "failed")
+# Files outside the user/genre/YYYY/MM/DD layout (generations, reference uploads)
+UNASSIGNED = "unassigned"
+# Left behind by interrupted writes, never library files
+SKIP_SUFFIXES = (".part", ".tmp")
+
+def _bucket() -> Dict[str, float]:
+    return {"files": 0, "bytes": 0, "duration": 0.0}
+
+def _dimensions(rel: PurePath, mtime: float) -> Tuple[str, str, str]:
+    parts = rel.parts
+    user = parts[0] if len(parts) > 1 else UNASSIGNED
+    genre = parts[1] if len(parts) > 2 else UNASSIGNED
+    if len(parts) >= 6:
+        date = "-".join(parts[2:5])
+    else:
+        date = datetime.utcfromtimestamp(mtime).strftime("%Y-%m-%d")
+    return user, genre, date
+
+def _probe_duration(path: Path) -> float:
+    try:
+        return audio_headers.probe(path).duration or 0.0
+    except (ValueError, OSError):
+        return 0.0
+
+class LibraryStats:
+    # Materialized library totals (files, bytes, duration) overall and per user,
+    # genre and date, plus generations per status. Every save, delete and status
+    # change applies a delta, so reads are dictionary lookups and never walk the
+    # storage tree. The per-file index makes deletes exact and is what gets
+    # persisted; a rebuild walks storage to reconcile drift from files changed
+    # behind the app's back.
+    def __init__(self, path: Path, save_delay: float = 1.0):
+        self.path = path
+        self.save_delay = save_delay
+        # relative path -> [size, duration, mtime, user, genre, date]
+        self._files: Dict[str, List[Any]] = {}
+        self.totals = _bucket()
+        self.buckets: Dict[str, Dict[str, Dict[str, float]]] = {d: {} for d in DIMENSIONS}
+        self.generations: Dict[str, int] = dict.fromkeys(GENERATION_STATUSES, 0)
+        self.rebuilt_at: Optional[float] = None
+        # Changes made while a rebuild scans storage, re-applied on top of its result
+        self._replay: Optional[List[Tuple[str, tuple]]] = None
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._save_lock = asyncio.Lock()
+        self._tasks: set = set()
+
+    @property
+    def rebuilding(self) -> bool:
+        return self._rebuild_task is not None and not self._rebuild_task.done()
+
+    async def load(self) -> bool:
+        try:
+            state = orjson.loads(await asyncio.to_thread(self.path.read_bytes))
+        except FileNotFoundError:
+            return False
+        except orjson.JSONDecodeError as e:
+            logger.error(f"Ignoring corrupt library stats at {self.path}: {e}")
+            return False
+        self._reset(state["files"])
+        self.generations.update(state.get("generations", {}))
+        # Live jobs from the previous process are counted again as they are recovered
+        self.generations["queued"] = self.generations["running"] = 0
+        self.rebuilt_at = state.get("rebuilt_at")
+        return True
+
+    def add(self, rel: str, size: int, duration: float, mtime: float):
+        if self._replay is not None:
+            self._replay.append(("add", (rel, size, duration, mtime)))
+        # Idempotent: saving over an existing path replaces its entry
+        self._discard(rel)
+        entry = [size, duration, mtime, *_dimensions(PurePath(rel), mtime)]
+        self._files[rel] = entry
+        self._apply(entry, 1)
+        self._changed()
+
+    def remove(self, rel: str):
+        if self._replay is not None:
+            self._replay.append(("remove", (rel,)))
+        if self._discard(rel):
+            self._changed()
+
+    async def add_file(self, base_dir: Path, path: Path):
+        # Duration comes from the header, the same way a rebuild measures it
+        try:
+            stat, duration = await asyncio.to_thread(lambda: (path.stat(), _probe_duration(path)))
+        except FileNotFoundError:
+            # Already gone again; a rebuild would not find it either
+            return
+        self.add(path.relative_to(base_dir).as_posix(), stat.st_size, duration, stat.st_mtime)
+
+    def generation(self, old: Optional[str], new: str):
+        if old is not None:
+            self.generations[old] = max(0, self.generations.get(old, 0) - 1)
+        self.generations[new] = self.generations.get(new, 0) + 1
+        self._changed()
+
+    def snapshot(self, user: Optional[str] = None, genre: Optional[str] = None, date: Optional[str] = None) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "totals": self.totals,
+            "generations": self.generations,
+            "rebuilt_at": self.rebuilt_at,
+            "rebuilding": self.rebuilding,
+        }
+        for dimension, key in zip(DIMENSIONS, (user, genre, date)):
+            table = self.buckets[dimension]
+            result[f"by_{dimension}"] = table if key is None else {key: table.get(key, _bucket())}
+        return result
+
+    def start_rebuild(self, base_dir: Path, live: Optional[Dict[str, int]] = None) -> bool:
+        if self.rebuilding:
+            return False
+        self._rebuild_task = asyncio.create_task(self.rebuild(base_dir, live))
+        return True
+
+    async def rebuild(self, base_dir: Path, live: Optional[Dict[str, int]] = None):
+        # live: current queued/running counts from the in-memory generation table
+        started = time.perf_counter()
+        self._replay = []
+        try:
+            files = await asyncio.to_thread(self._scan, base_dir, dict(self._files))
+            replay, self._replay = self._replay, None
+            self._reset(files)
+            for op, args in replay:
+                getattr(self, op)(*args)
+        finally:
+            self._replay = None
+        if live is not None:
+            self.generations["queued"] = live.get("queued", 0)
+            self.generations["running"] = live.get("running", 0)
+        self.rebuilt_at = time.time()
+        self._changed()
+        logger.info(f"Rebuilt library stats from {len(files)} files in {time.perf_counter() - started:.2f}s")
+
+    async def flush(self):
+        if self._save_handle is not None:
+            self._save_handle.cancel()
+            self._save_handle = None
+        async with self._save_lock:
+            # Serialized on the loop so the snapshot is consistent; written off it
+            data = orjson.dumps({
+                "files": self._files,
+                "generations": self.generations,
+                "rebuilt_at": self.rebuilt_at,
+            })
+            await asyncio.to_thread(self._write, data)
+
+    def _scan(self, base_dir: Path, known: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+        files = {}
+        for path in base_dir.rglob("*"):
+            if path.suffix in SKIP_SUFFIXES:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if not S_ISREG(stat.st_mode):
+                continue
+            rel = path.relative_to(base_dir).as_posix()
+            old = known.get(rel)
+            # Unchanged files keep their measured duration instead of being probed again
+            if old is not None and old[0] == stat.st_size and old[2] == stat.st_mtime:
+                duration = old[1]
+            else:
+                duration = _probe_duration(path)
+            files[rel] = [stat.st_size, duration, stat.st_mtime, *_dimensions(PurePath(rel), stat.st_mtime)]
+        return files
+
+    def _reset(self, files: Dict[str, List[Any]]):
+        self._files = files
+        self.totals = _bucket()
+        self.buckets = {d: {} for d in DIMENSIONS}
+        for entry in files.values():
+            self._apply(entry, 1)
+
+    def _discard(self, rel: str) -> bool:
+        entry = self._files.pop(rel, None)
+        if entry is None:
+            return False
+        self._apply(entry, -1)
+        return True
+
+    def _apply(self, entry: List[Any], sign: int):
+        size, duration, _, *keys = entry
+        for dimension, key in zip(DIMENSIONS, keys):
+            table = self.buckets[dimension]
+            bucket = table.setdefault(key, _bucket())
+            self._add_to(bucket, size, duration, sign)
+            if bucket["files"] <= 0:
+                # Emptied buckets go away, which also drops accumulated float error
+                del table[key]
+        self._add_to(self.totals, size, duration, sign)
+        if self.totals["files"] <= 0:
+            self.totals = _bucket()
+
+    @staticmethod
+    def _add_to(bucket: Dict[str, float], size: int, duration: float, sign: int):
+        bucket["files"] += sign
+        bucket["bytes"] += sign * size
+        bucket["duration"] += sign * duration
+
+    def _changed(self):
+        # Persist at most once per save_delay; bursts of changes share one write
+        if self._save_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._save_handle = loop.call_later(self.save_delay, self._save_soon)
+
+    def _save_soon(self):
+        self._save_handle = None
+        task = asyncio.create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _write(self, data: bytes):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, self.path)
+
+library_stats = LibraryStats(Path(settings.LIBRARY_STATS_PATH))
+
+metrics.scrape_gauges("library", "Library totals across all stored audio", ("stat",), lambda: {(k,): v for k, v in library_stats.totals.items()})
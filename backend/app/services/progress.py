@@ -0,0 +1,100 @@
+import asyncio
+from typing import Any, Dict, Optional, Set
+import logging
+
+from app.core.events import EventBus, emitter
+
+logger = logging.getLogger(__name__)
+
+GENERATION_EVENTS = ("generation_started", "generation_progress", "generation_completed", "generation_failed", "queue_updated")
+TERMINAL_EVENTS = ("generation_completed", "generation_failed")
+
+class ProgressReporter:
+    # Coalesces progress updates for one job and emits at most `max_rate` per second.
+    # update() is synchronous so it can be used directly as an httpx progress callback.
+    def __init__(self, job_id: Any, user_id: Optional[str] = None, bus: Optional[EventBus] = None, max_rate: float = 10.0):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.bus = bus or emitter
+        self.interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._pending: Optional[Dict[str, Any]] = None
+        self._last_emit = float("-inf")
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def update(self, **fields):
+        self._pending = {**(self._pending or {}), **fields}
+        if self._timer is not None:
+            return
+        loop = asyncio.get_running_loop()
+        wait = self._last_emit + self.interval - loop.time()
+        if wait <= 0:
+            self._flush()
+        else:
+            self._timer = loop.call_later(wait, self._flush)
+
+    def download_callback(self, downloaded: int, total: int):
+        fields = {"stage": "downloading", "bytes_downloaded": downloaded, "bytes_total": total or None}
+        if total:
+            fields["progress"] = round(downloaded / total, 4)
+        self.update(**fields)
+
+    def status_callback(self, status: Dict[str, Any]):
+        self.update(stage="generating", upstream_status=status.get("status"), progress=status.get("progress"))
+
+    async def emit(self, event: str, **payload):
+        # Lifecycle events bypass throttling but first deliver any pending progress
+        await self.close()
+        await self.bus.emit(event, self.user_id, {"id": self.job_id, **payload})
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending is not None:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self):
+        self._timer = None
+        payload, self._pending = self._pending, None
+        if payload is None:
+            return
+        self._last_emit = asyncio.get_running_loop().time()
+        task = asyncio.create_task(self.bus.emit("generation_progress", self.user_id, {"id": self.job_id, **payload}))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+class JobEventStreams:
+    # Routes generation events to per-job subscribers (used by the SSE endpoint)
+    def __init__(self, bus: EventBus, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        for event in GENERATION_EVENTS:
+            bus.on(event, self._make_listener(event))
+
+    def subscribe(self, job_id: Any) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(self.max_queue)
+        self._subscribers.setdefault(str(job_id), set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: Any, queue: asyncio.Queue):
+        queues = self._subscribers.get(str(job_id))
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[str(job_id)]
+
+    def _make_listener(self, event: str):
+        async def listener(user_id, payload):
+            for queue in list(self._subscribers.get(str(payload.get("id")), ())):
+                if queue.full():
+                    # Slow reader: keep the newest state, progress is superseded anyway
+                    queue.get_nowait()
+                queue.put_nowait((event, payload))
+        listener.__name__ = f"sse_{event}"
+        return listener
+
+job_streams = JobEventStreams(emitter)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+import orjson
+import logging
+
+from app.config.settings import settings
+from app.core import metrics
+from app.services.audio_analysis import analyze_audio
+from app.services.stable_audio import StableAudioClient
+from app.services.transcoding import TranscodingService, TranscodeSpec, transcoding_service
+
+logger = logging.getLogger(__name__)
+
+# What the upstream conditions on: fixed rate/layout PCM, trimmed to the window it reads
+REFERENCE_SPEC = TranscodeSpec(
+    "wav",
+    sample_rate=settings.REFERENCE_SAMPLE_RATE,
+    channels=settings.REFERENCE_CHANNELS,
+    max_seconds=settings.REFERENCE_MAX_SECONDS,
+)
+
+class ReferenceCache:
+    # Prepares each reference once per (content hash, spec): transcode, analyze,
+    # upload. Every later generation naming the same audio, under any id or file
+    # name and across restarts, reuses the upstream asset id.
+    def __init__(self, directory: Path, transcoder: TranscodingService, spec: TranscodeSpec = REFERENCE_SPEC, asset_ttl: float = 7 * 86400):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.transcoder = transcoder
+        self.spec = spec
+        self.asset_ttl = asset_ttl
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidated = 0
+
+    async def prepare(self, source: Path, client: StableAudioClient, sha256: Optional[str] = None) -> Dict[str, Any]:
+        digest = sha256 or await self.transcoder.content_hash(source)
+        key = self._key(digest)
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        task = self._pending.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._prepare(key, digest, source, client))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        else:
+            self.coalesced += 1
+        # One caller giving up must not cancel the preparation others are waiting on
+        return await asyncio.shield(task)
+
+    def invalidate(self, sha256: str, asset_id: str) -> bool:
+        # The upstream rejected asset_id. Forget it so the next prepare uploads
+        # again, unless another caller has already replaced it with a newer one.
+        key = self._key(sha256)
+        entry = self._load(key)
+        if entry is None or entry["asset_id"] != asset_id:
+            return False
+        self._entries.pop(key, None)
+        self._path(key).unlink(missing_ok=True)
+        self.invalidated += 1
+        logger.info(f"Dropped reference {sha256[:12]}: upstream no longer knows asset {asset_id}")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "invalidated": self.invalidated, "entries": len(self._entries)}
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            path = self._path(key)
+            if not path.exists():
+                return None
+            entry = self._entries[key] = orjson.loads(path.read_bytes())
+        return entry
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._load(key)
+        if entry is None:
+            return None
+        # Upstream assets don't live forever; an old one is prepared (and uploaded) again
+        if time.time() - entry["uploaded_at"] > self.asset_ttl:
+            return None
+        return entry
+
+    async def _prepare(self, key: str, digest: str, source: Path, client: StableAudioClient) -> Dict[str, Any]:
+        started = time.perf_counter()
+        # The transcode itself is content-addressed too, so a re-upload after expiry doesn't re-encode
+        prepared = await self.transcoder.transcode(source, self.spec)
+        features = await analyze_audio(str(prepared))
+        data = await asyncio.to_thread(prepared.read_bytes)
+        asset_id = await client.upload_reference(f"{digest[:16]}.{self.spec.ext}", data, self.spec.media_type)
+        entry = {
+            "key": key,
+            "sha256": digest,
+            "asset_id": asset_id,
+            "features": features,
+            "size": len(data),
+            "uploaded_at": time.time(),
+        }
+        tmp = self._path(key).with_suffix(".tmp")
+        tmp.write_bytes(orjson.dumps(entry))
+        os.replace(tmp, self._path(key))
+        self._entries[key] = entry
+        logger.info(f"Prepared reference {digest[:12]} as asset {asset_id} in {time.perf_counter() - started:.2f}s")
+        return entry
+
+    def _key(self, digest: str) -> str:
+        return f"{digest[:32]}_{self.spec.slug()}"
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+reference_cache = ReferenceCache(
+    Path(settings.REFERENCE_CACHE_PATH),
+    transcoding_service,
+    asset_ttl=settings.REFERENCE_ASSET_TTL_SECONDS,
+)
+
+metrics.scrape_gauges("reference_cache", "Reference audio preparation cache", ("stat",), lambda: {(k,): v for k, v in reference_cache.stats().items()})
@@ -0,0 +1,66 @@
+import asyncio
+from pathlib import Path
+from typing import Optional, Dict, Iterable, Set
+import logging
+
+from app.services.transcoding import TranscodingService, TranscodeSpec, transcoding_service
+
+logger = logging.getLogger(__name__)
+
+# Low-bitrate playback renditions; the original upload/generation is kept untouched for download
+RENDITIONS: Dict[str, TranscodeSpec] = {
+    "opus": TranscodeSpec("opus", bitrate="64k"),
+    "aac": TranscodeSpec("aac", bitrate="96k"),
+}
+# AAC plays everywhere; Opus is smaller but only used when the client asks for it
+DEFAULT_PREVIEW = "aac"
+ORIGINAL = "original"
+PREVIEW = "preview"
+
+class RenditionService:
+    def __init__(self, transcoder: TranscodingService):
+        self.transcoder = transcoder
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def available(self, source: Path, rendition: str) -> Optional[Path]:
+        return await self.transcoder.cached(source, RENDITIONS[rendition])
+
+    def schedule(self, source: Path, renditions: Iterable[str] = tuple(RENDITIONS)) -> None:
+        # Fire-and-forget ingest step; failures are logged and the original keeps being served
+        for rendition in renditions:
+            task = asyncio.create_task(self._ensure_logged(source, rendition))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def ensure(self, source: Path, rendition: str) -> Path:
+        return await self.transcoder.transcode(source, RENDITIONS[rendition])
+
+    def stream(self, source: Path, rendition: str):
+        return self.transcoder.stream(source, RENDITIONS[rendition])
+
+    def negotiate(self, requested: Optional[str], accept: Optional[str]) -> Optional[str]:
+        # Returns the rendition to serve, or None for the original file
+        accept = (accept or "").lower()
+        if requested == ORIGINAL:
+            return None
+        if requested in RENDITIONS:
+            return requested
+        if requested == PREVIEW:
+            if "audio/ogg" in accept or "audio/opus" in accept:
+                return "opus"
+            return DEFAULT_PREVIEW
+        if requested is not None:
+            raise ValueError(f"Unknown rendition: {requested}")
+        # No explicit request: only switch when the client names a rendition type outright
+        for name, spec in RENDITIONS.items():
+            if spec.media_type in accept:
+                return name
+        return None
+
+    async def _ensure_logged(self, source: Path, rendition: str) -> None:
+        try:
+            await self.ensure(source, rendition)
+        except Exception as e:
+            logger.error(f"Failed to encode {rendition} rendition for {source}: {e}")
+
+rendition_service = RenditionService(transcoding_service)
@@ -1,8 +1,11 @@
 
 import asyncio
 import logging
+import os
+import time
 from typing import Any, Dict, Optional, Callable, AsyncGenerator
 import httpx
+from app.core import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +15,17 @@ class StableAudioAPIError(Exception):
 class RateLimitError(StableAudioAPIError):
     pass
 
+class UnknownAssetError(StableAudioAPIError):
+    # A reference asset id the upstream no longer (or never) knew about
+    pass
+
+def _content_range_total(value: Optional[str]) -> Optional[int]:
+    # "bytes 0-99/1234" or "bytes */1234"
+    if not value or "/" not in value:
+        return None
+    total = value.rsplit("/", 1)[1]
+    return int(total) if total.isdigit() else None
+
 class StableAudioClient:
     def __init__(
         self,
@@ -20,13 +34,16 @@ class StableAudioClient:
         max_retries: int = 5,
         backoff_factor: float = 0.5,
         timeout: float = 30.0,
+        poll_interval: float = 2.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
     ):
         self.api_key = api_key
         self.base_url = base_url
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
         self.timeout = timeout
-        self._client = httpx.AsyncClient(timeout=timeout)
+        self.poll_interval = poll_interval
+        self._client = httpx.AsyncClient(timeout=timeout, transport=transport)
 
     async def _request(
         self,
@@ -39,14 +56,17 @@ class StableAudioClient:
         files: Optional[Any] = None,
         stream: bool = False,
         progress_callback: Optional[Callable[[int, int], None]] = None,
+        route: Optional[str] = None,
     ) -> Any:
         url = f"{self.base_url}{endpoint}"
         headers = {"Authorization": f"Bearer {self.api_key}"}
+        # Metric label: the endpoint template, never the concrete job URL
+        route = route or endpoint
         attempt = 0
         while attempt <= self.max_retries:
             try:
                 logger.info(f"StableAudio API {method} {url}")
-                response = await self._client.request(
+                request = self._client.build_request(
                     method,
                     url,
                     params=params,
@@ -54,21 +74,32 @@ class StableAudioClient:
                     json=json,
                     files=files,
                     headers=headers,
-                    follow_redirects=True,
-                    stream=stream,
                 )
+                started = time.perf_counter()
+                try:
+                    response = await self._client.send(request, follow_redirects=True, stream=stream)
+                except httpx.RequestError:
+                    metrics.UPSTREAM_REQUEST_SECONDS.labels(method, route, "error").observe(time.perf_counter() - started)
+                    raise
+                metrics.UPSTREAM_REQUEST_SECONDS.labels(method, route, str(response.status_code)).observe(time.perf_counter() - started)
                 logger.info(f"StableAudio API response: {response.status_code}")
+                if stream and response.is_error:
+                    await response.aread()
+                    await response.aclose()
                 if response.status_code == 429:
                     logger.warning("StableAudio API rate limited. Retrying...")
                     raise RateLimitError("Rate limit exceeded")
                 if response.is_error:
                     logger.error(f"StableAudio API error: {response.text}")
+                    if response.status_code == 400 and "unknown reference asset" in response.text.lower():
+                        raise UnknownAssetError(response.text)
                     raise StableAudioAPIError(response.text)
                 if stream:
                     return self._stream_response(response, progress_callback)
                 return response.json()
             except (httpx.RequestError, RateLimitError) as e:
                 attempt += 1
+                metrics.UPSTREAM_RETRIES.labels(route, "rate_limited" if isinstance(e, RateLimitError) else "network").inc()
                 if attempt > self.max_retries:
                     logger.error(f"StableAudio API request failed after {attempt} attempts: {e}")
                     raise
@@ -79,11 +110,14 @@ class StableAudioClient:
     async def _stream_response(self, response: httpx.Response, progress_callback: Optional[Callable[[int, int], None]] = None) -> AsyncGenerator[bytes, None]:
         total = int(response.headers.get("content-length", 0))
         downloaded = 0
-        async for chunk in response.aiter_bytes():
-            downloaded += len(chunk)
-            if progress_callback:
-                progress_callback(downloaded, total)
-            yield chunk
+        try:
+            async for chunk in response.aiter_bytes():
+                downloaded += len(chunk)
+                if progress_callback:
+                    progress_callback(downloaded, total)
+                yield chunk
+        finally:
+            await response.aclose()
 
     async def generate_audio(self, payload: Dict[str, Any], progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
         # 1. Submit generation request
@@ -91,29 +125,65 @@ class StableAudioClient:
         job_id = result["id"]
         return job_id
 
-    async def poll_status(self, job_id: str) -> Dict[str, Any]:
+    async def upload_reference(self, filename: str, data: bytes, content_type: str = "audio/wav") -> str:
+        # Reference audio becomes an upstream asset that generations point at by id
+        result = await self._request("POST", "/references", files={"file": (filename, data, content_type)})
+        return result["id"]
+
+    async def poll_status(self, job_id: str, status_callback: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
         # 2. Poll for completion
         while True:
-            status = await self._request("GET", f"/generate/{job_id}")
+            status = await self._request("GET", f"/generate/{job_id}", route="/generate/{id}")
+            if status_callback:
+                status_callback(status)
             if status["status"] in ("completed", "failed"):
                 return status
-            await asyncio.sleep(2)
+            await asyncio.sleep(self.poll_interval)
 
-    async def download_audio(self, url: str, dest_path: str, progress_callback: Optional[Callable[[int, int], None]] = None) -> None:
-        # 3. Download audio file with streaming
-        async with self._client.stream("GET", url, follow_redirects=True) as response:
-            if response.status_code != 200:
+    async def download_audio(self, url: str, dest_path: str, progress_callback: Optional[Callable[[int, int], None]] = None, resume: bool = False) -> int:
+        # 3. Download audio file with streaming. With resume=True an existing partial
+        # file is continued with a Range request; returns the final file size.
+        offset = os.path.getsize(dest_path) if resume and os.path.exists(dest_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        started = time.perf_counter()
+        downloaded = 0
+        async with self._client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+            if offset and response.status_code == 416:
+                # Nothing left to fetch if the partial file already has every byte
+                total = _content_range_total(response.headers.get("content-range"))
+                if total == offset:
+                    logger.info(f"Audio already fully downloaded to {dest_path}")
+                    return offset
+                offset = -1
+            elif offset and response.status_code == 206:
+                if not response.headers.get("content-range", "").startswith(f"bytes {offset}-"):
+                    offset = -1
+            elif response.status_code == 200:
+                # Server ignored the range (or there was none): start over
+                offset = 0
+            else:
                 logger.error(f"Failed to download audio: {response.status_code}")
                 raise StableAudioAPIError(f"Failed to download audio: {response.status_code}")
-            total = int(response.headers.get("content-length", 0))
-            downloaded = 0
-            with open(dest_path, "wb") as f:
-                async for chunk in response.aiter_bytes():
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    if progress_callback:
-                        progress_callback(downloaded, total)
-        logger.info(f"Audio downloaded to {dest_path}")
+            if offset >= 0:
+                total = offset + int(response.headers.get("content-length", 0))
+                with open(dest_path, "ab" if offset else "wb") as f:
+                    async for chunk in response.aiter_bytes():
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        if progress_callback:
+                            progress_callback(offset + downloaded, total)
+        if offset < 0:
+            # Partial file is longer than or inconsistent with the upstream file
+            logger.warning(f"Discarding inconsistent partial download {dest_path}")
+            os.remove(dest_path)
+            return await self.download_audio(url, dest_path, progress_callback)
+        elapsed = time.perf_counter() - started
+        metrics.UPSTREAM_REQUEST_SECONDS.labels("GET", "download", str(response.status_code)).observe(elapsed)
+        metrics.DOWNLOAD_BYTES.inc(downloaded)
+        if elapsed > 0:
+            metrics.DOWNLOAD_THROUGHPUT.observe(downloaded / elapsed)
+        logger.info(f"Audio downloaded to {dest_path}" + (f" (resumed at byte {offset})" if offset else ""))
+        return offset + downloaded
 
     async def close(self):
         await self._client.aclose()
@@ -0,0 +1,221 @@
+import os
+import asyncio
+import aiofiles
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+import uuid
+import logging
+
+from fastapi import UploadFile
+
+from app.services.file_storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# Read-through local disk cache in front of another (usually remote) backend
+class CachedStorageBackend(StorageBackend):
+    def __init__(self, origin: StorageBackend, cache_dir: Path, max_bytes: int = 5 * 1024**3):
+        self.origin = origin
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = asyncio.Lock()
+        # key -> size in bytes, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._index_existing()
+
+    # --- StorageBackend interface ---
+    async def save(self, file: UploadFile, dest_path: Path) -> Path:
+        saved = await self.origin.save(file, dest_path)
+        # Write-through so freshly uploaded tracks are hot right away
+        await file.seek(0)
+        try:
+            await self._store_upload(self._key(dest_path), file)
+        except OSError as e:
+            logger.warning(f"Cache write-through failed for {dest_path}: {e}")
+        await file.seek(0)
+        return saved
+
+    async def put(self, dest_path: Path, data: bytes) -> Path:
+        saved = await self.origin.put(dest_path, data)
+        try:
+            await self._store_bytes(self._key(dest_path), data)
+        except OSError as e:
+            logger.warning(f"Cache write-through failed for {dest_path}: {e}")
+        return saved
+
+    async def delete(self, path: Path) -> None:
+        await self.origin.delete(path)
+        async with self.lock:
+            self._drop(self._key(path))
+
+    async def exists(self, path: Path) -> bool:
+        if self._key(path) in self._entries:
+            return True
+        return await self.origin.exists(path)
+
+    async def get(self, path: Path) -> bytes:
+        local = await self._pull(path)
+        if isinstance(local, bytes):
+            # Too large to cache; the origin's bytes are the answer
+            return local
+        try:
+            async with aiofiles.open(local, 'rb') as f:
+                return await f.read()
+        except FileNotFoundError:
+            # Evicted between lookup and read
+            async with self.lock:
+                self._drop(self._key(path))
+            return await self.origin.get(path)
+
+    async def list(self, base: Path) -> List[Path]:
+        return await self.origin.list(base)
+
+    # --- Cache API ---
+    async def fetch(self, path: Path) -> Optional[Path]:
+        # Return a local path for `path`, pulling it from the origin on a miss;
+        # None when the object is larger than the whole cache and was not kept
+        local = await self._pull(path)
+        return local if isinstance(local, Path) else None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'evictions': self.evictions,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'size_bytes': self._size,
+            'max_bytes': self.max_bytes,
+        }
+
+    @property
+    def base_dir(self):
+        return getattr(self.origin, 'base_dir', self.cache_dir)
+
+    # --- Internals ---
+    async def _pull(self, path: Path) -> Union[Path, bytes]:
+        # The cached local path, or the origin's bytes when they don't fit.
+        # Concurrent misses for the same key share a single origin request.
+        key = self._key(path)
+        async with self.lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._local_path(key)
+            future = self._inflight.get(key)
+            if future is None:
+                self.misses += 1
+                future = asyncio.get_running_loop().create_future()
+                self._inflight[key] = future
+                owner = True
+            else:
+                self.coalesced += 1
+                owner = False
+        if not owner:
+            return await asyncio.shield(future)
+        try:
+            data = await self.origin.get(path)
+            local = await self._store_bytes(key, data) or data
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(local)
+            return local
+        finally:
+            async with self.lock:
+                self._inflight.pop(key, None)
+
+    async def _store_bytes(self, key: str, data: bytes) -> Optional[Path]:
+        if len(data) > self.max_bytes:
+            # Skip the disk write; _commit would discard it anyway
+            async with self.lock:
+                self._drop(key)
+            return None
+        tmp = self._tmp_path(key)
+        async with aiofiles.open(tmp, 'wb') as out:
+            await out.write(data)
+        return await self._commit(key, tmp, len(data))
+
+    async def _store_upload(self, key: str, file: UploadFile) -> Optional[Path]:
+        tmp = self._tmp_path(key)
+        size = 0
+        async with aiofiles.open(tmp, 'wb') as out:
+            while chunk := await file.read(1024 * 1024):
+                await out.write(chunk)
+                size += len(chunk)
+        return await self._commit(key, tmp, size)
+
+    async def _commit(self, key: str, tmp: Path, size: int) -> Optional[Path]:
+        local = self._local_path(key)
+        async with self.lock:
+            self._drop(key)
+            if size > self.max_bytes:
+                # Bigger than the whole cache: not kept, reads go to the origin
+                tmp.unlink(missing_ok=True)
+                return None
+            os.replace(tmp, local)
+            self._entries[key] = size
+            self._size += size
+            self._evict()
+        return local
+
+    def _evict(self) -> None:
+        # Caller holds self.lock
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, _ = next(iter(self._entries.items()))
+            self._drop(key)
+            self.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        # Caller holds self.lock
+        size = self._entries.pop(key, None)
+        if size is None:
+            return
+        self._size -= size
+        try:
+            os.remove(self._local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def _index_existing(self) -> None:
+        # Re-adopt files left by a previous process, oldest access first
+        files = []
+        for p in self.cache_dir.rglob('*'):
+            if not p.is_file():
+                continue
+            if p.name.endswith('.cachetmp'):
+                p.unlink(missing_ok=True)
+                continue
+            st = p.stat()
+            files.append((st.st_atime, p.relative_to(self.cache_dir).as_posix(), st.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+    def _key(self, path: Path) -> str:
+        return Path(path).as_posix().lstrip('/')
+
+    def _local_path(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def _tmp_path(self, key: str) -> Path:
+        local = self._local_path(key)
+        local.parent.mkdir(parents=True, exist_ok=True)
+        return local.with_name(f"{local.name}.{uuid.uuid4().hex[:8]}.cachetmp")
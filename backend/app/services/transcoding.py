@@ -0,0 +1,295 @@
+import os
+import time
+import asyncio
+import aiofiles
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+import logging
+
+from app.config.settings import settings
+from app.utils import file_utils
+
+logger = logging.getLogger(__name__)
+
+# Output formats the service will produce: ffmpeg muxer, codec, file extension, media type
+FORMATS: Dict[str, Dict[str, Any]] = {
+    "mp3": {"format": "mp3", "codec": "libmp3lame", "ext": "mp3", "media_type": "audio/mpeg"},
+    "opus": {"format": "ogg", "codec": "libopus", "ext": "opus", "media_type": "audio/ogg"},
+    # Fragmented MP4 so the output can be written (and streamed) from a pipe
+    "aac": {"format": "ipod", "codec": "aac", "ext": "m4a", "media_type": "audio/mp4",
+            "parameters": ["-movflags", "+frag_keyframe+empty_moov+default_base_moof"]},
+    "flac": {"format": "flac", "codec": "flac", "ext": "flac", "media_type": "audio/flac"},
+    "wav": {"format": "wav", "codec": "pcm_s16le", "ext": "wav", "media_type": "audio/wav"},
+}
+
+# A .part not written to for this long belongs to an encode that died with its process
+STALE_PART_SECONDS = 600
+# Remembered source hashes (a few hundred bytes each), least recently used dropped first
+MAX_HASHES = 10_000
+
+class TranscodeError(Exception):
+    pass
+
+@dataclass(frozen=True)
+class TranscodeSpec:
+    format: str
+    bitrate: Optional[str] = None
+    normalize: bool = False
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    max_seconds: Optional[float] = None
+
+    def __post_init__(self):
+        if self.format not in FORMATS:
+            raise ValueError(f"Unsupported target format: {self.format}")
+
+    @property
+    def ext(self) -> str:
+        return FORMATS[self.format]["ext"]
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format]["media_type"]
+
+    def slug(self) -> str:
+        parts = [self.format, self.bitrate or "auto", "norm" if self.normalize else "raw"]
+        if self.sample_rate:
+            parts.append(f"{self.sample_rate}hz")
+        if self.channels:
+            parts.append(f"{self.channels}ch")
+        if self.max_seconds:
+            parts.append(f"{self.max_seconds:g}s")
+        return "_".join(parts)
+
+class _Job:
+    def __init__(self, tmp_path: Path):
+        self.tmp_path = tmp_path
+        self.size = 0
+        self.done = False
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+class TranscodingService:
+    # Transcodes are keyed by (content hash, spec): identical requests share one ffmpeg run
+    # and one cached output, regardless of the source file's name or location.
+    def __init__(self, cache_dir: Path, max_bytes: int = 2 * 1024**3, max_workers: int = 2, ffmpeg: str = "ffmpeg"):
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ffmpeg = ffmpeg
+        self.semaphore = asyncio.Semaphore(max_workers)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._jobs: Dict[str, _Job] = {}
+        # path -> (size, mtime, sha256) so unchanged sources are only hashed once
+        self._hashes: "OrderedDict[str, Tuple[int, float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # The cache directory is scanned once, off the event loop, at startup or first use
+        self._index_task: Optional[asyncio.Future] = None
+
+    async def content_hash(self, source: Path) -> str:
+        st = source.stat()
+        cached = self._hashes.get(str(source))
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime:
+            self._hashes.move_to_end(str(source))
+            return cached[2]
+        digest = await asyncio.to_thread(file_utils.hash_file, source)
+        self._hashes[str(source)] = (st.st_size, st.st_mtime, digest)
+        self._hashes.move_to_end(str(source))
+        while len(self._hashes) > MAX_HASHES:
+            self._hashes.popitem(last=False)
+        return digest
+
+    async def cached(self, source: Path, spec: TranscodeSpec) -> Optional[Path]:
+        key = await self._key(source, spec)
+        return self._path(key) if key in self._entries else None
+
+    async def transcode(self, source: Path, spec: TranscodeSpec) -> Path:
+        key = await self._key(source, spec)
+        hit = self._lookup(key)
+        if hit is not None:
+            return hit
+        job = self._job_for(key, source, spec)
+        await asyncio.shield(job.task)
+        return self._path(key)
+
+    async def stream(self, source: Path, spec: TranscodeSpec, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+        # Yields output as soon as ffmpeg produces it; later readers of the same
+        # transcode tail the same partial file instead of starting another encode.
+        key = await self._key(source, spec)
+        hit = self._lookup(key)
+        if hit is not None:
+            async with aiofiles.open(hit, 'rb') as f:
+                while chunk := await f.read(chunk_size):
+                    yield chunk
+            return
+        job = self._job_for(key, source, spec)
+        try:
+            partial = await aiofiles.open(job.tmp_path, 'rb')
+        except FileNotFoundError:
+            # The job finished while the file was being opened: its .part was either
+            # published (read the cache entry) or removed after a failure (re-raise)
+            await asyncio.shield(job.task)
+            async with aiofiles.open(self._path(key), 'rb') as f:
+                while chunk := await f.read(chunk_size):
+                    yield chunk
+            return
+        offset = 0
+        try:
+            while True:
+                chunk = await partial.read(chunk_size)
+                if chunk:
+                    offset += len(chunk)
+                    yield chunk
+                    continue
+                if job.done:
+                    if job.task.exception() is not None:
+                        raise job.task.exception()
+                    if offset >= job.size:
+                        return
+                    continue
+                async with job.changed:
+                    await job.changed.wait_for(lambda: job.done or job.size > offset)
+        finally:
+            await partial.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'active_jobs': len(self._jobs),
+            'entries': len(self._entries),
+            'size_bytes': self._size,
+            'max_bytes': self.max_bytes,
+        }
+
+    async def load_index(self) -> None:
+        if self._index_task is None:
+            self._index_task = asyncio.ensure_future(asyncio.to_thread(self._index_existing))
+        await self._index_task
+
+    async def _key(self, source: Path, spec: TranscodeSpec) -> str:
+        await self.load_index()
+        digest = await self.content_hash(source)
+        return f"{digest[:32]}_{spec.slug()}.{spec.ext}"
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key
+
+    def _lookup(self, key: str) -> Optional[Path]:
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._path(key)
+        return None
+
+    def _job_for(self, key: str, source: Path, spec: TranscodeSpec) -> _Job:
+        job = self._jobs.get(key)
+        if job is not None:
+            self.coalesced += 1
+            return job
+        self.misses += 1
+        tmp = self.cache_dir / f".{key}.{os.getpid()}.part"
+        tmp.touch()
+        job = _Job(tmp)
+        self._jobs[key] = job
+        job.task = asyncio.create_task(self._run(key, source, spec, job))
+        # Errors are re-raised to whoever awaits or streams the job
+        job.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return job
+
+    def _command(self, source: Path, spec: TranscodeSpec) -> List[str]:
+        fmt = FORMATS[spec.format]
+        cmd = [self.ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-i", str(source), "-vn"]
+        if spec.max_seconds:
+            cmd += ["-t", f"{spec.max_seconds:g}"]
+        if spec.normalize:
+            cmd += ["-af", "loudnorm=I=-16:TP=-1.5:LRA=11"]
+        if spec.sample_rate:
+            cmd += ["-ar", str(spec.sample_rate)]
+        if spec.channels:
+            cmd += ["-ac", str(spec.channels)]
+        cmd += ["-c:a", fmt["codec"]]
+        if spec.bitrate:
+            cmd += ["-b:a", spec.bitrate]
+        cmd += fmt.get("parameters", [])
+        cmd += ["-f", fmt["format"], "pipe:1"]
+        return cmd
+
+    async def _run(self, key: str, source: Path, spec: TranscodeSpec, job: _Job) -> None:
+        try:
+            async with self.semaphore:
+                proc = await asyncio.create_subprocess_exec(
+                    *self._command(source, spec),
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+                stderr = asyncio.create_task(proc.stderr.read())
+                try:
+                    async with aiofiles.open(job.tmp_path, 'wb') as out:
+                        while chunk := await proc.stdout.read(256 * 1024):
+                            await out.write(chunk)
+                            await out.flush()
+                            job.size += len(chunk)
+                            async with job.changed:
+                                job.changed.notify_all()
+                    returncode = await proc.wait()
+                except BaseException:
+                    if proc.returncode is None:
+                        proc.kill()
+                    raise
+                if returncode != 0:
+                    message = (await stderr).decode(errors="replace").strip()[-500:]
+                    raise TranscodeError(f"ffmpeg exited with {returncode}: {message}")
+            # Atomic publish: readers never see a partially written cache entry
+            os.replace(job.tmp_path, self._path(key))
+            self._entries[key] = job.size
+            self._size += job.size
+            self._evict()
+            logger.info(f"Transcoded {source} -> {key} ({job.size} bytes)")
+        except BaseException:
+            job.tmp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            job.done = True
+            self._jobs.pop(key, None)
+            async with job.changed:
+                job.changed.notify_all()
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            self._path(key).unlink(missing_ok=True)
+
+    def _index_existing(self) -> None:
+        files = []
+        now = time.time()
+        for p in self.cache_dir.iterdir():
+            if not p.is_file():
+                continue
+            st = p.stat()
+            if p.name.endswith('.part'):
+                # The cache dir may be shared: other processes' encodes are still being
+                # written, so only our own leftovers and long-idle partials are removed
+                pid = p.name[:-len('.part')].rsplit('.', 1)[-1]
+                if pid == str(os.getpid()) or now - st.st_mtime > STALE_PART_SECONDS:
+                    p.unlink(missing_ok=True)
+                continue
+            files.append((st.st_atime, p.name, st.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._size += size
+        self._evict()
+
+transcoding_service = TranscodingService(
+    Path(settings.TRANSCODE_CACHE_PATH),
+    max_bytes=settings.TRANSCODE_CACHE_MAX_BYTES,
+    max_workers=settings.TRANSCODE_WORKERS,
+    ffmpeg=settings.FFMPEG_BINARY,
+)
@@ -0,0 +1,192 @@
+import asyncio
+import base64
+import hashlib
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+import aiofiles
+import orjson
+from fastapi import HTTPException
+import logging
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# tus-style resumable uploads (https://tus.io/protocols/resumable-upload): the
+# client declares the length up front, appends chunks at the offset the server
+# reports, and after an interruption asks for the offset and carries on. Bytes
+# go straight to a .part file and into a running SHA-256, so memory per upload
+# is one chunk regardless of file size.
+
+CHECKSUM_MISMATCH = 460
+HASH_BLOCK = 1024 * 1024
+
+class UploadInterrupted(Exception):
+    # Raised by the body iterator when the client goes away mid-chunk
+    pass
+
+def _hash_prefix(path: Path, length: int):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(HASH_BLOCK, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+class ResumableUploadService:
+    def __init__(self, directory: Path, max_length: int, expiry: float):
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_length = max_length
+        self.expiry = expiry
+        # upload id -> (offset the hash covers, running hash); rebuilt from disk when stale
+        self._hashers: Dict[str, Tuple[int, Any]] = {}
+        self._active: Set[str] = set()
+        self._last_expire = 0.0
+
+    def create(self, length: int, metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        if length <= 0:
+            raise HTTPException(400, "Upload-Length must be positive")
+        if length > self.max_length:
+            raise HTTPException(413, f"Upload exceeds {self.max_length} bytes")
+        self.expire()
+        upload_id = uuid.uuid4().hex
+        info = {"id": upload_id, "length": length, "metadata": metadata or {}, "created_at": time.time()}
+        tmp = self._info_path(upload_id).with_suffix(".tmp")
+        tmp.write_bytes(orjson.dumps(info))
+        self._part_path(upload_id).touch()
+        os.replace(tmp, self._info_path(upload_id))
+        self._hashers[upload_id] = (0, hashlib.sha256())
+        return {**info, "offset": 0}
+
+    def get(self, upload_id: str) -> Dict[str, Any]:
+        info_path = self._info_path(upload_id)
+        if not upload_id.isalnum() or not info_path.exists():
+            raise HTTPException(404, "Upload not found")
+        info = orjson.loads(info_path.read_bytes())
+        # The data file is the source of truth for the offset: it survives restarts
+        info["offset"] = self._part_path(upload_id).stat().st_size
+        return info
+
+    async def append(self, upload_id: str, offset: int, chunks: AsyncIterator[bytes], checksum: Optional[str] = None) -> int:
+        info = self.get(upload_id)
+        if upload_id in self._active:
+            raise HTTPException(409, "Another request is writing to this upload")
+        if offset != info["offset"]:
+            raise HTTPException(409, "Upload-Offset does not match", headers={"Upload-Offset": str(info["offset"])})
+        verify = self._parse_checksum(checksum) if checksum else None
+        self._active.add(upload_id)
+        hasher, written = None, 0
+        try:
+            hasher = await self._hasher(upload_id, offset)
+            before = hasher.copy() if verify else None
+            chunk_hasher = hashlib.new(verify[0]) if verify else None
+            interrupted = rollback = False
+            try:
+                async with aiofiles.open(self._part_path(upload_id), "ab") as f:
+                    try:
+                        async for chunk in chunks:
+                            if offset + written + len(chunk) > info["length"]:
+                                raise HTTPException(413, "Chunk extends past Upload-Length")
+                            await f.write(chunk)
+                            hasher.update(chunk)
+                            if chunk_hasher is not None:
+                                chunk_hasher.update(chunk)
+                            written += len(chunk)
+                    except UploadInterrupted:
+                        interrupted = True
+                if verify and not interrupted and chunk_hasher.digest() != verify[1]:
+                    raise HTTPException(CHECKSUM_MISMATCH, "Checksum mismatch")
+                rollback = bool(verify) and interrupted
+            except BaseException:
+                rollback = bool(verify)
+                raise
+            finally:
+                if rollback:
+                    # A checksummed chunk is all or nothing, whatever cut it short:
+                    # roll the file and the hash back
+                    await asyncio.to_thread(os.truncate, self._part_path(upload_id), offset)
+                    hasher, written = before, 0
+            if interrupted and not verify:
+                logger.info(f"Upload {upload_id} interrupted at offset {offset + written}")
+        finally:
+            self._active.discard(upload_id)
+            if hasher is not None:
+                # Whatever happened, the hash covers exactly the bytes now on disk
+                self._hashers[upload_id] = (offset + written, hasher)
+        return offset + written
+
+    async def finalize(self, upload_id: str, dest_dir: Path, name: str, expected_sha256: Optional[str] = None) -> Dict[str, Any]:
+        info = self.get(upload_id)
+        if info["offset"] != info["length"]:
+            raise HTTPException(409, f"Upload incomplete: {info['offset']} of {info['length']} bytes", headers={"Upload-Offset": str(info["offset"])})
+        sha256 = (await self._hasher(upload_id, info["offset"])).hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha256:
+            raise HTTPException(CHECKSUM_MISMATCH, "Checksum mismatch")
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        # Content-addressed: re-uploading the same file lands on the same name
+        dest = dest_dir / f"ref_{sha256[:16]}_{name}"
+        os.replace(self._part_path(upload_id), dest)
+        self.remove(upload_id)
+        return {"path": dest, "sha256": sha256, "size": info["length"], "metadata": info["metadata"]}
+
+    def remove(self, upload_id: str) -> None:
+        self._hashers.pop(upload_id, None)
+        self._info_path(upload_id).unlink(missing_ok=True)
+        self._part_path(upload_id).unlink(missing_ok=True)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        # Uploads nobody has written to within the expiry window are abandoned
+        now = now or time.time()
+        if now - self._last_expire < min(self.expiry, 60):
+            return 0
+        self._last_expire = now
+        expired = 0
+        for info_path in self.directory.glob("*.json"):
+            upload_id = info_path.stem
+            part = self._part_path(upload_id)
+            touched = part.stat().st_mtime if part.exists() else info_path.stat().st_mtime
+            if upload_id not in self._active and now - touched > self.expiry:
+                self.remove(upload_id)
+                expired += 1
+        if expired:
+            logger.info(f"Expired {expired} abandoned uploads")
+        return expired
+
+    async def _hasher(self, upload_id: str, offset: int):
+        cached = self._hashers.get(upload_id)
+        if cached is not None and cached[0] == offset:
+            return cached[1]
+        # After a restart the running hash is gone; catch up once from the bytes on disk
+        hasher = await asyncio.to_thread(_hash_prefix, self._part_path(upload_id), offset)
+        self._hashers[upload_id] = (offset, hasher)
+        return hasher
+
+    def _parse_checksum(self, value: str) -> Tuple[str, bytes]:
+        # tus checksum extension: "<algorithm> <base64 digest>"
+        try:
+            algorithm, digest = value.split(" ", 1)
+            if algorithm not in ("sha1", "sha256", "md5"):
+                raise ValueError(algorithm)
+            return algorithm, base64.b64decode(digest, validate=True)
+        except ValueError:
+            raise HTTPException(400, "Unsupported or malformed Upload-Checksum")
+
+    def _info_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.json"
+
+    def _part_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+upload_service = ResumableUploadService(
+    Path(settings.UPLOAD_STORAGE_PATH),
+    max_length=settings.UPLOAD_MAX_BYTES,
+    expiry=settings.UPLOAD_EXPIRY_SECONDS,
+)
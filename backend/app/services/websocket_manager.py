@@ -1,53 +1,202 @@
 import asyncio
-from typing import Dict, Set, Any
+from collections import deque
+from typing import Dict, Any, Deque, List, Optional
 from fastapi import WebSocket
+import orjson
 import logging
 
 logger = logging.getLogger(__name__)
 
+# What to do when a client can't keep up and its send queue is full
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"      # replace queued progress updates for the same job, then drop oldest
+DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+PING_MESSAGE = orjson.dumps({"type": "ping"}).decode()
+
+def serialize_message(message: Any) -> str:
+    if isinstance(message, str):
+        return message
+    return orjson.dumps(message, default=str).decode()
+
+def coalesce_key_for(message: Any) -> Optional[str]:
+    # Progress updates for one job supersede each other; everything else is kept
+    if not isinstance(message, dict):
+        return None
+    msg_type = message.get("type", "")
+    job_id = message.get("job_id", message.get("id"))
+    if msg_type.endswith("_progress") and job_id is not None:
+        return f"{msg_type}:{job_id}"
+    return None
+
+class _Connection:
+    __slots__ = ("user_id", "websocket", "queue", "pending", "wakeup", "writer", "last_activity", "dropped", "closed")
+
+    def __init__(self, user_id: str, websocket: WebSocket):
+        self.user_id = user_id
+        self.websocket = websocket
+        # Items are mutable [coalesce_key, text] pairs so coalescing can rewrite them in place
+        self.queue: Deque[List[Any]] = deque()
+        self.pending: Dict[str, List[Any]] = {}
+        self.wakeup = asyncio.Event()
+        self.writer: Optional[asyncio.Task] = None
+        self.last_activity = asyncio.get_running_loop().time()
+        self.dropped = 0
+        self.closed = False
+
 class WebSocketManager:
-    def __init__(self):
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+    def __init__(
+        self,
+        max_queue_size: int = 256,
+        slow_consumer_policy: str = COALESCE,
+        send_timeout: float = 10.0,
+        heartbeat_interval: float = 20.0,
+        heartbeat_timeout: float = 60.0,
+    ):
+        if slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {slow_consumer_policy}")
+        self.active_connections: Dict[str, Dict[WebSocket, _Connection]] = {}
         self.lock = asyncio.Lock()
+        self.max_queue_size = max_queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self._heartbeat_task: Optional[asyncio.Task] = None
 
     async def connect(self, user_id: str, websocket: WebSocket):
         await websocket.accept()
+        conn = _Connection(user_id, websocket)
+        conn.writer = asyncio.create_task(self._writer(conn))
         async with self.lock:
-            if user_id not in self.active_connections:
-                self.active_connections[user_id] = set()
-            self.active_connections[user_id].add(websocket)
+            self.active_connections.setdefault(user_id, {})[websocket] = conn
+        if self.heartbeat_interval and (self._heartbeat_task is None or self._heartbeat_task.done()):
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
         logger.info(f"WebSocket connected: {user_id}")
 
     async def disconnect(self, user_id: str, websocket: WebSocket):
         async with self.lock:
-            if user_id in self.active_connections:
-                self.active_connections[user_id].discard(websocket)
-                if not self.active_connections[user_id]:
-                    del self.active_connections[user_id]
+            conns = self.active_connections.get(user_id)
+            conn = conns.pop(websocket, None) if conns is not None else None
+            if conns is not None and not conns:
+                del self.active_connections[user_id]
+        if conn is None:
+            return
+        conn.closed = True
+        if conn.writer is not None and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
         logger.info(f"WebSocket disconnected: {user_id}")
 
-    async def send_personal_message(self, user_id: str, message: Any):
-        async with self.lock:
-            conns = self.active_connections.get(user_id, set()).copy()
-        for ws in conns:
-            try:
-                await ws.send_json(message)
-            except Exception as e:
-                logger.error(f"Failed to send message to {user_id}: {e}")
+    def touch(self, websocket: WebSocket, user_id: str):
+        # Called when the client sends anything (including pong replies)
+        conn = self.active_connections.get(user_id, {}).get(websocket)
+        if conn is not None:
+            conn.last_activity = asyncio.get_running_loop().time()
 
-    async def broadcast(self, message: Any):
-        async with self.lock:
-            all_conns = [ws for conns in self.active_connections.values() for ws in conns]
-        for ws in all_conns:
-            try:
-                await ws.send_json(message)
-            except Exception as e:
-                logger.error(f"Broadcast failed: {e}")
+    async def send_personal_message(self, user_id: str, message: Any, coalesce_key: Optional[str] = None):
+        conns = self.active_connections.get(user_id)
+        if not conns:
+            return
+        text = serialize_message(message)
+        key = coalesce_key or coalesce_key_for(message)
+        for conn in list(conns.values()):
+            self._enqueue(conn, text, key)
+
+    async def broadcast(self, message: Any, coalesce_key: Optional[str] = None):
+        # Serialize once and only enqueue; per-connection writers do the actual sends
+        text = serialize_message(message)
+        key = coalesce_key or coalesce_key_for(message)
+        for conns in list(self.active_connections.values()):
+            for conn in list(conns.values()):
+                self._enqueue(conn, text, key)
+
+    def connection_count(self) -> int:
+        return sum(len(conns) for conns in self.active_connections.values())
+
+    def queue_lengths(self) -> List[int]:
+        return [len(conn.queue) for conns in self.active_connections.values() for conn in conns.values()]
 
     async def cleanup(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
         async with self.lock:
-            for user_id, conns in list(self.active_connections.items()):
-                for ws in list(conns):
-                    await ws.close()
-                self.active_connections[user_id].clear()
+            conns = [conn for user_conns in self.active_connections.values() for conn in user_conns.values()]
             self.active_connections.clear()
+        for conn in conns:
+            conn.closed = True
+            if conn.writer is not None:
+                conn.writer.cancel()
+            try:
+                await conn.websocket.close()
+            except Exception:
+                pass
+
+    def _enqueue(self, conn: _Connection, text: str, key: Optional[str]):
+        if conn.closed:
+            return
+        if key is not None and self.slow_consumer_policy == COALESCE:
+            queued = conn.pending.get(key)
+            if queued is not None:
+                queued[1] = text
+                return
+        if len(conn.queue) >= self.max_queue_size:
+            if self.slow_consumer_policy == DISCONNECT:
+                logger.warning(f"Disconnecting slow WebSocket consumer: {conn.user_id}")
+                self._drop_connection(conn, code=1008)
+                return
+            oldest = conn.queue.popleft()
+            if oldest[0] is not None and conn.pending.get(oldest[0]) is oldest:
+                del conn.pending[oldest[0]]
+            conn.dropped += 1
+        item = [key, text]
+        conn.queue.append(item)
+        if key is not None:
+            conn.pending[key] = item
+        conn.wakeup.set()
+
+    async def _writer(self, conn: _Connection):
+        try:
+            while not conn.closed:
+                if not conn.queue:
+                    conn.wakeup.clear()
+                    await conn.wakeup.wait()
+                    continue
+                item = conn.queue.popleft()
+                if item[0] is not None and conn.pending.get(item[0]) is item:
+                    del conn.pending[item[0]]
+                # Liveness is not updated here: a send to a dead peer usually succeeds
+                # into the kernel buffer, so only inbound messages (touch) count
+                await asyncio.wait_for(conn.websocket.send_text(item[1]), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to send message to {conn.user_id}: {e}")
+            self._drop_connection(conn, code=1011)
+
+    async def _heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            now = loop.time()
+            for conns in list(self.active_connections.values()):
+                for conn in list(conns.values()):
+                    if now - conn.last_activity > self.heartbeat_timeout:
+                        logger.warning(f"WebSocket heartbeat timed out: {conn.user_id}")
+                        self._drop_connection(conn, code=1011)
+                    else:
+                        self._enqueue(conn, PING_MESSAGE, "ping")
+
+    def _drop_connection(self, conn: _Connection, code: int):
+        if conn.closed:
+            return
+        conn.closed = True
+        asyncio.create_task(self._close(conn, code))
+
+    async def _close(self, conn: _Connection, code: int):
+        await self.disconnect(conn.user_id, conn.websocket)
+        try:
+            await asyncio.wait_for(conn.websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
@@ -0,0 +1,362 @@
+import os
+import struct
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional, Dict, Any, BinaryIO, Tuple, Union
+
+# Header-only probing for the containers we accept on ingest. Only container/stream
+# headers (plus the tail of the file for Ogg/MP3) are read, so the cost does not grow
+# with file length. Decoding stays the fallback for anything this can't parse.
+
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 64 * 1024
+
+class UnsupportedFormatError(ValueError):
+    pass
+
+class AudioHeaderError(ValueError):
+    pass
+
+@dataclass
+class AudioInfo:
+    format: str
+    mime_type: str
+    duration: float
+    sample_rate: int
+    channels: int
+    bitrate: int
+    codec: Optional[str] = None
+    truncated: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def probe(file_path: Union[str, Path]) -> AudioInfo:
+    try:
+        return _probe(file_path)
+    except (struct.error, IndexError) as e:
+        # Short reads inside a header are corruption, not a parser bug
+        raise AudioHeaderError(f"Malformed audio header: {e}")
+
+def _probe(file_path: Union[str, Path]) -> AudioInfo:
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(HEAD_BYTES)
+        if len(head) < 12:
+            raise AudioHeaderError("File too short to be audio")
+        if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+            return _probe_wav(f, size)
+        if head[:4] == b'OggS':
+            return _probe_ogg(f, head, size)
+        if head[4:8] == b'ftyp':
+            return _probe_mp4(f, size)
+        start = _id3v2_size(head)
+        if head[start:start + 4] == b'fLaC':
+            return _probe_flac(f, start, size)
+        if head[:3] == b'ID3' or _is_mp3_sync(head, 0):
+            return _probe_mp3(f, head, start, size)
+    raise UnsupportedFormatError("Unrecognized audio container")
+
+# --- WAV ---
+def _probe_wav(f: BinaryIO, size: int) -> AudioInfo:
+    riff_size = struct.unpack('<I', _read_at(f, 4, 4))[0]
+    # Streaming writers (ffmpeg to a pipe) leave the RIFF size as a placeholder too
+    truncated = riff_size not in (0, 0xFFFFFFFF) and riff_size + 8 > size
+    offset = 12
+    fmt = None
+    data_size = data_offset = None
+    while offset + 8 <= size:
+        chunk_id, chunk_size = struct.unpack('<4sI', _read_at(f, offset, 8))
+        body = offset + 8
+        if chunk_id == b'fmt ':
+            if chunk_size < 16:
+                raise AudioHeaderError("Invalid WAV fmt chunk")
+            fmt = struct.unpack('<HHIIHH', _read_at(f, body, 16))
+        elif chunk_id == b'data':
+            data_offset, data_size = body, chunk_size
+            if fmt is not None:
+                break
+        offset = body + chunk_size + (chunk_size & 1)
+    if fmt is None or data_size is None:
+        raise AudioHeaderError("WAV is missing fmt or data chunk")
+    audio_format, channels, sample_rate, byte_rate, block_align, bits = fmt
+    if not channels or not sample_rate or not byte_rate:
+        raise AudioHeaderError("WAV fmt chunk has zero rate or channels")
+    available = size - data_offset
+    if data_size in (0, 0xFFFFFFFF):
+        # Streaming writers leave the size unset; trust the file length
+        data_size = available
+    elif data_size > available:
+        truncated = True
+        data_size = available
+    return AudioInfo(
+        format='wav', mime_type='audio/wav', codec='pcm' if audio_format in (1, 0xFFFE) else f'wav_{audio_format}',
+        duration=data_size / byte_rate, sample_rate=sample_rate, channels=channels,
+        bitrate=byte_rate * 8, truncated=truncated,
+    )
+
+# --- FLAC ---
+def _probe_flac(f: BinaryIO, start: int, size: int) -> AudioInfo:
+    offset = start + 4
+    info = None
+    while True:
+        header = _read_at(f, offset, 4)
+        if len(header) < 4:
+            raise AudioHeaderError("FLAC metadata is truncated")
+        last, block_type = header[0] & 0x80, header[0] & 0x7F
+        length = int.from_bytes(header[1:4], 'big')
+        if block_type == 0:
+            block = _read_at(f, offset + 4, 34)
+            if len(block) < 34:
+                raise AudioHeaderError("FLAC STREAMINFO is truncated")
+            packed = int.from_bytes(block[10:18], 'big')
+            sample_rate = packed >> 44
+            channels = ((packed >> 41) & 0x7) + 1
+            total_samples = packed & 0xFFFFFFFFF
+            info = (sample_rate, channels, total_samples)
+        offset += 4 + length
+        if last:
+            break
+        if offset > size:
+            raise AudioHeaderError("FLAC metadata is truncated")
+    if info is None or not info[0]:
+        raise AudioHeaderError("FLAC is missing STREAMINFO")
+    sample_rate, channels, total_samples = info
+    sync = _read_at(f, offset, 2)
+    truncated = len(sync) < 2 or sync[0] != 0xFF or (sync[1] & 0xFE) != 0xF8
+    duration = total_samples / sample_rate
+    audio_bytes = max(size - offset, 0)
+    return AudioInfo(
+        format='flac', mime_type='audio/flac', codec='flac', duration=duration,
+        sample_rate=sample_rate, channels=channels,
+        bitrate=int(audio_bytes * 8 / duration) if duration else 0, truncated=truncated,
+    )
+
+# --- MP3 ---
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_BITRATES[(2, 3)] = _MP3_BITRATES[(2, 2)]
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+def _id3v2_size(head: bytes) -> int:
+    if head[:3] != b'ID3' or len(head) < 10:
+        return 0
+    size = (head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F)
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _is_mp3_sync(buf: bytes, pos: int) -> bool:
+    return _mp3_frame(buf, pos) is not None
+
+def _mp3_frame(buf: bytes, pos: int) -> Optional[Dict[str, int]]:
+    if pos + 4 > len(buf) or buf[pos] != 0xFF or (buf[pos + 1] & 0xE0) != 0xE0:
+        return None
+    version_bits = (buf[pos + 1] >> 3) & 0x3
+    layer_bits = (buf[pos + 1] >> 1) & 0x3
+    bitrate_index = buf[pos + 2] >> 4
+    rate_index = (buf[pos + 2] >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    layer = 4 - layer_bits
+    version = 1 if version_bits == 3 else 2
+    bitrate = _MP3_BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version_bits][rate_index]
+    padding = (buf[pos + 2] >> 1) & 0x1
+    mono = (buf[pos + 3] >> 6) == 3
+    if layer == 1:
+        length = (12 * bitrate // sample_rate + padding) * 4
+        samples = 384
+    else:
+        factor = 72 if (layer == 3 and version == 2) else 144
+        length = factor * bitrate // sample_rate + padding
+        samples = 576 if (layer == 3 and version == 2) else 1152
+    return {"version": version, "layer": layer, "bitrate": bitrate, "sample_rate": sample_rate,
+            "channels": 1 if mono else 2, "length": length, "samples": samples}
+
+def _probe_mp3(f: BinaryIO, head: bytes, start: int, size: int) -> AudioInfo:
+    buf = head if start + 4 <= len(head) else _read_at(f, start, HEAD_BYTES)
+    base = 0 if buf is head else start
+    pos = start - base
+    frame = None
+    # Find a frame header that is confirmed by the following frame header
+    while pos + 4 <= len(buf):
+        candidate = _mp3_frame(buf, pos)
+        if candidate is not None:
+            nxt = pos + candidate["length"]
+            if nxt + 4 > len(buf) or _mp3_frame(buf, nxt) is not None:
+                frame = candidate
+                break
+        pos += 1
+    if frame is None:
+        raise AudioHeaderError("No MPEG audio frame found")
+    audio_start = base + pos
+    audio_end = size
+    if size >= 128 and _read_at(f, size - 128, 3) == b'TAG':
+        audio_end -= 128
+    truncated = False
+    frames = stream_bytes = None
+    # Xing/Info (LAME) or VBRI headers carry exact frame counts for VBR files
+    side_info = (32 if frame["channels"] == 2 else 17) if frame["version"] == 1 else (17 if frame["channels"] == 2 else 9)
+    xing_at = pos + 4 + side_info
+    tag = buf[xing_at:xing_at + 4]
+    if tag in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', buf[xing_at + 4:xing_at + 8])[0]
+        cursor = xing_at + 8
+        if flags & 0x1:
+            frames = struct.unpack('>I', buf[cursor:cursor + 4])[0]
+            cursor += 4
+        if flags & 0x2:
+            stream_bytes = struct.unpack('>I', buf[cursor:cursor + 4])[0]
+    elif buf[pos + 36:pos + 40] == b'VBRI':
+        stream_bytes, frames = struct.unpack('>II', buf[pos + 46:pos + 54])
+    if stream_bytes:
+        truncated = audio_start + stream_bytes > audio_end + frame["length"]
+    if frames:
+        duration = frames * frame["samples"] / frame["sample_rate"]
+        bitrate = int((audio_end - audio_start) * 8 / duration) if duration else frame["bitrate"]
+    else:
+        bitrate = frame["bitrate"]
+        duration = (audio_end - audio_start) * 8 / bitrate
+    return AudioInfo(
+        format='mp3', mime_type='audio/mpeg', codec=f'mpeg{frame["version"]}_layer{frame["layer"]}',
+        duration=duration, sample_rate=frame["sample_rate"], channels=frame["channels"],
+        bitrate=bitrate, truncated=truncated,
+    )
+
+# --- Ogg (Vorbis / Opus) ---
+def _ogg_page(buf: bytes, pos: int) -> Optional[Tuple[int, int, int, int, int]]:
+    # Returns (header_type, granule, serial, header_len, body_len) for a page at pos
+    if buf[pos:pos + 4] != b'OggS' or pos + 27 > len(buf):
+        return None
+    header_type, granule, serial = struct.unpack('<BqI', buf[pos + 5:pos + 18])
+    nsegs = buf[pos + 26]
+    if pos + 27 + nsegs > len(buf):
+        return None
+    body_len = sum(buf[pos + 27:pos + 27 + nsegs])
+    return header_type, granule, serial, 27 + nsegs, body_len
+
+def _probe_ogg(f: BinaryIO, head: bytes, size: int) -> AudioInfo:
+    page = _ogg_page(head, 0)
+    if page is None:
+        raise AudioHeaderError("Invalid Ogg page")
+    _, _, serial, header_len, _ = page
+    packet = head[header_len:header_len + 64]
+    if packet[:7] == b'\x01vorbis':
+        channels = packet[11]
+        sample_rate, _, nominal, _ = struct.unpack('<Iiii', packet[12:28])
+        codec, granule_rate, pre_skip = 'vorbis', sample_rate, 0
+    elif packet[:8] == b'OpusHead':
+        channels = packet[9]
+        pre_skip = struct.unpack('<H', packet[10:12])[0]
+        sample_rate = struct.unpack('<I', packet[12:16])[0] or 48000
+        codec, granule_rate, nominal = 'opus', 48000, 0
+    else:
+        raise UnsupportedFormatError("Unsupported Ogg codec")
+    if not channels or not sample_rate:
+        raise AudioHeaderError("Ogg stream header has zero rate or channels")
+    tail_start = max(0, size - TAIL_BYTES)
+    tail = _read_at(f, tail_start, size - tail_start)
+    last = None
+    pos = tail.rfind(b'OggS')
+    while pos != -1:
+        candidate = _ogg_page(tail, pos)
+        if candidate is not None and candidate[2] == serial:
+            last = (pos, candidate)
+            break
+        pos = tail.rfind(b'OggS', 0, pos)
+    if last is None:
+        raise AudioHeaderError("No final Ogg page found")
+    pos, (header_type, granule, _, page_header_len, body_len) = last
+    # A complete stream ends with an end-of-stream page whose body is fully present
+    truncated = not (header_type & 0x04) or pos + page_header_len + body_len > len(tail)
+    duration = max(granule - pre_skip, 0) / granule_rate
+    bitrate = nominal if nominal > 0 else (int(size * 8 / duration) if duration else 0)
+    return AudioInfo(
+        format='ogg', mime_type='audio/ogg', codec=codec, duration=duration,
+        sample_rate=sample_rate, channels=channels, bitrate=bitrate, truncated=truncated,
+    )
+
+# --- MP4 / M4A ---
+_MP4_CONTAINERS = {b'moov', b'trak', b'mdia', b'minf', b'stbl'}
+_MP4_AUDIO_ENTRIES = {b'mp4a': 'aac', b'alac': 'alac', b'Opus': 'opus', b'fLaC': 'flac', b'ac-3': 'ac3'}
+
+def _mp4_boxes(f: BinaryIO, start: int, end: int, size: int):
+    offset = start
+    while offset + 8 <= end:
+        box_size, box_type = struct.unpack('>I4s', _read_at(f, offset, 8))
+        header = 8
+        if box_size == 1:
+            box_size = struct.unpack('>Q', _read_at(f, offset + 8, 8))[0]
+            header = 16
+        elif box_size == 0:
+            box_size = size - offset
+        if box_size < header:
+            raise AudioHeaderError(f"Invalid MP4 box size for {box_type!r}")
+        yield box_type, offset + header, offset + box_size
+        offset += box_size
+
+def _probe_mp4(f: BinaryIO, size: int) -> AudioInfo:
+    truncated = False
+    moov = None
+    mdat_bytes = 0
+    for box_type, body, box_end in _mp4_boxes(f, 0, size, size):
+        if box_end > size:
+            truncated = True
+        if box_type == b'moov':
+            moov = (body, min(box_end, size))
+        elif box_type == b'mdat':
+            mdat_bytes += min(box_end, size) - body
+    if moov is None:
+        raise AudioHeaderError("MP4 has no moov box")
+    found: Dict[str, Any] = {}
+    _walk_moov(f, moov[0], moov[1], size, found, None)
+    track = found.get('audio')
+    if track is None:
+        raise UnsupportedFormatError("MP4 has no audio track")
+    timescale, duration_units = track.get('mdhd', found.get('mvhd', (0, 0)))
+    if not timescale:
+        raise AudioHeaderError("MP4 has zero timescale")
+    duration = duration_units / timescale
+    sample_rate = track.get('sample_rate') or timescale
+    return AudioInfo(
+        format='m4a', mime_type='audio/mp4', codec=track.get('codec'), duration=duration,
+        sample_rate=sample_rate, channels=track.get('channels', 0),
+        bitrate=int(mdat_bytes * 8 / duration) if duration else 0, truncated=truncated,
+    )
+
+def _walk_moov(f: BinaryIO, start: int, end: int, size: int, found: Dict[str, Any], track: Optional[Dict[str, Any]]):
+    for box_type, body, box_end in _mp4_boxes(f, start, end, size):
+        if box_type == b'trak':
+            current: Dict[str, Any] = {}
+            _walk_moov(f, body, box_end, size, found, current)
+            if current.get('handler') == b'soun' and 'audio' not in found:
+                found['audio'] = current
+        elif box_type in _MP4_CONTAINERS:
+            _walk_moov(f, body, box_end, size, found, track)
+        elif box_type in (b'mvhd', b'mdhd'):
+            data = _read_at(f, body, 32)
+            if data[0] == 1:
+                timescale, duration_units = struct.unpack('>IQ', data[20:32])
+            else:
+                timescale, duration_units = struct.unpack('>II', data[12:20])
+            if box_type == b'mvhd':
+                found['mvhd'] = (timescale, duration_units)
+            elif track is not None:
+                track['mdhd'] = (timescale, duration_units)
+        elif box_type == b'hdlr' and track is not None:
+            track['handler'] = _read_at(f, body + 8, 4)
+        elif box_type == b'stsd' and track is not None:
+            entry = _read_at(f, body + 8, 36)
+            if len(entry) == 36 and entry[4:8] in _MP4_AUDIO_ENTRIES:
+                track['codec'] = _MP4_AUDIO_ENTRIES[entry[4:8]]
+                track['channels'] = struct.unpack('>H', entry[24:26])[0]
+                track['sample_rate'] = struct.unpack('>I', entry[32:36])[0] >> 16
+
+def _read_at(f: BinaryIO, offset: int, length: int) -> bytes:
+    f.seek(offset)
+    return f.read(length)
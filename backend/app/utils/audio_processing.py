@@ -1,7 +1,10 @@
 import os
 import logging
 import shutil
-from typing import Optional
+import time
+from typing import Optional, Dict, Tuple
+
+from app.utils import audio_headers
 
 logger = logging.getLogger(__name__)
 
@@ -21,21 +24,35 @@ def cleanup_file(file_path: str) -> None:
     except Exception as e:
         logger.error(f"Failed to clean up file {file_path}: {e}")
 
-def check_storage_space(path: str, min_free_mb: int = 100) -> bool:
-    total, used, free = shutil.disk_usage(path)
-    free_mb = free // (1024 * 1024)
+# path -> (checked_at, free_mb); free space changes slowly, so one statvfs per TTL is plenty
+_free_space: Dict[str, Tuple[float, int]] = {}
+
+def free_space_mb(path: str, ttl: float = 5.0) -> int:
+    now = time.monotonic()
+    cached = _free_space.get(path)
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+    free_mb = shutil.disk_usage(path).free // (1024 * 1024)
+    _free_space[path] = (now, free_mb)
+    return free_mb
+
+def check_storage_space(path: str, min_free_mb: int = 100, ttl: float = 5.0) -> bool:
+    free_mb = free_space_mb(path, ttl)
     if free_mb < min_free_mb:
         logger.error(f"Low storage space: {free_mb}MB free at {path}")
         return False
     return True
 
 def is_corrupted(file_path: str) -> bool:
-    # Dummy check for corruption (could use audio libraries for real check)
+    # Declared container sizes vs. actual file size; only headers and the file tail are read
     try:
-        with open(file_path, 'rb') as f:
-            header = f.read(4)
-            if not header:
-                return True
+        return audio_headers.probe(file_path).truncated
+    except audio_headers.UnsupportedFormatError:
+        # Unknown container: fall back to the old "has any bytes" check
+        try:
+            with open(file_path, 'rb') as f:
+                return not f.read(4)
+        except Exception:
+            return True
     except Exception:
         return True
-    return False
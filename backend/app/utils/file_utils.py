@@ -7,13 +7,17 @@ import asyncio
 from pathlib import Path
 from typing import Optional, Dict, Any, Tuple
 from fastapi import UploadFile, HTTPException
-from pydub import AudioSegment
-import magic
-import audioread
 import logging
 
+from app.utils import audio_headers
+from app.core import metrics
+
 logger = logging.getLogger(__name__)
 
+# pydub, libmagic and audioread are imported on first use: together they are a
+# noticeable share of import time (pydub also probes PATH for ffmpeg), and most
+# requests are answered from the header probe without touching any of them.
+
 SUPPORTED_FORMATS = {"audio/mpeg": "mp3", "audio/wav": "wav", "audio/x-wav": "wav", "audio/flac": "flac", "audio/x-flac": "flac", "audio/mp4": "m4a", "audio/x-m4a": "m4a", "audio/ogg": "ogg"}
 MAX_FILE_SIZE_MB = 100
 MAX_DURATION_SEC = 600
@@ -22,35 +26,40 @@ MIN_SAMPLE_RATE = 22050
 
 # --- File Validation ---
 def detect_mime_type(file_path: Path) -> str:
+    import magic
     mime = magic.Magic(mime=True)
     return mime.from_file(str(file_path))
 
 def validate_audio_file(file_path: Path) -> Dict[str, Any]:
-    mime_type = detect_mime_type(file_path)
-    if mime_type not in SUPPORTED_FORMATS:
-        raise HTTPException(415, f"Unsupported audio format: {mime_type}")
-    ext = SUPPORTED_FORMATS[mime_type]
     size_mb = file_path.stat().st_size / (1024 * 1024)
     if size_mb > MAX_FILE_SIZE_MB:
         raise HTTPException(413, f"File too large: {size_mb:.2f} MB")
-    # Analyze audio
+    # Header-only probe first: cost is independent of file length and nothing is decoded
     try:
-        with audioread.audio_open(str(file_path)) as f:
-            duration = f.duration
-            if duration > MAX_DURATION_SEC:
-                raise HTTPException(413, f"Audio too long: {duration:.1f} sec")
-            sample_rate = f.samplerate
-            channels = f.channels
-            bitrate = getattr(f, 'bitrate', None) or MIN_BITRATE
-    except Exception as e:
+        with metrics.AUDIO_PROCESSING_SECONDS.labels("validate_header").time():
+            info = audio_headers.probe(file_path)
+    except audio_headers.UnsupportedFormatError:
+        info = None
+    except audio_headers.AudioHeaderError as e:
         raise HTTPException(400, f"Invalid or corrupted audio: {e}")
+    if info is not None:
+        if info.truncated:
+            raise HTTPException(400, "Invalid or corrupted audio: file is truncated")
+        mime_type = info.mime_type
+        duration, sample_rate, channels = info.duration, info.sample_rate, info.channels
+        bitrate = info.bitrate or MIN_BITRATE
+    else:
+        with metrics.AUDIO_PROCESSING_SECONDS.labels("validate_decode").time():
+            mime_type, duration, sample_rate, channels, bitrate = _decode_audio_info(file_path)
+    if duration > MAX_DURATION_SEC:
+        raise HTTPException(413, f"Audio too long: {duration:.1f} sec")
     if sample_rate < MIN_SAMPLE_RATE:
         raise HTTPException(400, f"Sample rate too low: {sample_rate}")
     if bitrate < MIN_BITRATE:
         raise HTTPException(400, f"Bitrate too low: {bitrate}")
     return {
         "mime_type": mime_type,
-        "ext": ext,
+        "ext": SUPPORTED_FORMATS[mime_type],
         "size_mb": size_mb,
         "duration": duration,
         "sample_rate": sample_rate,
@@ -58,8 +67,22 @@ def validate_audio_file(file_path: Path) -> Dict[str, Any]:
         "bitrate": bitrate,
     }
 
+def _decode_audio_info(file_path: Path) -> Tuple[str, float, int, int, int]:
+    # Fallback for containers the header parser doesn't understand; may spawn a decoder
+    mime_type = detect_mime_type(file_path)
+    if mime_type not in SUPPORTED_FORMATS:
+        raise HTTPException(415, f"Unsupported audio format: {mime_type}")
+    import audioread
+    try:
+        with audioread.audio_open(str(file_path)) as f:
+            return mime_type, f.duration, f.samplerate, f.channels, getattr(f, 'bitrate', None) or MIN_BITRATE
+    except Exception as e:
+        raise HTTPException(400, f"Invalid or corrupted audio: {e}")
+
 # --- Audio Processing ---
+@metrics.AUDIO_PROCESSING_SECONDS.labels("extract_metadata").time()
 def extract_metadata(file_path: Path) -> Dict[str, Any]:
+    from pydub import AudioSegment
     audio = AudioSegment.from_file(file_path)
     return {
         "duration": len(audio) / 1000.0,
@@ -70,19 +93,24 @@ def extract_metadata(file_path: Path) -> Dict[str, Any]:
     }
 
 def convert_format(file_path: Path, target_format: str) -> Path:
+    from pydub import AudioSegment
     audio = AudioSegment.from_file(file_path)
     out_path = file_path.with_suffix(f'.{target_format}')
     audio.export(out_path, format=target_format)
     return out_path
 
+@metrics.AUDIO_PROCESSING_SECONDS.labels("waveform").time()
 def generate_waveform_data(file_path: Path, samples: int = 512) -> list:
+    from pydub import AudioSegment
     audio = AudioSegment.from_file(file_path)
     raw = audio.get_array_of_samples()
     step = max(1, len(raw) // samples)
     peaks = [max(raw[i:i+step]) for i in range(0, len(raw), step)]
     return peaks
 
+@metrics.AUDIO_PROCESSING_SECONDS.labels("normalize").time()
 def normalize_audio(file_path: Path) -> Path:
+    from pydub import AudioSegment
     audio = AudioSegment.from_file(file_path)
     normalized = audio.apply_gain(-audio.max_dBFS)
     out_path = file_path.with_name(file_path.stem + '_norm' + file_path.suffix)
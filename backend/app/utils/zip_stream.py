@@ -0,0 +1,37 @@
+import io
+import time
+import zipfile
+import aiofiles
+from pathlib import Path
+from typing import AsyncIterator, Iterable, List, Tuple
+
+class _ChunkBuffer(io.RawIOBase):
+    # Write-only sink that hands back whatever zipfile wrote since the last drain.
+    # It is not seekable, so zipfile falls back to streaming mode (data descriptors).
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def stream_zip(files: Iterable[Tuple[str, Path]], chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    # Audio barely compresses, so entries are stored; memory stays at ~one chunk
+    sink = _ChunkBuffer()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for arcname, path in files:
+            with zf.open(zipfile.ZipInfo(arcname, time.localtime()[:6]), "w", force_zip64=True) as entry:
+                async with aiofiles.open(path, "rb") as f:
+                    while chunk := await f.read(chunk_size):
+                        entry.write(chunk)
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
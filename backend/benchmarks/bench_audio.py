@@ -0,0 +1,21 @@
+import pytest
+
+from app.utils import audio_headers, file_utils
+
+def bench_generate_waveform_data(benchmark, wav_5s):
+    peaks = benchmark(file_utils.generate_waveform_data, wav_5s)
+    assert len(peaks) >= 512
+
+def bench_extract_metadata(benchmark, wav_5s):
+    meta = benchmark(file_utils.extract_metadata, wav_5s)
+    assert meta["duration"] == pytest.approx(5)
+
+@pytest.mark.parametrize("fmt", ["wav", "flac", "mp3", "ogg", "m4a"])
+@pytest.mark.parametrize("index", [0, 1], ids=["short", "long"])
+def bench_validate_audio_file(benchmark, corpus, fmt, index):
+    meta = benchmark(file_utils.validate_audio_file, corpus[fmt][index])
+    assert meta["ext"] == fmt
+
+def bench_probe_headers(benchmark, corpus):
+    paths = [p for paths in corpus.values() for p in paths]
+    benchmark(lambda: [audio_headers.probe(p) for p in paths])
@@ -0,0 +1,46 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from app.utils import audio_headers
+from benchmarks.corpus import build_corpus
+
+# Compares the header-only probe with the decode-based path it replaced on ingest.
+# Run from backend/: python -m benchmarks.bench_audio_headers [--decode]
+
+def _time(func, path: Path, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(path)
+    return (time.perf_counter() - start) / repeat
+
+def _decode(path: Path):
+    import audioread
+    import magic
+    magic.Magic(mime=True).from_file(str(path))
+    with audioread.audio_open(str(path)) as f:
+        return f.duration
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", type=Path, default=None)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--decode", action="store_true", help="also time libmagic + audioread")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = build_corpus(args.corpus or Path(tmp))
+        print(f"{'file':<20}{'size':>12}{'probe us':>12}{'decode us':>12}")
+        for paths in corpus.values():
+            for path in paths:
+                probe_us = _time(audio_headers.probe, path, args.repeat) * 1e6
+                decode = ""
+                if args.decode:
+                    try:
+                        decode = f"{_time(_decode, path, max(args.repeat // 20, 1)) * 1e6:.0f}"
+                    except Exception as e:
+                        decode = type(e).__name__
+                print(f"{path.name:<20}{path.stat().st_size:>12}{probe_us:>12.1f}{decode:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import json
+from datetime import datetime
+from typing import List
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.responses import Shape, fast_json, ndjson
+from app.schemas.generation import AudioFile, GenerationRequest, GenerationResponse, GenerationBatchResponse
+from app.services.websocket_manager import serialize_message
+
+REQUEST = {"prompt": "warm analog pads with slow arpeggios", "genre": "ambient", "instruments": "synth, piano, strings", "bpm": 90, "duration": 30}
+
+def _generation(i: int) -> dict:
+    return {
+        "id": i,
+        "status": "completed",
+        "audio_url": f"/static/audio/gen_{i:032x}.wav",
+        "metadata": {"filename": f"gen_{i:032x}.wav", "size": 5_292_044, "duration": 30.0, "format": "wav"},
+        "created_at": datetime(2024, 1, 1, 12, 0, 0),
+    }
+
+BATCH = {
+    "id": 1, "status": "completed", "total": 100, "queued": 0, "running": 0, "completed": 100, "failed": 0,
+    "progress": 1.0, "generations": [_generation(i) for i in range(100)], "created_at": datetime(2024, 1, 1),
+}
+
+def bench_parse_generation_request(benchmark):
+    body = json.dumps(REQUEST).encode()
+    req = benchmark(lambda: GenerationRequest.parse_raw(body))
+    assert req.instruments == ["synth", "piano", "strings"]
+
+@pytest.mark.parametrize("model,payload", [(GenerationResponse, _generation(1)), (GenerationBatchResponse, BATCH)], ids=["generation", "batch100"])
+def bench_response_fastapi_default(benchmark, model, payload):
+    # What FastAPI does for response_model endpoints with the default JSONResponse
+    def render():
+        return json.dumps(jsonable_encoder(model(**payload)), ensure_ascii=False, separators=(",", ":")).encode()
+    assert benchmark(render)
+
+def bench_event_serialize_message(benchmark):
+    message = {"type": "generation_progress", "id": 1, "progress": 0.42, "stage": "downloading", "eta": 12, "bytes_downloaded": 1_048_576, "bytes_total": 5_292_044}
+    assert benchmark(serialize_message, message)
+
+# --- 10k-item listings: FastAPI's response_model path vs. the orjson fast path ---
+
+GENERATIONS_10K = [_generation(i) for i in range(10_000)]
+AUDIO_10K = [{"id": i, "filename": f"gen_{i:032x}.wav", "size": 5_292_044, "duration": 30.0, "format": "wav",
+              "url": f"/static/audio/gen_{i:032x}.wav", "sha256": "0" * 64, "created_at": datetime(2024, 1, 1)} for i in range(10_000)]
+
+@pytest.mark.parametrize("model,items", [(GenerationResponse, GENERATIONS_10K), (AudioFile, AUDIO_10K)], ids=["generation", "audio_file"])
+def bench_list_10k_response_model(benchmark, run, model, items):
+    # Validation, jsonable_encoder and JSONResponse: what a response_model=List[...] route pays
+    field = create_response_field(name="response", type_=List[model])
+    async def render():
+        return JSONResponse(await serialize_response(field=field, response_content=items)).body
+    assert benchmark(lambda: run(render()))
+
+@pytest.mark.parametrize("model,items", [(GenerationResponse, GENERATIONS_10K), (AudioFile, AUDIO_10K)], ids=["generation", "audio_file"])
+def bench_list_10k_fast_json(benchmark, model, items):
+    shape = Shape(model)
+    assert benchmark(lambda: fast_json([shape(item) for item in items]).body)
+
+def bench_list_10k_ndjson(benchmark, run):
+    async def render():
+        body = b""
+        async for chunk in ndjson(GENERATIONS_10K).body_iterator:
+            body += chunk
+        return body
+    assert benchmark(lambda: run(render())).count(b"\n") == 10_000
@@ -0,0 +1,7 @@
+from benchmarks.importtime import measure
+
+def bench_cold_import_app(benchmark):
+    # Fresh interpreter each round: this is what a new worker pays before it can serve
+    times = benchmark.pedantic(measure, args=("app.main",), rounds=5, iterations=1)
+    benchmark.extra_info["app_main_ms"] = times["app.main"] / 1000
+    assert "pydub" not in times
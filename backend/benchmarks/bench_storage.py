@@ -0,0 +1,40 @@
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+
+from app.services.file_storage import FileStorageService, LocalStorageBackend
+from app.utils import file_utils
+
+PAYLOAD = b"\x00" * (5 * 1024 * 1024)
+
+def _upload(name: str = "take.wav") -> UploadFile:
+    return UploadFile(io.BytesIO(PAYLOAD), size=len(PAYLOAD), filename=name)
+
+@pytest.fixture
+def service(tmp_path) -> FileStorageService:
+    return FileStorageService(LocalStorageBackend(tmp_path / "audio"), quota_bytes=10**12)
+
+def bench_save_file(benchmark, service, run):
+    result = benchmark(lambda: run(service.save_file(_upload(), "bench", "ambient")))
+    assert result["size"] == len(PAYLOAD)
+
+def bench_list_files(benchmark, service, run, tmp_path):
+    # 1000 files spread over users/genres/dates, like a modest library
+    for i in range(1000):
+        path = service.base_dir / f"user{i % 10}" / f"genre{i % 7}" / "2024/01/01" / f"{i}.wav"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    files = benchmark(lambda: run(service.list_files()))
+    assert len(files) == 1000
+
+def bench_upload_hash_file(benchmark, service, run):
+    upload = _upload()
+    digest = benchmark(lambda: run(service._hash_file(upload)))
+    assert len(digest) == 64
+
+def bench_hash_file(benchmark, tmp_path):
+    path = tmp_path / "blob.bin"
+    path.write_bytes(PAYLOAD)
+    assert len(benchmark(file_utils.hash_file, path)) == 64
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.services.websocket_manager import WebSocketManager
+
+class NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+@pytest.fixture(params=[100, 1000])
+def manager(request, run):
+    manager = WebSocketManager(heartbeat_interval=0)
+    async def connect():
+        for i in range(request.param):
+            await manager.connect(f"user{i % 50}", NullWebSocket())
+    run(connect())
+    yield manager
+    run(manager.cleanup())
+
+def bench_broadcast_fanout(benchmark, manager, run):
+    message = {"type": "queue_updated", "position": 3, "total_queue_size": 12, "eta": 40}
+
+    async def broadcast_and_drain():
+        await manager.broadcast(message)
+        # Let every per-connection writer flush its queue
+        while any(manager.queue_lengths()):
+            await asyncio.sleep(0)
+
+    benchmark(lambda: run(broadcast_and_drain()))
@@ -0,0 +1,66 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any
+
+# Compares a pytest-benchmark JSON run against a saved baseline and exits non-zero
+# when any benchmark got slower than the threshold. Baselines are machine specific:
+# save one from the same host (or CI runner class) you compare on.
+
+STATS = ("min", "median", "mean", "stddev", "rounds")
+
+def load(path: Path) -> Dict[str, Dict[str, Any]]:
+    data = json.loads(path.read_text())
+    return {b["fullname"]: b["stats"] for b in data["benchmarks"]}
+
+def save(results: Path, baseline: Path) -> None:
+    data = json.loads(results.read_text())
+    trimmed = {
+        "machine_info": {k: data["machine_info"].get(k) for k in ("node", "machine", "python_version", "cpu")},
+        "commit_info": {k: data.get("commit_info", {}).get(k) for k in ("id", "branch", "dirty")},
+        "benchmarks": [{"fullname": b["fullname"], "stats": {k: b["stats"][k] for k in STATS}} for b in data["benchmarks"]],
+    }
+    baseline.parent.mkdir(parents=True, exist_ok=True)
+    baseline.write_text(json.dumps(trimmed, indent=2) + "\n")
+    print(f"Saved {len(trimmed['benchmarks'])} benchmarks to {baseline}")
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], stat: str, threshold: float) -> int:
+    regressions = 0
+    width = max(len(name) for name in current.keys() | baseline.keys())
+    print(f"{'benchmark':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}")
+    for name in sorted(current.keys() | baseline.keys()):
+        if name not in baseline:
+            print(f"{name:<{width}}  {'-':>12}  {current[name][stat] * 1e6:>10.1f}us  {'new':>8}")
+            continue
+        if name not in current:
+            print(f"{name:<{width}}  {baseline[name][stat] * 1e6:>10.1f}us  {'-':>12}  {'missing':>8}")
+            continue
+        before, after = baseline[name][stat], current[name][stat]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<{width}}  {before * 1e6:>10.1f}us  {after * 1e6:>10.1f}us  {change:>+8.1%}{flag}")
+    if regressions:
+        print(f"\n{regressions} benchmark(s) slower than baseline by more than {threshold:.0%} ({stat})")
+    return 1 if regressions else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pytest-benchmark results with a baseline")
+    parser.add_argument("results", type=Path, help="--benchmark-json output of the current run")
+    parser.add_argument("--baseline", type=Path, default=Path(__file__).parent / "baselines" / "main.json")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown, as a fraction")
+    parser.add_argument("--stat", choices=("min", "median", "mean"), default="median")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline instead of comparing")
+    args = parser.parse_args()
+    if args.save:
+        save(args.results, args.baseline)
+        return
+    if not args.baseline.exists():
+        sys.exit(f"No baseline at {args.baseline}; create one with --save")
+    sys.exit(compare(load(args.results), load(args.baseline), args.stat, args.threshold))
+
+if __name__ == "__main__":
+    main()
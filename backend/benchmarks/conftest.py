@@ -0,0 +1,40 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# app.config.settings requires an API key at import time
+os.environ.setdefault("API_KEY", "benchmark")
+# Services create their data directories at import; keep them out of the source tree
+_DATA_DIR = tempfile.mkdtemp(prefix="tumburu-bench-")
+for name in ("AUDIO_STORAGE_PATH", "TRANSCODE_CACHE_PATH", "HLS_STORAGE_PATH", "JOB_JOURNAL_PATH",
+             "UPLOAD_STORAGE_PATH", "REFERENCE_CACHE_PATH", "LIBRARY_STATS_PATH"):
+    os.environ[name] = os.path.join(_DATA_DIR, name.lower())
+
+from benchmarks.corpus import build_corpus
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory):
+    return build_corpus(tmp_path_factory.mktemp("corpus"), durations=(5, 60))
+
+@pytest.fixture(scope="session")
+def wav_5s(corpus) -> Path:
+    return corpus["wav"][0]
+
+@pytest.fixture
+def run():
+    # pytest-benchmark calls plain functions; this drives coroutines on a private loop
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+def pytest_unconfigure(config):
+    shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
+def pytest_configure(config):
+    output = config.getoption("benchmark_json", None)
+    if output:
+        Path(str(output)).parent.mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,98 @@
+import io
+import os
+import struct
+import wave
+from pathlib import Path
+from typing import Dict, List
+
+# Synthetic sample files: headers are real, payloads are filler bytes. That is all a
+# header-only probe looks at, and it keeps the corpus generated instead of checked in.
+
+def make_wav(seconds: float, sample_rate: int = 44100, channels: int = 2) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b'\x00' * int(seconds * sample_rate) * channels * 2)
+    return buf.getvalue()
+
+def make_flac(seconds: float, sample_rate: int = 44100, channels: int = 2, payload_ratio: float = 0.5) -> bytes:
+    total = int(seconds * sample_rate)
+    packed = sample_rate << 44 | (channels - 1) << 41 | (16 - 1) << 36 | total
+    streaminfo = struct.pack('>HH', 4096, 4096) + b'\x00' * 6 + packed.to_bytes(8, 'big') + b'\x00' * 16
+    header = b'fLaC' + bytes([0x80]) + len(streaminfo).to_bytes(3, 'big') + streaminfo
+    payload = int(total * channels * 2 * payload_ratio)
+    return header + b'\xff\xf8' + b'\x00' * max(payload - 2, 0)
+
+def make_mp3(seconds: float, vbr: bool = False, id3: bool = True) -> bytes:
+    # MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo: 417-byte frames of 1152 samples
+    header = b'\xff\xfb\x90\x00'
+    frame = header + b'\x00' * 413
+    frames = int(seconds * 44100 / 1152)
+    out = bytearray()
+    if id3:
+        out += b'ID3\x04\x00\x00' + bytes([0, 0, 0, 0x20]) + b'\x00' * 0x20
+    if vbr:
+        xing = header + b'\x00' * 32 + b'Xing' + struct.pack('>III', 0x3, frames, frames * len(frame))
+        out += xing + b'\x00' * (len(frame) - len(xing))
+    out += frame * frames
+    return bytes(out)
+
+def _ogg_page(header_type: int, granule: int, seq: int, body: bytes, serial: int = 0x1234) -> bytes:
+    segments = [255] * (len(body) // 255) + [len(body) % 255]
+    return (b'OggS' + struct.pack('<BBqIII', 0, header_type, granule, serial, seq, 0)
+            + bytes([len(segments)]) + bytes(segments) + body)
+
+def make_opus(seconds: float, channels: int = 2, bytes_per_second: int = 8000, pre_skip: int = 312) -> bytes:
+    head = b'OpusHead' + struct.pack('<BBHIhB', 1, channels, pre_skip, 48000, 0, 0)
+    out = bytearray(_ogg_page(0x02, 0, 0, head))
+    out += _ogg_page(0x00, 0, 1, b'OpusTags' + b'\x00' * 8)
+    pages = max(int(seconds), 1)
+    for i in range(pages):
+        last = i == pages - 1
+        granule = pre_skip + int(seconds * 48000 * (i + 1) / pages)
+        out += _ogg_page(0x04 if last else 0x00, granule, i + 2, b'\x00' * min(bytes_per_second, 255 * 254))
+    return bytes(out)
+
+def _box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', len(payload) + 8, box_type) + payload
+
+def make_m4a(seconds: float, sample_rate: int = 44100, channels: int = 2, bytes_per_second: int = 16000, moov_first: bool = True) -> bytes:
+    mvhd = _box(b'mvhd', struct.pack('>IIIII', 0, 0, 0, 1000, int(seconds * 1000)) + b'\x00' * 80)
+    mdhd = _box(b'mdhd', struct.pack('>IIIIIHH', 0, 0, 0, sample_rate, int(seconds * sample_rate), 0, 0))
+    hdlr = _box(b'hdlr', struct.pack('>II4s', 0, 0, b'soun') + b'\x00' * 13)
+    entry = _box(b'mp4a', b'\x00' * 6 + struct.pack('>H', 1) + b'\x00' * 8
+                 + struct.pack('>HHHHI', channels, 16, 0, 0, sample_rate << 16))
+    stsd = _box(b'stsd', struct.pack('>II', 0, 1) + entry)
+    trak = _box(b'trak', _box(b'mdia', mdhd + hdlr + _box(b'minf', _box(b'stbl', stsd))))
+    moov = _box(b'moov', mvhd + trak)
+    ftyp = _box(b'ftyp', b'M4A \x00\x00\x00\x00M4A mp42isom')
+    mdat = _box(b'mdat', b'\x00' * int(seconds * bytes_per_second))
+    return ftyp + moov + mdat if moov_first else ftyp + mdat + moov
+
+BUILDERS = {
+    'wav': make_wav,
+    'flac': make_flac,
+    'mp3': make_mp3,
+    'ogg': make_opus,
+    'm4a': make_m4a,
+}
+
+def build_corpus(directory: Path, durations=(5, 60, 300)) -> Dict[str, List[Path]]:
+    # Writes one file per (format, duration) and returns {format: [paths]}
+    directory.mkdir(parents=True, exist_ok=True)
+    corpus: Dict[str, List[Path]] = {}
+    for fmt, build in BUILDERS.items():
+        for seconds in durations:
+            path = directory / f"{fmt}_{seconds}s.{fmt}"
+            if not path.exists():
+                path.write_bytes(build(seconds))
+            corpus.setdefault(fmt, []).append(path)
+    return corpus
+
+def truncate(path: Path, keep: float = 0.5) -> Path:
+    out = path.with_name(f"truncated_{path.name}")
+    data = path.read_bytes()
+    out.write_bytes(data[:int(len(data) * keep)])
+    return out
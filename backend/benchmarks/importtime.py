@@ -0,0 +1,43 @@
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+# Cold-start profile from `python -X importtime`: cumulative microseconds per
+# module, measured in a fresh interpreter so nothing is already cached in
+# sys.modules. Usage (from backend/):
+#   python -m benchmarks.importtime --top 25
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def measure(module: str = "app.main") -> Dict[str, int]:
+    env = {**os.environ, "PYTHONWARNINGS": "ignore"}
+    env.setdefault("API_KEY", "benchmark")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description="Show where import time goes")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+    times = measure(args.module)
+    print(f"{args.module}: {times[args.module] / 1000:.1f} ms")
+    top_level = {name: us for name, us in times.items() if "." not in name or name.startswith("app.")}
+    for name, us in sorted(top_level.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"{us / 1000:8.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
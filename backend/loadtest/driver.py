@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import resource
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+# Asyncio load driver for the backend. Run it against a server whose
+# STABLE_AUDIO_BASE_URL points at loadtest.mock_upstream, e.g.:
+#   python -m loadtest.driver --base-url http://localhost:8000 --duration 60 \
+#       --concurrency 20 --mix generate=1,list=4,playback=4 --ws 50 --server-pid $(pgrep -f uvicorn)
+
+PLAYBACK_RANGE = 256 * 1024
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.rss_samples: List[int] = []
+
+    def record(self, name: str, seconds: float, ok: bool = True):
+        self.latencies[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+    def report(self, elapsed: float) -> Dict[str, object]:
+        scenarios = {}
+        for name, values in sorted(self.latencies.items()):
+            scenarios[name] = {
+                "count": len(values),
+                "errors": self.errors[name],
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 1),
+                "p99_ms": round(percentile(values, 99) * 1000, 1),
+                "max_ms": round(max(values) * 1000, 1),
+            }
+        memory = {"driver_max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+        if self.rss_samples:
+            memory.update(server_rss_start_kb=self.rss_samples[0], server_rss_end_kb=self.rss_samples[-1], server_rss_peak_kb=max(self.rss_samples))
+        return {"elapsed_sec": round(elapsed, 2), "scenarios": scenarios, "counters": dict(self.counters), "memory": memory}
+
+class LoadTest:
+    def __init__(self, base_url: str, mix: Dict[str, float], users: int, poll_interval: float = 0.25):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix
+        self.users = max(users, 1)
+        self.poll_interval = poll_interval
+        self.stats = Stats()
+        self.paths: List[str] = []
+
+    async def worker(self, client: httpx.AsyncClient, n: int, deadline: float):
+        names, weights = zip(*self.mix.items())
+        rng = random.Random(n)
+        while time.monotonic() < deadline:
+            scenario = rng.choices(names, weights)[0]
+            await getattr(self, f"scenario_{scenario}")(client, f"loadtest-{n % self.users}", deadline)
+
+    async def _timed(self, name: str, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+            self.stats.record(name, time.perf_counter() - start, response.status_code < 400)
+            return response
+        except httpx.HTTPError:
+            self.stats.record(name, time.perf_counter() - start, False)
+            return None
+
+    async def scenario_generate(self, client: httpx.AsyncClient, user_id: str, deadline: float):
+        start = time.perf_counter()
+        response = await self._timed("generate_submit", client.post("/api/generate", params={"user_id": user_id}, json={"prompt": "load test", "duration": 10}))
+        if response is None or response.status_code >= 400:
+            return
+        gen_id = response.json()["id"]
+        # End-to-end: submit, upstream round-trips, download and validation
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            status = await self._timed("generate_poll", client.get(f"/api/generate/{gen_id}"))
+            if status is None:
+                continue
+            state = status.json().get("status")
+            if state in ("completed", "failed"):
+                self.stats.record("generate_e2e", time.perf_counter() - start, state == "completed")
+                return
+
+    async def scenario_list(self, client: httpx.AsyncClient, user_id: str, deadline: float):
+        response = await self._timed("list", client.get("/api/audio/", params={"limit": 50}))
+        if response is not None and response.status_code == 200:
+            self.paths = [item["path"] for item in response.json()] or self.paths
+
+    async def scenario_playback(self, client: httpx.AsyncClient, user_id: str, deadline: float):
+        if not self.paths:
+            return await self.scenario_list(client, user_id, deadline)
+        path = random.choice(self.paths)
+        await self._timed("playback_range", client.get(f"/api/audio/{path}", params={"range": f"bytes=0-{PLAYBACK_RANGE - 1}"}))
+
+    async def subscriber(self, user_id: str, deadline: float):
+        import websockets
+        url = self.base_url.replace("http", "ws", 1) + f"/api/ws?user_id={user_id}"
+        start = time.perf_counter()
+        try:
+            async with websockets.connect(url) as ws:
+                self.stats.record("ws_connect", time.perf_counter() - start)
+                while (remaining := deadline - time.monotonic()) > 0:
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                    message = json.loads(raw)
+                    if message.get("type") == "ping":
+                        await ws.send(json.dumps({"type": "pong"}))
+                    self.stats.counters[f"ws_{message.get('type')}"] += 1
+        except Exception:
+            self.stats.record("ws_connect", time.perf_counter() - start, False)
+
+    async def sample_rss(self, pid: int, deadline: float):
+        status = Path(f"/proc/{pid}/status")
+        while time.monotonic() < deadline:
+            for line in status.read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    self.stats.rss_samples.append(int(line.split()[1]))
+            await asyncio.sleep(1)
+
+    async def run(self, duration: float, concurrency: int, subscribers: int, server_pid: Optional[int] = None) -> Dict[str, object]:
+        started = time.monotonic()
+        deadline = started + duration
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=60) as client:
+            tasks = [self.worker(client, n, deadline) for n in range(concurrency)]
+            tasks += [self.subscriber(f"loadtest-{n}", deadline) for n in range(subscribers)]
+            if server_pid:
+                tasks.append(self.sample_rss(server_pid, deadline))
+            await asyncio.gather(*tasks)
+        return self.stats.report(time.monotonic() - started)
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if not hasattr(LoadTest, f"scenario_{name}"):
+            raise argparse.ArgumentTypeError(f"Unknown scenario: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def print_report(report: Dict[str, object]):
+    print(f"{'scenario':<18}{'count':>8}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, s in report["scenarios"].items():
+        print(f"{name:<18}{s['count']:>8}{s['errors']:>8}{s['throughput_rps']:>9}{s['p50_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+    for name, count in sorted(report["counters"].items()):
+        print(f"{name:<18}{count:>8}")
+    for name, value in report["memory"].items():
+        print(f"{name:<22}{value:>12}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the backend against the mock upstream")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("generate=1,list=4,playback=4"))
+    parser.add_argument("--ws", type=int, default=10, help="number of WebSocket subscribers")
+    parser.add_argument("--server-pid", type=int, default=None, help="sample this process's RSS")
+    parser.add_argument("--json", type=Path, default=None, help="also write the report as JSON")
+    args = parser.parse_args()
+    test = LoadTest(args.base_url, args.mix, users=args.ws)
+    report = asyncio.run(test.run(args.duration, args.concurrency, args.ws, args.server_pid))
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
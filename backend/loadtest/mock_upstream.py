@@ -0,0 +1,145 @@
+import asyncio
+import os
+import random
+import time
+import uuid
+import wave
+import io
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
+
+from fastapi import FastAPI, File, HTTPException, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+
+# Stand-in for the Stable Audio API, for load tests and local development.
+# Point the backend at it with STABLE_AUDIO_BASE_URL=http://localhost:8100/v1 and run:
+#   uvicorn loadtest.mock_upstream:app --port 8100
+# Behaviour is tuned with MOCK_* environment variables (see MockConfig.from_env).
+
+@dataclass
+class MockConfig:
+    latency_ms: float = 50.0          # added to every API call
+    jitter_ms: float = 20.0
+    job_seconds: float = 2.0          # time from submit until the job reports completed
+    failure_rate: float = 0.0         # fraction of jobs that end in status "failed"
+    rate_limit_rate: float = 0.0      # fraction of API calls answered with 429
+    retry_after: int = 1
+    audio_seconds: float = 10.0       # length of the WAV returned by the download endpoint
+    sample_rate: int = 44100
+    download_chunk: int = 64 * 1024
+    download_bytes_per_sec: float = 0.0  # 0 = unthrottled
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "MockConfig":
+        overrides: Dict[str, Any] = {}
+        for name, f in cls.__dataclass_fields__.items():
+            raw = os.getenv(f"MOCK_{name.upper()}")
+            if raw is not None:
+                overrides[name] = int(raw) if "int" in str(f.type) else float(raw)
+        return cls(**overrides)
+
+@dataclass
+class _Job:
+    id: str
+    payload: Dict[str, Any]
+    submitted: float
+    fails: bool
+    polls: int = 0
+
+@dataclass
+class MockState:
+    config: MockConfig
+    jobs: Dict[str, _Job] = field(default_factory=dict)
+    audio: bytes = b""
+    references: Dict[str, int] = field(default_factory=dict)
+    requests: int = 0
+    rate_limited: int = 0
+
+def _render_wav(seconds: float, sample_rate: int) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00\x00" * 2 * int(seconds * sample_rate))
+    return buf.getvalue()
+
+def create_app(config: Optional[MockConfig] = None) -> FastAPI:
+    config = config or MockConfig.from_env()
+    rng = random.Random(config.seed)
+    state = MockState(config, audio=_render_wav(config.audio_seconds, config.sample_rate))
+    app = FastAPI(title="Mock Stable Audio API")
+    app.state.mock = state
+
+    async def api_call():
+        state.requests += 1
+        delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if rng.random() < config.rate_limit_rate:
+            state.rate_limited += 1
+            raise HTTPException(429, "Rate limit exceeded", headers={"Retry-After": str(config.retry_after)})
+
+    @app.post("/v1/references")
+    async def upload_reference(file: UploadFile = File(...)):
+        await api_call()
+        asset_id = f"ref_{uuid.uuid4().hex}"
+        state.references[asset_id] = len(await file.read())
+        return {"id": asset_id}
+
+    @app.post("/v1/generate")
+    async def generate(request: Request):
+        await api_call()
+        payload = await request.json()
+        if "reference_asset_id" in payload and payload["reference_asset_id"] not in state.references:
+            raise HTTPException(400, "Unknown reference asset")
+        job = _Job(uuid.uuid4().hex, payload, time.monotonic(), rng.random() < config.failure_rate)
+        state.jobs[job.id] = job
+        return {"id": job.id, "status": "queued"}
+
+    @app.get("/v1/generate/{job_id}")
+    async def status(job_id: str, request: Request):
+        await api_call()
+        job = state.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(404, "Job not found")
+        job.polls += 1
+        elapsed = time.monotonic() - job.submitted
+        if elapsed < config.job_seconds:
+            return {"id": job_id, "status": "processing", "progress": round(elapsed / config.job_seconds, 3)}
+        if job.fails:
+            return {"id": job_id, "status": "failed", "error": "Injected failure"}
+        return {"id": job_id, "status": "completed", "audio_url": str(request.url_for("download", job_id=job_id))}
+
+    @app.get("/v1/audio/{job_id}.wav", name="download")
+    async def download(job_id: str, request: Request):
+        if job_id not in state.jobs:
+            raise HTTPException(404, "Job not found")
+        data = state.audio
+        total = len(data)
+        offset, status_code, headers = 0, 200, {"Accept-Ranges": "bytes"}
+        # Only the open-ended "bytes=N-" form, which is what resuming clients send
+        range_header = request.headers.get("range", "")
+        if range_header.startswith("bytes=") and range_header.endswith("-"):
+            offset = int(range_header[6:-1])
+            if offset >= total:
+                return Response(status_code=416, headers={"Content-Range": f"bytes */{total}"})
+            status_code = 206
+            headers["Content-Range"] = f"bytes {offset}-{total - 1}/{total}"
+        headers["Content-Length"] = str(total - offset)
+        async def body():
+            for start in range(offset, total, config.download_chunk):
+                chunk = data[start:start + config.download_chunk]
+                if config.download_bytes_per_sec:
+                    await asyncio.sleep(len(chunk) / config.download_bytes_per_sec)
+                yield chunk
+        return StreamingResponse(body(), status_code=status_code, media_type="audio/wav", headers=headers)
+
+    @app.get("/v1/_stats")
+    async def stats():
+        return {"requests": state.requests, "rate_limited": state.rate_limited, "jobs": len(state.jobs), "references": len(state.references)}
+
+    return app
+
+app = create_app()
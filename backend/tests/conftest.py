@@ -1,8 +1,77 @@
+import os
+import shutil
+import stat
+import sys
+import tempfile
+
+# Runtime data (journals, uploads, caches, library stats) goes to a throwaway
+# directory rather than the source tree. Services are built at import time, so
+# this has to happen before anything under app/ is imported.
+_DATA_DIR = tempfile.mkdtemp(prefix="tumburu-tests-")
+for name, default in {
+    "AUDIO_STORAGE_PATH": "audio",
+    "TRANSCODE_CACHE_PATH": "transcodes",
+    "HLS_STORAGE_PATH": "hls",
+    "JOB_JOURNAL_PATH": "jobs",
+    "UPLOAD_STORAGE_PATH": "uploads",
+    "REFERENCE_CACHE_PATH": "references",
+    "LIBRARY_STATS_PATH": "library_stats.json",
+}.items():
+    os.environ[name] = os.path.join(_DATA_DIR, default)
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 
+def pytest_unconfigure(config):
+    shutil.rmtree(_DATA_DIR, ignore_errors=True)
+
 @pytest.fixture
 def client():
     with TestClient(app) as c:
         yield c
+
+# Stand-in for ffmpeg, recording each invocation so tests can count encodes. As an
+# HLS muxer it writes an init segment, two media segments and a playlist; otherwise
+# it copies the -i input to stdout in small, slow chunks (inputs named bad.wav fail).
+FAKE_FFMPEG = f"""#!{sys.executable}
+import os, sys, time
+args = sys.argv[1:]
+open("{{log}}", "a").write("run\\n")
+if "-hls_segment_filename" in args:
+    pattern = args[args.index("-hls_segment_filename") + 1]
+    playlist = args[-1]
+    out = os.path.dirname(playlist)
+    open(os.path.join(out, "init.mp4"), "wb").write(b"init")
+    lines = ["#EXTM3U", '#EXT-X-MAP:URI="init.mp4"']
+    for i in range(2):
+        open(pattern % i, "wb").write(b"segment%d" % i)
+        lines += ["#EXTINF:6.0,", os.path.basename(pattern % i)]
+    open(playlist, "w").write("\\n".join(lines + ["#EXT-X-ENDLIST"]))
+    sys.exit(0)
+src = args[args.index("-i") + 1]
+if src.endswith("bad.wav"):
+    sys.stderr.write("corrupt input")
+    sys.exit(1)
+data = open(src, "rb").read()
+for i in range(0, len(data), 1000):
+    sys.stdout.buffer.write(data[i:i + 1000])
+    sys.stdout.buffer.flush()
+    time.sleep(0.005)
+"""
+
+class FakeFfmpeg:
+    def __init__(self, directory):
+        self.log = directory / "ffmpeg_runs.log"
+        self.log.touch()
+        script = directory / "ffmpeg"
+        script.write_text(FAKE_FFMPEG.replace("{log}", str(self.log)))
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        self.path = str(script)
+
+    def runs(self) -> int:
+        return len(self.log.read_text().splitlines())
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    return FakeFfmpeg(tmp_path)
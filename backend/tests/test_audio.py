@@ -2,3 +2,38 @@ def test_upload_audio(client):
     resp = client.post("/api/audio/upload", files={"file": ("test.wav", b"fake-audio")})
     assert resp.status_code == 200
     assert "filename" in resp.json()
+
+def test_library_stats(client):
+    resp = client.get("/api/audio/stats", params={"user": "nobody"})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert set(body["totals"]) == {"files", "bytes", "duration"}
+    assert body["by_user"] == {"nobody": {"files": 0, "bytes": 0, "duration": 0.0}}
+
+def test_library_paths_are_addressable(client):
+    from app.routers.audio import BASE_DIR
+    track = BASE_DIR / "alice" / "ambient" / "2024" / "05" / "01" / "t.wav"
+    track.parent.mkdir(parents=True, exist_ok=True)
+    track.write_bytes(b"0123456789")
+    file_id = "alice/ambient/2024/05/01/t.wav"
+    resp = client.get(f"/api/audio/{file_id}", params={"range": "bytes=0-3"})
+    assert resp.status_code == 206 and resp.content == b"0123"
+    assert client.get("/api/audio/alice/../../../etc/passwd").status_code == 404
+    # More specific routes are not swallowed by the path-valued catch-all
+    assert client.get("/api/audio/search", params={"q": "x"}).status_code == 200
+    assert client.get("/api/audio/similar/abc").json() == {"similar": []}
+    assert client.delete(f"/api/audio/{file_id}").status_code == 204
+    assert not track.exists()
+
+def test_stored_hls_segments_skip_the_heavy_slot(client, monkeypatch):
+    import asyncio
+    from pathlib import Path
+    from app.services.admission import heavy_audio
+    from app.services.hls import hls_service
+    digest = "0" * 32
+    asyncio.run(hls_service.storage.put(Path(digest) / "aac_64k" / "seg_00000.m4s", b"segment"))
+    # Every slot is busy: segmenting is shed, already stored segments are not
+    monkeypatch.setattr(heavy_audio, "inflight", heavy_audio.limit)
+    resp = client.get(f"/api/audio/hls/{digest}/aac_64k/seg_00000.m4s")
+    assert resp.status_code == 200 and resp.content == b"segment"
+    assert client.get(f"/api/audio/hls/{digest}/aac_64k/seg_00001.m4s").status_code == 503
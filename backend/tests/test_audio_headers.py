@@ -0,0 +1,75 @@
+import pytest
+from fastapi import HTTPException
+
+from app.utils import audio_headers, file_utils
+from app.utils.audio_processing import is_corrupted
+from benchmarks.corpus import make_wav, make_flac, make_mp3, make_opus, make_m4a
+
+@pytest.mark.parametrize("fmt,data,sample_rate,channels", [
+    ("wav", make_wav(3), 44100, 2),
+    ("flac", make_flac(3, sample_rate=48000, channels=1), 48000, 1),
+    ("mp3", make_mp3(3), 44100, 2),
+    ("mp3", make_mp3(3, vbr=True), 44100, 2),
+    ("ogg", make_opus(3), 48000, 2),
+    ("m4a", make_m4a(3), 44100, 2),
+    ("m4a", make_m4a(3, moov_first=False), 44100, 2),
+])
+def test_probe_reads_headers(tmp_path, fmt, data, sample_rate, channels):
+    path = tmp_path / f"sample.{fmt}"
+    path.write_bytes(data)
+    info = audio_headers.probe(path)
+    assert info.format == fmt
+    assert info.duration == pytest.approx(3, abs=0.05)
+    assert info.sample_rate == sample_rate
+    assert info.channels == channels
+    assert info.bitrate > 0
+    assert not info.truncated
+    assert not is_corrupted(str(path))
+
+@pytest.mark.parametrize("fmt,data", [
+    ("wav", make_wav(3)),
+    ("mp3", make_mp3(3, vbr=True)),
+    ("ogg", make_opus(3)),
+    ("m4a", make_m4a(3)),
+])
+def test_probe_detects_truncation(tmp_path, fmt, data):
+    path = tmp_path / f"cut.{fmt}"
+    path.write_bytes(data[:len(data) // 2])
+    assert audio_headers.probe(path).truncated
+    assert is_corrupted(str(path))
+
+@pytest.mark.parametrize("placeholder", [0, 0xFFFFFFFF])
+def test_probe_accepts_streamed_wav_headers(tmp_path, placeholder):
+    data = bytearray(make_wav(3))
+    size = placeholder.to_bytes(4, "little")
+    data[4:8] = size
+    data[data.find(b"data") + 4:data.find(b"data") + 8] = size
+    path = tmp_path / "streamed.wav"
+    path.write_bytes(data)
+    info = audio_headers.probe(path)
+    assert info.duration == pytest.approx(3, abs=0.05)
+    assert not info.truncated
+    assert not is_corrupted(str(path))
+    assert file_utils.validate_audio_file(path)["ext"] == "wav"
+
+def test_probe_rejects_garbage(tmp_path):
+    path = tmp_path / "noise.bin"
+    path.write_bytes(b"not audio at all" * 10)
+    with pytest.raises(audio_headers.UnsupportedFormatError):
+        audio_headers.probe(path)
+    header_only = tmp_path / "header.flac"
+    header_only.write_bytes(make_flac(3)[:20])
+    with pytest.raises(audio_headers.AudioHeaderError):
+        audio_headers.probe(header_only)
+
+def test_validate_audio_file_uses_headers(tmp_path):
+    path = tmp_path / "ok.wav"
+    path.write_bytes(make_wav(2))
+    meta = file_utils.validate_audio_file(path)
+    assert meta["ext"] == "wav"
+    assert meta["duration"] == pytest.approx(2)
+    cut = tmp_path / "cut.wav"
+    cut.write_bytes(make_wav(2)[:1000])
+    with pytest.raises(HTTPException) as exc:
+        file_utils.validate_audio_file(cut)
+    assert exc.value.status_code == 400
@@ -2,3 +2,43 @@ def test_health(client):
     resp = client.get("/api/health/")
     assert resp.status_code == 200
     assert resp.json()["status"] == "ok"
+
+def test_batch_generation_and_download(client, tmp_path, monkeypatch):
+    import io
+    import time
+    import zipfile
+    from datetime import datetime
+    from app.config.settings import settings
+    from app.core.dependencies import get_audio_generation_service
+    from app.main import app
+
+    class FakeService:
+        waiting = 0
+        async def generate(self, prompt, progress=None, **kwargs):
+            filename = f"{prompt}.wav"
+            (tmp_path / filename).write_bytes(prompt.encode() * 10)
+            return {"filename": filename, "size": 10, "duration": 1.0, "format": "wav",
+                    "url": f"/static/audio/{filename}", "created_at": datetime.utcnow()}
+
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_PATH", str(tmp_path))
+    app.dependency_overrides[get_audio_generation_service] = lambda: FakeService()
+    try:
+        resp = client.post("/api/generate/batch", json={"requests": [{"prompt": "kick"}, {"prompt": "snare"}]})
+        assert resp.status_code == 200
+        batch = resp.json()
+        assert batch["total"] == 2
+        for _ in range(50):
+            batch = client.get(f"/api/generate/batch/{batch['id']}").json()
+            if batch["status"] == "completed":
+                break
+            time.sleep(0.01)
+        assert batch["completed"] == 2 and batch["progress"] == 1.0
+        archive = zipfile.ZipFile(io.BytesIO(client.get(f"/api/generate/batch/{batch['id']}/download").content))
+        assert sorted(archive.namelist()) == ["kick.wav", "snare.wav"]
+        assert archive.read("kick.wav") == b"kick" * 10
+    finally:
+        app.dependency_overrides.clear()
+
+def test_batch_rejects_invalid_items(client):
+    resp = client.post("/api/generate/batch", json={"requests": [{"prompt": "ok prompt"}, {"prompt": "x"}]})
+    assert resp.status_code == 422
@@ -0,0 +1,19 @@
+from prometheus_client import REGISTRY
+
+def test_metrics_endpoint_reports_route_templates(client):
+    assert client.get("/api/generate/12345").status_code == 404
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/generate/{id}",status="404"}' in body
+    assert "websocket_connections 0.0" in body
+    assert 'storage_disk_bytes{kind="free",volume="audio"}' in body
+    assert 'transcode_cache{stat="hits"}' in body
+
+def test_unmatched_paths_share_one_label(client):
+    before = REGISTRY.get_sample_value("http_request_duration_seconds_count", {"method": "GET", "route": "unmatched", "status": "404"}) or 0
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+    after = REGISTRY.get_sample_value("http_request_duration_seconds_count", {"method": "GET", "route": "unmatched", "status": "404"})
+    assert after == before + 2
@@ -0,0 +1,44 @@
+import asyncio
+import shutil
+from datetime import datetime
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.responses import Shape, fast_json
+from app.routers import audio
+from app.schemas.generation import AudioFile, GenerationResponse
+
+def _via_response_model(model, items):
+    field = create_response_field(name="response", type_=List[model])
+    return jsonable_encoder(asyncio.run(serialize_response(field=field, response_content=items)))
+
+def test_fast_path_matches_response_model():
+    generations = [
+        {"id": 1, "status": "queued", "audio_url": None, "metadata": None, "created_at": datetime(2024, 1, 1, 12, 0, 0, 123456)},
+        {"id": 2, "status": "completed", "audio_url": "/static/audio/a.wav",
+         "metadata": {"filename": "a.wav", "size": 10, "created_at": datetime(2024, 1, 2)}, "created_at": datetime(2024, 1, 1)},
+    ]
+    files = [{"id": 3, "filename": "ref.wav", "size": 10, "duration": 1.5, "format": "wav", "url": "/static/audio/ref.wav",
+              "sha256": "ab" * 32, "created_at": datetime(2024, 1, 1)}]
+    for model, items in ((GenerationResponse, generations), (AudioFile, files)):
+        shape = Shape(model)
+        assert orjson.loads(fast_json([shape(i) for i in items]).body) == _via_response_model(model, items)
+
+def test_list_audio_ndjson(client):
+    user_dir = audio.BASE_DIR / "ndjson-test"
+    (user_dir / "ambient").mkdir(parents=True, exist_ok=True)
+    try:
+        for i in range(3):
+            (user_dir / "ambient" / f"{i}.wav").write_bytes(b"x")
+        resp = client.get("/api/audio/", params={"user": "ndjson-test"}, headers={"Accept": "application/x-ndjson"})
+        assert resp.headers["content-type"] == "application/x-ndjson"
+        lines = [orjson.loads(line) for line in resp.content.splitlines()]
+        assert sorted(l["path"] for l in lines) == sorted(f"ndjson-test/ambient/{i}.wav" for i in range(3))
+        plain = client.get("/api/audio/", params={"user": "ndjson-test"}).json()
+        assert sorted(plain, key=lambda l: l["path"]) == sorted(lines, key=lambda l: l["path"])
+    finally:
+        shutil.rmtree(user_dir)
@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.services.admission import AdmissionController, InflightLimiter
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def _rejection(func, *args, **kwargs):
+    with pytest.raises(HTTPException) as exc:
+        func(*args, **kwargs)
+    return exc.value.status_code, int(exc.value.headers["Retry-After"])
+
+def test_queue_limit_and_wait_estimate_shed_with_retry_after():
+    controller = AdmissionController(workers=2, max_queue=2, max_wait=1000, user_max_concurrent=10, user_burst=100, initial_service_time=10, clock=Clock())
+    tickets = [controller.admit(f"u{i}") for i in range(4)]
+    assert controller.estimated_wait() == 10
+    assert _rejection(controller.admit, "u9") == (503, 5)
+    tickets[0].done()
+    controller.admit("u9")
+    tight = AdmissionController(workers=1, max_queue=100, max_wait=25, user_max_concurrent=10, user_burst=100, initial_service_time=10, clock=Clock())
+    for i in range(3):
+        tight.admit(f"u{i}")
+    status, retry = _rejection(tight.admit, "late")
+    assert status == 503 and retry == 5
+
+def test_per_user_concurrency_and_token_bucket():
+    clock = Clock()
+    controller = AdmissionController(workers=10, max_queue=100, user_max_concurrent=2, user_rate=1.0, user_burst=3, initial_service_time=30, clock=clock)
+    a, b = controller.admit("alice"), controller.admit("alice")
+    assert _rejection(controller.admit, "alice") == (429, 30)
+    controller.admit("bob")
+    a.done()
+    controller.admit("alice")
+    b.done()
+    # Burst of 3 is spent; the next token arrives after one second
+    assert _rejection(controller.admit, "alice") == (429, 1)
+    clock.now = 1.0
+    controller.admit("alice")
+
+def test_batch_load_is_capped_and_released_as_jobs_finish():
+    controller = AdmissionController(workers=2, max_queue=2, user_max_concurrent=5, user_burst=10, clock=Clock())
+    ticket = controller.admit("alice", jobs=10, load=2)
+    assert controller.outstanding == 2
+    for _ in range(8):
+        ticket.done()
+    assert controller.outstanding == 2
+    ticket.done()
+    ticket.done()
+    assert controller.outstanding == 0
+    assert controller._user_tickets == {}
+
+def test_inflight_limiter_sheds_excess():
+    limiter = InflightLimiter(1, retry_after=3)
+    limiter.acquire()
+    assert _rejection(limiter.acquire) == (503, 3)
+    limiter.release()
+    limiter.acquire()
+
+@pytest.mark.asyncio
+async def test_streaming_slot_is_released_however_the_response_ends():
+    limiter = InflightLimiter(1)
+    scope = {"type": "http", "method": "GET", "path": "/"}
+    async def body():
+        await asyncio.sleep(10)
+        yield b"never"
+    async def disconnected():
+        return {"type": "http.disconnect"}
+    async def connected():
+        await asyncio.sleep(10)
+    async def broken_send(message):
+        raise OSError("connection reset")
+    # Client gone before the first chunk
+    await limiter.streaming_response(body())(scope, disconnected, lambda message: asyncio.sleep(0))
+    assert limiter.inflight == 0
+    # Send fails before the body generator ever starts
+    with pytest.raises((OSError, ExceptionGroup)):
+        await limiter.streaming_response(body())(scope, connected, broken_send)
+    assert limiter.inflight == 0
+    limiter.acquire()
+    assert _rejection(lambda: limiter.streaming_response(body())) == (503, 5)
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from app.core.events import BrokerEventBus, EventEmitter, LocalBroker
+
+class CountingBroker(LocalBroker):
+    def __init__(self):
+        super().__init__()
+        self.publishes = 0
+
+    async def publish(self, channel, data):
+        self.publishes += 1
+        await super().publish(channel, data)
+
+@pytest.mark.asyncio
+async def test_listeners_registered_synchronously():
+    bus = EventEmitter()
+    received = []
+    async def listener(user_id, payload):
+        received.append((user_id, payload))
+    bus.on("generation_started", listener)
+    await bus.emit("generation_started", "u1", {"id": 1})
+    assert received == [("u1", {"id": 1})]
+
+@pytest.mark.asyncio
+async def test_events_reach_other_workers_in_batches():
+    broker = CountingBroker()
+    worker_a = BrokerEventBus(broker, flush_interval=0.005)
+    worker_b = BrokerEventBus(broker, flush_interval=0.005)
+    received = []
+    async def listener(user_id, payload):
+        received.append(payload["n"])
+    worker_b.on("generation_progress", listener)
+    await worker_a.start()
+    await worker_b.start()
+    for n in range(20):
+        await worker_a.emit("generation_progress", "u1", {"n": n})
+    await asyncio.sleep(0.05)
+    assert sorted(received) == list(range(20))
+    assert broker.publishes == 1
+    await worker_a.stop()
+    await worker_b.stop()
+
+@pytest.mark.asyncio
+async def test_listeners_dispatched_concurrently():
+    bus = EventEmitter()
+    async def slow(_):
+        await asyncio.sleep(0.1)
+    for _ in range(5):
+        bus.on("evt", slow)
+    await asyncio.wait_for(bus.emit("evt", None), 0.3)
+
+class FlakyBroker(LocalBroker):
+    # First subscription dies with a connection error, the next subscribe attempt fails too
+    def __init__(self):
+        super().__init__()
+        self.subscribes = 0
+
+    async def subscribe(self, channel):
+        self.subscribes += 1
+        if self.subscribes == 2:
+            raise ConnectionError("broker restarting")
+        sub = await super().subscribe(channel)
+        if self.subscribes == 1:
+            sub.queue.put_nowait(ConnectionError("connection reset"))
+            get = sub.queue.get
+            async def failing_get():
+                item = await get()
+                if isinstance(item, Exception):
+                    raise item
+                return item
+            sub.queue.get = failing_get
+        return sub
+
+@pytest.mark.asyncio
+async def test_lost_subscription_is_reestablished():
+    broker = FlakyBroker()
+    bus = BrokerEventBus(broker, flush_interval=0.005, retry_initial=0.01)
+    received = []
+    async def listener(user_id, payload):
+        received.append(payload["n"])
+    bus.on("generation_progress", listener)
+    await bus.start()
+    while broker.subscribes < 3:
+        await asyncio.sleep(0.01)
+    await bus.emit("generation_progress", "u1", {"n": 1})
+    await asyncio.sleep(0.05)
+    assert received == [1]
+    await bus.stop()
@@ -0,0 +1,64 @@
+import asyncio
+from urllib.parse import urljoin
+from pathlib import Path
+import pytest
+from app.services.file_storage import LocalStorageBackend
+from app.services.hls import HlsService, VARIANTS
+from app.services.transcoding import TranscodingService
+
+@pytest.fixture
+def hls(tmp_path, fake_ffmpeg):
+    service = HlsService(LocalStorageBackend(tmp_path / "hls"), TranscodingService(tmp_path / "tc"), ffmpeg=fake_ffmpeg.path)
+    service.runs = fake_ffmpeg.runs
+    return service
+
+@pytest.mark.asyncio
+async def test_variants_are_segmented_lazily_once(hls, tmp_path):
+    source = tmp_path / "track.wav"
+    source.write_bytes(b"RIFF....")
+    master = await hls.master_playlist(source, "track.wav")
+    digest = await hls.asset_id(source)
+    assert f"/api/audio/hls/{digest}/aac_128k/index.m3u8" in master
+    assert hls.runs() == 0
+    assert await hls.source_file_id(digest) == "track.wav"
+
+    playlists = await asyncio.gather(*(hls.get(digest, "aac_128k", "index.m3u8", source) for _ in range(3)))
+    assert hls.runs() == 1
+    assert b"seg_00001.m4s" in playlists[0]
+    assert await hls.get(digest, "aac_128k", "seg_00001.m4s", None) == b"segment1"
+    assert hls.runs() == 1
+
+@pytest.mark.asyncio
+async def test_variant_uris_resolve_for_nested_ids(hls, tmp_path):
+    source = tmp_path / "t.wav"
+    source.write_bytes(b"RIFF....")
+    file_id = "alice/ambient/2024/05/01/t.wav"
+    master = await hls.master_playlist(source, file_id)
+    digest = await hls.asset_id(source)
+    uris = [line for line in master.splitlines() if not line.startswith("#")]
+    # Players resolve variant URIs against the master playlist's own URL
+    base = f"/api/audio/{file_id}/hls/master.m3u8"
+    assert [urljoin(base, uri) for uri in uris] == [f"/api/audio/hls/{digest}/{name}/index.m3u8" for name in VARIANTS]
+    assert await hls.source_file_id(digest) == file_id
+
+@pytest.mark.asyncio
+async def test_unknown_or_unsafe_names_are_rejected(hls, tmp_path):
+    source = tmp_path / "track.wav"
+    source.write_bytes(b"RIFF....")
+    digest = await hls.asset_id(source)
+    await hls.get(digest, "aac_64k", "index.m3u8", source)
+    for variant, name in [("aac_64k", "seg_00099.m4s"), ("aac_64k", ".."), ("flac", "index.m3u8")]:
+        with pytest.raises(FileNotFoundError):
+            await hls.get(digest, variant, name, source)
+
+@pytest.mark.asyncio
+async def test_segmenting_shares_the_transcoder_ffmpeg_limit(hls):
+    assert hls.semaphore is hls.transcoder.semaphore
+
+@pytest.mark.asyncio
+async def test_concurrent_puts_publish_whole_files(tmp_path):
+    storage = LocalStorageBackend(tmp_path / "store")
+    bodies = [bytes([i]) * 200_000 for i in range(8)]
+    await asyncio.gather(*(storage.put(Path("a") / "seg.m4s", body) for body in bodies))
+    assert (tmp_path / "store" / "a" / "seg.m4s").read_bytes() in bodies
+    assert [p.name for p in (tmp_path / "store" / "a").iterdir()] == ["seg.m4s"]
@@ -0,0 +1,98 @@
+import asyncio
+import httpx
+import pytest
+
+from app.config.settings import settings
+from app.services import job_journal
+from app.services.audio_generation import AudioGenerationService
+from app.services.job_journal import JobJournal
+from app.services.stable_audio import StableAudioClient
+from loadtest.mock_upstream import MockConfig, create_app
+
+def _client(mock) -> StableAudioClient:
+    return StableAudioClient("key", base_url="http://mock/v1", poll_interval=0.01, transport=httpx.ASGITransport(app=mock))
+
+def test_journal_survives_reopen(tmp_path):
+    journal = JobJournal(tmp_path, fsync=False)
+    journal.create("1", owner="u", payload={"prompt": "a"}, filename="a.wav")
+    journal.create("2", owner="u", payload={"prompt": "b"}, filename="b.wav")
+    journal.update("1", phase=job_journal.SUBMITTED, upstream_id="up-1")
+    journal.remove("2")
+    (tmp_path / "broken.json").write_bytes(b"{")
+    pending = JobJournal(tmp_path).pending()
+    assert [r["key"] for r in pending] == ["1"]
+    assert pending[0]["upstream_id"] == "up-1" and pending[0]["phase"] == job_journal.SUBMITTED
+
+def test_each_job_is_claimed_by_one_worker(tmp_path, monkeypatch):
+    # Two journals on one directory stand in for two workers
+    first, second = JobJournal(tmp_path, fsync=False), JobJournal(tmp_path, fsync=False)
+    first.create("1", payload={"prompt": "a"}, filename="gen_a.wav")
+    first.create("2", payload={"prompt": "b"}, filename="gen_b.wav")
+    assert [r["key"] for r in second.pending()] == ["1", "2"]
+    assert not second.claim("1")
+    first.update("2", phase=job_journal.SUBMITTED, upstream_id="up-2")
+    # A worker that goes away (shutdown or crash) frees its jobs for the others
+    first.release("2")
+    assert second.claim("2") and second.get("2")["upstream_id"] == "up-2"
+    assert not first.claim("2")
+    first.remove("1")
+    assert not second.claim("1")
+
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "JOB_JOURNAL_PATH", str(tmp_path))
+    for name in ("gen_a.wav.part", "gen_b.wav.part", "gen_gone.wav.part", "upload_x.part"):
+        (tmp_path / name).write_bytes(b"x")
+    assert AudioGenerationService().reclaim_orphans() == 2
+    assert sorted(p.name for p in tmp_path.glob("*.part")) == ["gen_b.wav.part", "upload_x.part"]
+
+@pytest.mark.asyncio
+async def test_download_resumes_with_range(tmp_path):
+    mock = create_app(MockConfig(latency_ms=0, jitter_ms=0, job_seconds=0, audio_seconds=1))
+    client = _client(mock)
+    data = mock.state.mock.audio
+    url = "http://mock/v1/audio/job.wav"
+    mock.state.mock.jobs["job"] = None
+    dest = tmp_path / "out.wav.part"
+    dest.write_bytes(data[:1000])
+    seen = []
+    assert await client.download_audio(url, str(dest), progress_callback=lambda d, t: seen.append((d, t)), resume=True) == len(data)
+    assert dest.read_bytes() == data
+    assert seen[0][0] > 1000 and seen[-1] == (len(data), len(data))
+    # Already complete: the server answers 416 and nothing is rewritten
+    assert await client.download_audio(url, str(dest), resume=True) == len(data)
+    # Longer than the upstream file: discarded and fetched again
+    dest.write_bytes(data + b"junk")
+    assert await client.download_audio(url, str(dest), resume=True) == len(data)
+    assert dest.read_bytes() == data
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_interrupted_generation_resumes_without_resubmitting(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_PATH", str(tmp_path / "audio"))
+    monkeypatch.setattr(settings, "JOB_JOURNAL_PATH", str(tmp_path / "jobs"))
+    (tmp_path / "audio").mkdir()
+    mock = create_app(MockConfig(latency_ms=0, jitter_ms=0, job_seconds=0.3, audio_seconds=1))
+    state = mock.state.mock
+
+    service = AudioGenerationService()
+    service.client = _client(mock)
+    task = asyncio.create_task(service.generate("prompt", job_key="42", owner="user"))
+    # Interrupt while polling, after the upstream job was submitted and journaled
+    while not service.journal.get("42") or not service.journal.get("42").get("upstream_id"):
+        await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    (tmp_path / "audio" / "gen_orphan.wav.part").write_bytes(b"x")
+
+    # A fresh process: same journal directory, new service
+    restarted = AudioGenerationService()
+    restarted.client = _client(mock)
+    assert restarted.reclaim_orphans() == 1
+    [job] = restarted.pending_jobs()
+    assert job["owner"] == "user" and job["phase"] == job_journal.SUBMITTED
+    meta = await restarted.resume("42")
+    assert (tmp_path / "audio" / meta["filename"]).read_bytes() == state.audio
+    assert len(state.jobs) == 1
+    assert restarted.pending_jobs() == []
+    assert list((tmp_path / "audio").glob("*.part")) == []
@@ -0,0 +1,75 @@
+import asyncio
+import io
+import struct
+import time
+import wave
+
+import pytest
+from starlette.datastructures import UploadFile
+
+from app.services.file_storage import FileStorageService, LocalStorageBackend
+from app.services.library_stats import LibraryStats, UNASSIGNED
+
+def _wav(seconds: float) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(struct.pack("<h", 0) * int(seconds * 8000))
+    return buf.getvalue()
+
+def _upload(name: str, data: bytes) -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=name)
+
+@pytest.mark.asyncio
+async def test_saves_deletes_and_generations_update_aggregates(tmp_path):
+    stats = LibraryStats(tmp_path / "stats.json")
+    storage = FileStorageService(LocalStorageBackend(tmp_path / "audio"), stats=stats)
+    first = await storage.save_file(_upload("a.wav", _wav(1)), "alice", "ambient")
+    await storage.save_file(_upload("b.wav", _wav(2)), "alice", "techno")
+    await storage.save_file(_upload("c.wav", _wav(4)), "bob", "ambient")
+    assert stats.totals["files"] == 3 and stats.totals["duration"] == pytest.approx(7)
+    assert stats.buckets["user"]["alice"]["files"] == 2
+    assert stats.buckets["genre"]["ambient"]["duration"] == pytest.approx(5)
+    await storage.delete_file(first["path"])
+    assert stats.totals["files"] == 2
+    assert stats.snapshot(genre="ambient")["by_genre"]["ambient"]["duration"] == pytest.approx(4)
+    assert stats.snapshot(user="carol")["by_user"] == {"carol": {"files": 0, "bytes": 0, "duration": 0.0}}
+    stats.generation(None, "queued")
+    stats.generation("queued", "running")
+    stats.generation("running", "completed")
+    stats.generation(None, "queued")
+    assert stats.generations == {"queued": 1, "running": 0, "completed": 1, "failed": 0}
+    # A restart reloads the aggregates; jobs still live are recounted by recovery
+    await stats.flush()
+    reloaded = LibraryStats(tmp_path / "stats.json")
+    assert await reloaded.load()
+    assert reloaded.totals == stats.totals and reloaded.buckets == stats.buckets
+    assert reloaded.generations == {"queued": 0, "running": 0, "completed": 1, "failed": 0}
+
+@pytest.mark.asyncio
+async def test_rebuild_reconciles_with_storage(tmp_path):
+    base = tmp_path / "audio"
+    (base / "dave" / "jazz" / "2024" / "05" / "01").mkdir(parents=True)
+    (base / "dave" / "jazz" / "2024" / "05" / "01" / "x.wav").write_bytes(_wav(3))
+    (base / "gen.wav").write_bytes(_wav(1))
+    (base / "gen2.wav.part").write_bytes(b"partial")
+    stats = LibraryStats(tmp_path / "stats.json")
+    stats.add("vanished.wav", 100, 5.0, time.time())
+    # Changes made while storage is being scanned survive the rebuild
+    scan = stats._scan
+    stats._scan = lambda *args: (time.sleep(0.2), scan(*args))[1]
+    assert stats.start_rebuild(base, {"running": 2})
+    assert not stats.start_rebuild(base)
+    await asyncio.sleep(0.05)
+    (base / "late.wav").write_bytes(_wav(2))
+    await stats.add_file(base, base / "late.wav")
+    stats.remove("gen.wav")
+    await stats._rebuild_task
+    assert not stats.rebuilding and stats.rebuilt_at is not None
+    assert sorted(stats._files) == ["dave/jazz/2024/05/01/x.wav", "late.wav"]
+    assert stats.totals["duration"] == pytest.approx(5)
+    assert stats.buckets["date"]["2024-05-01"]["files"] == 1
+    assert stats.buckets["user"][UNASSIGNED]["files"] == 1
+    assert stats.generations["running"] == 2
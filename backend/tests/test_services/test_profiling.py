@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.config.settings import settings
+from app.core.profiling import StackSampler, SlowRequestRecorder, LoopWatchdog
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_sampler_emits_collapsed_stacks():
+    sampler = StackSampler(interval=0.001, thread_id=threading.get_ident())
+    sampler.start()
+    _spin(0.1)
+    sampler.stop()
+    assert sampler.samples > 10
+    stack, count = sampler.counts.most_common(1)[0]
+    assert "test_sampler_emits_collapsed_stacks" in stack and stack.split(";")[-1].startswith("_spin (")
+
+def test_slow_request_keeps_profile_of_its_window():
+    recorder = SlowRequestRecorder(threshold=0.05, interval=0.001)
+    recorder.start()
+    try:
+        start = time.perf_counter()
+        _spin(0.1)
+        recorder.observe("GET", "/slow", start, time.perf_counter(), 200)
+        recorder.observe("GET", "/fast", start, start + 0.01, 200)
+    finally:
+        recorder.stop()
+    assert [r["path"] for r in recorder.records] == ["/slow"]
+    assert "_spin" in recorder.records[0]["profile"]
+
+@pytest.mark.asyncio
+async def test_watchdog_reports_blocking_task():
+    watchdog = LoopWatchdog(threshold=0.05)
+    await watchdog.start()
+    async def blocker():
+        time.sleep(0.3)
+    await asyncio.sleep(0.05)
+    await asyncio.create_task(blocker(), name="blocker")
+    await asyncio.sleep(0.1)
+    await watchdog.stop()
+    assert watchdog.stalls
+    stall = watchdog.stalls[0]
+    assert "blocker" in stall["task"]
+    assert "blocker" in stall["stack"]
+    assert stall["blocked_ms"] >= 250
+
+def test_admin_endpoints_require_api_key(client):
+    assert client.get("/api/admin/loop-stalls", headers={"X-API-Key": "wrong"}).status_code == 401
+    response = client.get("/api/admin/loop-stalls", headers={"X-API-Key": settings.API_KEY})
+    assert response.status_code == 200
+    assert "stalls" in response.json()
+    profile = client.get("/api/admin/profile", params={"seconds": 0.05}, headers={"X-API-Key": settings.API_KEY})
+    assert profile.status_code == 200
+    assert int(profile.headers["X-Profile-Samples"]) > 0
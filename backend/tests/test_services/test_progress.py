@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+from app.core.events import EventEmitter
+from app.services.progress import ProgressReporter, JobEventStreams
+
+@pytest.mark.asyncio
+async def test_progress_is_throttled_and_coalesced():
+    bus = EventEmitter()
+    received = []
+    async def listener(user_id, payload):
+        received.append(payload)
+    bus.on("generation_progress", listener)
+    reporter = ProgressReporter(7, "u1", bus=bus, max_rate=10)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for i in range(1, 101):
+        reporter.download_callback(i * 10, 1000)
+        await asyncio.sleep(0.002)
+    await reporter.close()
+    elapsed = loop.time() - started
+    # The first update goes out at once and the final state is never lost; in
+    # between, emits are at least 1/max_rate apart however slow the box is
+    assert received[0]["bytes_downloaded"] == 10
+    assert received[-1]["bytes_downloaded"] == 1000
+    assert len(received) <= elapsed * 10 + 2
+    assert received[-1]["progress"] == 1.0
+    assert all(p["id"] == 7 for p in received)
+
+@pytest.mark.asyncio
+async def test_job_streams_route_events_by_job():
+    bus = EventEmitter()
+    streams = JobEventStreams(bus)
+    queue = streams.subscribe(1)
+    await bus.emit("generation_progress", "u1", {"id": 2, "progress": 0.5})
+    await bus.emit("generation_completed", "u1", {"id": 1, "audio_url": "/a.wav"})
+    assert queue.qsize() == 1
+    assert await queue.get() == ("generation_completed", {"id": 1, "audio_url": "/a.wav"})
+    streams.unsubscribe(1, queue)
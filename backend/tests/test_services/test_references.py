@@ -0,0 +1,97 @@
+import asyncio
+import struct
+import wave
+
+import httpx
+import pytest
+
+from app.config.settings import settings
+from app.services.audio_generation import AudioGenerationService
+from app.services.references import ReferenceCache, REFERENCE_SPEC
+from app.services.stable_audio import StableAudioClient
+from app.services.transcoding import TranscodingService
+from loadtest.mock_upstream import MockConfig, create_app
+
+@pytest.fixture
+def setup(tmp_path, fake_ffmpeg):
+    transcoder = TranscodingService(tmp_path / "tc", ffmpeg=fake_ffmpeg.path)
+    mock = create_app(MockConfig(latency_ms=0, jitter_ms=0, job_seconds=0, audio_seconds=1))
+    client = StableAudioClient("key", base_url="http://mock/v1", poll_interval=0.01, transport=httpx.ASGITransport(app=mock))
+    source = tmp_path / "ref.wav"
+    # Two seconds of a constant half-scale signal, so the levels come out at -6 dBFS
+    with wave.open(str(source), "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(44100)
+        w.writeframes(struct.pack("<h", 16384) * 2 * 44100 * 2)
+    return {
+        "cache": lambda **kw: ReferenceCache(tmp_path / "refs", transcoder, **kw),
+        "client": client,
+        "uploads": mock.state.mock.references,
+        "runs": fake_ffmpeg.runs,
+        "source": source,
+        "mock": mock,
+    }
+
+@pytest.mark.asyncio
+async def test_reference_is_prepared_once(setup, tmp_path):
+    cache, client, source = setup["cache"](), setup["client"], setup["source"]
+    entries = await asyncio.gather(*(cache.prepare(source, client) for _ in range(3)))
+    assert len({e["asset_id"] for e in entries}) == 1
+    assert setup["runs"]() == 1 and len(setup["uploads"]) == 1
+    assert entries[0]["features"]["duration"] == pytest.approx(2)
+    assert entries[0]["features"]["peak_db"] == entries[0]["features"]["rms_db"] == pytest.approx(-6.02)
+    # Same content under another name, and a fresh process reading the on-disk index
+    copy = tmp_path / "copy.wav"
+    copy.write_bytes(source.read_bytes())
+    assert (await cache.prepare(copy, client))["asset_id"] == entries[0]["asset_id"]
+    assert (await setup["cache"]().prepare(source, client))["asset_id"] == entries[0]["asset_id"]
+    assert setup["runs"]() == 1 and len(setup["uploads"]) == 1
+    assert cache.misses == 1 and cache.coalesced == 2
+    # An expired upstream asset is uploaded again, reusing the cached transcode
+    refreshed = await setup["cache"](asset_ttl=0).prepare(source, client)
+    assert refreshed["asset_id"] != entries[0]["asset_id"]
+    assert setup["runs"]() == 1 and len(setup["uploads"]) == 2
+    assert REFERENCE_SPEC.sample_rate == settings.REFERENCE_SAMPLE_RATE
+
+@pytest.mark.asyncio
+async def test_generations_reuse_the_reference_asset(setup, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "JOB_JOURNAL_PATH", str(tmp_path / "jobs"))
+    service = AudioGenerationService()
+    service.client = setup["client"]
+    service.references = setup["cache"]()
+    reference = {"filename": setup["source"].name}
+    for _ in range(2):
+        await service.generate("warm pads", reference=reference)
+    jobs = setup["mock"].state.mock.jobs.values()
+    assert len({job.payload["reference_asset_id"] for job in jobs}) == 1
+    assert len(setup["uploads"]) == 1 and setup["runs"]() == 1
+
+@pytest.mark.asyncio
+async def test_expired_asset_is_uploaded_again(setup, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(settings, "JOB_JOURNAL_PATH", str(tmp_path / "jobs"))
+    service = AudioGenerationService()
+    service.client = setup["client"]
+    service.references = setup["cache"]()
+    reference = {"filename": setup["source"].name}
+    await service.generate("warm pads", reference=reference)
+    # The upstream forgets the asset before our TTL says so
+    setup["uploads"].clear()
+    await service.generate("warm pads", reference=reference)
+    assert len(setup["uploads"]) == 1 and setup["runs"]() == 1
+    assert service.references.invalidated == 1
+    # A job journaled by a previous process carries the dead id in its payload
+    dead = next(iter(setup["uploads"]))
+    setup["uploads"].clear()
+    sha256 = await service.references.transcoder.content_hash(setup["source"])
+    service.journal.create(
+        "resumed",
+        payload={"prompt": "warm pads", "reference_asset_id": dead},
+        reference={"filename": setup["source"].name, "sha256": sha256},
+        filename="gen_resumed.wav",
+    )
+    assert (tmp_path / (await service.resume("resumed"))["filename"]).exists()
+    assert len(setup["uploads"]) == 1 and setup["runs"]() == 1
+    assert service.journal.get("resumed") is None
@@ -0,0 +1,11 @@
+import pytest
+from app.services.renditions import rendition_service
+
+def test_negotiation():
+    assert rendition_service.negotiate(None, "*/*") is None
+    assert rendition_service.negotiate("original", "audio/ogg") is None
+    assert rendition_service.negotiate("preview", "*/*") == "aac"
+    assert rendition_service.negotiate("preview", "audio/webm,audio/ogg,audio/*;q=0.9") == "opus"
+    assert rendition_service.negotiate(None, "audio/ogg") == "opus"
+    with pytest.raises(ValueError):
+        rendition_service.negotiate("flac", None)
@@ -0,0 +1,39 @@
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services.stable_audio import StableAudioClient, StableAudioAPIError
+from app.utils import audio_headers
+from loadtest.mock_upstream import MockConfig, create_app
+
+def _client(config: MockConfig, **kwargs) -> StableAudioClient:
+    transport = httpx.ASGITransport(app=create_app(config))
+    return StableAudioClient("key", base_url="http://mock/v1", poll_interval=0.01, transport=transport, **kwargs)
+
+@pytest.mark.asyncio
+async def test_generate_poll_download_against_mock(tmp_path):
+    client = _client(MockConfig(latency_ms=0, jitter_ms=0, job_seconds=0.05, audio_seconds=1))
+    statuses = []
+    downloads = []
+    job_id = await client.generate_audio({"prompt": "test"})
+    status = await client.poll_status(job_id, status_callback=lambda s: statuses.append(s["status"]))
+    assert status["status"] == "completed"
+    assert statuses[0] == "processing"
+    dest = tmp_path / "out.wav"
+    await client.download_audio(status["audio_url"], str(dest), progress_callback=lambda d, t: downloads.append((d, t)))
+    assert downloads[-1][0] == downloads[-1][1] == dest.stat().st_size
+    assert audio_headers.probe(dest).duration == pytest.approx(1)
+    polls = REGISTRY.get_sample_value("upstream_request_duration_seconds_count", {"method": "GET", "endpoint": "/generate/{id}", "status": "200"})
+    assert polls >= len(statuses)
+    await client.close()
+
+@pytest.mark.asyncio
+async def test_rate_limits_are_retried_and_failures_surface():
+    client = _client(MockConfig(latency_ms=0, jitter_ms=0, rate_limit_rate=1.0), max_retries=2, backoff_factor=0)
+    with pytest.raises(StableAudioAPIError):
+        await client.generate_audio({"prompt": "test"})
+    await client.close()
+    client = _client(MockConfig(latency_ms=0, jitter_ms=0, job_seconds=0, failure_rate=1.0))
+    status = await client.poll_status(await client.generate_audio({"prompt": "test"}))
+    assert status["status"] == "failed"
+    await client.close()
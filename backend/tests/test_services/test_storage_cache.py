@@ -0,0 +1,76 @@
+import asyncio
+from pathlib import Path
+import pytest
+from app.services.file_storage import FileStorageService, LocalStorageBackend, StorageBackend
+from app.services.storage_cache import CachedStorageBackend
+
+class SlowOrigin(StorageBackend):
+    def __init__(self, files):
+        self.files = files
+        self.gets = 0
+
+    async def get(self, path: Path) -> bytes:
+        self.gets += 1
+        await asyncio.sleep(0.01)
+        return self.files[Path(path).as_posix()]
+
+    async def exists(self, path: Path) -> bool:
+        return Path(path).as_posix() in self.files
+
+    async def delete(self, path: Path) -> None:
+        self.files.pop(Path(path).as_posix(), None)
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced(tmp_path):
+    origin = SlowOrigin({"u/a.wav": b"a" * 100})
+    cache = CachedStorageBackend(origin, tmp_path)
+    results = await asyncio.gather(*(cache.get(Path("u/a.wav")) for _ in range(10)))
+    assert all(r == b"a" * 100 for r in results)
+    assert origin.gets == 1
+    assert await cache.get(Path("u/a.wav")) == b"a" * 100
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["coalesced"] == 9 and stats["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_lru_eviction_respects_size_bound(tmp_path):
+    origin = SlowOrigin({"a": b"1" * 40, "b": b"2" * 40, "c": b"3" * 40})
+    cache = CachedStorageBackend(origin, tmp_path, max_bytes=100)
+    await cache.get(Path("a"))
+    await cache.get(Path("b"))
+    await cache.get(Path("a"))  # a is now most recently used
+    await cache.get(Path("c"))
+    assert cache.stats()["evictions"] == 1
+    assert not (tmp_path / "b").exists()
+    assert (tmp_path / "a").exists() and (tmp_path / "c").exists()
+
+@pytest.mark.asyncio
+async def test_delete_drops_the_cached_copy(tmp_path):
+    origin = SlowOrigin({"new.wav": b"x" * 10})
+    cache = CachedStorageBackend(origin, tmp_path)
+    await cache.fetch(Path("new.wav"))
+    assert (tmp_path / "new.wav").exists()
+    await cache.delete(Path("new.wav"))
+    assert not (tmp_path / "new.wav").exists()
+    assert not await cache.exists(Path("new.wav"))
+
+@pytest.mark.asyncio
+async def test_objects_larger_than_the_cache_are_read_from_origin(tmp_path):
+    origin = SlowOrigin({"big.wav": b"b" * 200, "small.wav": b"s" * 10})
+    cache = CachedStorageBackend(origin, tmp_path, max_bytes=100)
+    assert await cache.get(Path("big.wav")) == b"b" * 200
+    assert await cache.fetch(Path("big.wav")) is None
+    assert await cache.get(Path("small.wav")) == b"s" * 10
+    assert not (tmp_path / "big.wav").exists()
+    assert cache.stats()["size_bytes"] == 10
+
+@pytest.mark.asyncio
+async def test_storage_service_reads_through_the_cache(tmp_path):
+    origin = LocalStorageBackend(tmp_path / "origin")
+    (tmp_path / "origin" / "u").mkdir()
+    (tmp_path / "origin" / "u" / "a.wav").write_bytes(b"a" * 10)
+    cache = CachedStorageBackend(origin, tmp_path / "cache")
+    storage = FileStorageService(cache)
+    assert await storage.local_path("u/a.wav") == tmp_path / "cache" / "u" / "a.wav"
+    assert await storage.local_path("u/a.wav") == tmp_path / "cache" / "u" / "a.wav"
+    assert await storage.local_path("u/missing.wav") is None
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from app.services.transcoding import TranscodingService, TranscodeSpec, TranscodeError
+
+@pytest.fixture
+def service(tmp_path, fake_ffmpeg):
+    svc = TranscodingService(tmp_path / "cache", max_bytes=25_000, ffmpeg=fake_ffmpeg.path)
+    svc.runs = fake_ffmpeg.runs
+    return svc
+
+@pytest.mark.asyncio
+async def test_concurrent_transcodes_run_once_and_are_cached(service, tmp_path):
+    source = tmp_path / "a.wav"
+    source.write_bytes(bytes(range(256)) * 40)
+    spec = TranscodeSpec("mp3", bitrate="128k")
+    paths = await asyncio.gather(*(service.transcode(source, spec) for _ in range(4)))
+    assert len(set(paths)) == 1 and paths[0].read_bytes() == source.read_bytes()
+    assert service.runs() == 1
+    # Same content under another name hits the cache
+    copy = tmp_path / "copy.wav"
+    copy.write_bytes(source.read_bytes())
+    assert await service.transcode(copy, spec) == paths[0]
+    assert service.runs() == 1
+    assert service.stats()["hits"] == 1
+    # A different spec is a different output
+    await service.transcode(source, TranscodeSpec("mp3", bitrate="128k", normalize=True))
+    assert service.runs() == 2
+
+@pytest.mark.asyncio
+async def test_stream_while_encoding(service, tmp_path):
+    source = tmp_path / "b.wav"
+    source.write_bytes(b"x" * 10_000)
+    spec = TranscodeSpec("opus", bitrate="64k")
+    async def collect():
+        return b"".join([chunk async for chunk in service.stream(source, spec, chunk_size=500)])
+    first, second = await asyncio.gather(collect(), collect())
+    assert first == second == source.read_bytes()
+    assert service.runs() == 1
+    assert await service.cached(source, spec) is not None
+
+@pytest.mark.asyncio
+async def test_failed_encode_raises_and_leaves_no_cache_entry(service, tmp_path):
+    source = tmp_path / "bad.wav"
+    source.write_bytes(b"junk")
+    with pytest.raises(TranscodeError, match="corrupt input"):
+        await service.transcode(source, TranscodeSpec("flac"))
+    assert list((tmp_path / "cache").iterdir()) == []
+
+@pytest.mark.asyncio
+async def test_cache_is_size_bounded(service, tmp_path):
+    for i in range(4):
+        source = tmp_path / f"s{i}.wav"
+        source.write_bytes(bytes([i]) * 10_000)
+        await service.transcode(source, TranscodeSpec("wav"))
+    assert service.stats()["size_bytes"] <= 25_000
+    assert len(list((tmp_path / "cache").iterdir())) == 2
+
+@pytest.mark.asyncio
+async def test_stream_survives_job_finishing_before_open(service, tmp_path, monkeypatch):
+    import aiofiles
+    source = tmp_path / "c.wav"
+    source.write_bytes(b"z" * 3000)
+    spec = TranscodeSpec("flac")
+    real_open = aiofiles.open
+    async def delayed(path, *args, **kwargs):
+        await asyncio.sleep(0.5)
+        return await real_open(path, *args, **kwargs)
+    def late_open(path, mode="r", *args, **kwargs):
+        # The encode publishes (or removes) its .part before the reader gets to it
+        if str(path).endswith(".part") and mode == "rb":
+            return delayed(path, mode, *args, **kwargs)
+        return real_open(path, mode, *args, **kwargs)
+    monkeypatch.setattr(aiofiles, "open", late_open)
+    assert b"".join([chunk async for chunk in service.stream(source, spec)]) == source.read_bytes()
+    bad = tmp_path / "bad.wav"
+    bad.write_bytes(b"z" * 100)
+    with pytest.raises(TranscodeError):
+        async for _ in service.stream(bad, spec):
+            pass
+
+@pytest.mark.asyncio
+async def test_index_keeps_other_processes_partials(tmp_path):
+    import os, time
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    (cache / "done.mp3").write_bytes(b"1" * 10)
+    (cache / ".k1.mp3.999999.part").write_bytes(b"in flight elsewhere")
+    stale = cache / ".k2.mp3.999998.part"
+    stale.write_bytes(b"abandoned")
+    os.utime(stale, (time.time() - 3600, time.time() - 3600))
+    (cache / f".k3.mp3.{os.getpid()}.part").write_bytes(b"ours")
+    svc = TranscodingService(cache)
+    await svc.load_index()
+    assert sorted(p.name for p in cache.iterdir()) == [".k1.mp3.999999.part", "done.mp3"]
+    assert svc.stats()["entries"] == 1
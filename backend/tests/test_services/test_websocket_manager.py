@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from app.services.websocket_manager import WebSocketManager, DISCONNECT
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_block_broadcast():
+    manager = WebSocketManager(heartbeat_interval=0)
+    fast, slow = FakeWebSocket(), FakeWebSocket(delay=10)
+    await manager.connect("a", fast)
+    await manager.connect("b", slow)
+    await asyncio.wait_for(manager.broadcast({"type": "queue_updated", "position": 1}), 0.1)
+    await asyncio.sleep(0.01)
+    assert fast.sent == ['{"type":"queue_updated","position":1}']
+    assert slow.sent == []
+    await manager.cleanup()
+
+@pytest.mark.asyncio
+async def test_progress_updates_are_coalesced_per_job():
+    manager = WebSocketManager(heartbeat_interval=0)
+    ws = FakeWebSocket(delay=0.05)
+    await manager.connect("u", ws)
+    for i in range(5):
+        await manager.send_personal_message("u", {"type": "generation_progress", "id": 1, "progress": i})
+    await manager.send_personal_message("u", {"type": "generation_progress", "id": 2, "progress": 0})
+    await asyncio.sleep(0.3)
+    # Queued updates collapse to the latest one per job
+    assert len(ws.sent) == 2
+    assert '"progress":4' in ws.sent[0]
+    await manager.cleanup()
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_drops_overflowing_client():
+    manager = WebSocketManager(max_queue_size=2, slow_consumer_policy=DISCONNECT, heartbeat_interval=0)
+    ws = FakeWebSocket(delay=10)
+    await manager.connect("u", ws)
+    for i in range(5):
+        await manager.broadcast({"type": "queue_updated", "position": i})
+    await asyncio.sleep(0.01)
+    assert manager.connection_count() == 0
+    assert ws.closed_with == 1008
+
+@pytest.mark.asyncio
+async def test_heartbeat_drops_peer_that_never_answers():
+    # Our own pings are delivered fine, but only inbound messages count as liveness
+    manager = WebSocketManager(heartbeat_interval=0.02, heartbeat_timeout=0.1)
+    silent, alive = FakeWebSocket(), FakeWebSocket()
+    await manager.connect("silent", silent)
+    await manager.connect("alive", alive)
+    for _ in range(10):
+        await asyncio.sleep(0.02)
+        manager.touch(alive, "alive")
+    assert silent.sent and silent.closed_with == 1011
+    assert manager.connection_count() == 1 and alive.closed_with is None
+    await manager.cleanup()
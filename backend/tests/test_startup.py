@@ -0,0 +1,13 @@
+import os
+
+from benchmarks.importtime import measure
+
+# Generous enough for a loaded CI box; currently ~0.5s on a laptop. Override with IMPORT_BUDGET_MS.
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 1500))
+# Loaded on first use only; importing any of these at startup is a regression
+LAZY_MODULES = ("pydub", "magic", "audioread", "sqlalchemy", "uvicorn")
+
+def test_app_import_is_lean():
+    times = measure("app.main")
+    assert [m for m in LAZY_MODULES if m in times] == []
+    assert times["app.main"] / 1000 < IMPORT_BUDGET_MS
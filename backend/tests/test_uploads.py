@@ -0,0 +1,83 @@
+import base64
+import hashlib
+
+import pytest
+from fastapi import HTTPException
+
+from app.config.settings import settings
+from app.services.uploads import upload_service
+from benchmarks.corpus import make_wav
+
+def _create(client, data: bytes, filename: str = "ref.wav"):
+    meta = "filename " + base64.b64encode(filename.encode()).decode()
+    resp = client.post("/api/uploads", headers={"Upload-Length": str(len(data)), "Upload-Metadata": meta})
+    assert resp.status_code == 201
+    assert resp.headers["Location"] == f"/api/uploads/{resp.json()['id']}"
+    return resp.headers["Location"]
+
+def _patch(client, url: str, offset: int, chunk: bytes, **headers):
+    return client.patch(url, content=chunk, headers={"Upload-Offset": str(offset), "Content-Type": "application/offset+octet-stream", **headers})
+
+def test_resumable_upload_roundtrip(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_PATH", str(tmp_path))
+    data = make_wav(2)
+    url = _create(client, data)
+    half = len(data) // 2
+    resp = _patch(client, url, 0, data[:half])
+    assert resp.status_code == 204 and resp.headers["Upload-Offset"] == str(half)
+    # Wrong offset: told where to continue from
+    resp = _patch(client, url, 0, data[:10])
+    assert resp.status_code == 409 and resp.headers["Upload-Offset"] == str(half)
+    # Corrupted chunk is rejected and rolled back
+    bad = "sha256 " + base64.b64encode(hashlib.sha256(b"other").digest()).decode()
+    assert _patch(client, url, half, data[half:], **{"Upload-Checksum": bad}).status_code == 460
+    assert client.head(url).headers["Upload-Offset"] == str(half)
+    # The running hash is lost on restart and rebuilt from disk
+    upload_service._hashers.clear()
+    good = "sha256 " + base64.b64encode(hashlib.sha256(data[half:]).digest()).decode()
+    assert _patch(client, url, half, data[half:], **{"Upload-Checksum": good}).status_code == 204
+    resp = client.post(f"{url}/finalize", params={"sha256": hashlib.sha256(data).hexdigest()})
+    assert resp.status_code == 200
+    audio = resp.json()
+    assert audio["size"] == len(data) and audio["duration"] == 2.0
+    assert (tmp_path / audio["filename"]).read_bytes() == data
+    assert client.head(url).status_code == 404
+
+def test_incomplete_or_invalid_uploads_are_rejected(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_PATH", str(tmp_path))
+    url = _create(client, b"x" * 100)
+    assert _patch(client, url, 0, b"x" * 50).status_code == 204
+    assert client.post(f"{url}/finalize").status_code == 409
+    assert _patch(client, url, 50, b"x" * 51).status_code == 413
+    assert _patch(client, url, 50, b"x" * 50).status_code == 204
+    assert client.post(f"{url}/finalize").status_code == 415
+    assert list(tmp_path.iterdir()) == []
+    url = _create(client, b"x" * 10)
+    assert client.delete(url).status_code == 204
+    assert client.head(url).status_code == 404
+    resp = client.post("/api/uploads", headers={"Upload-Length": str(settings.UPLOAD_MAX_BYTES + 1)})
+    assert resp.status_code == 413
+
+@pytest.mark.asyncio
+async def test_checksummed_chunk_rolls_back_on_any_error():
+    upload = upload_service.create(100)
+    good = "sha256 " + base64.b64encode(hashlib.sha256(b"x" * 60).digest()).decode()
+    async def chunks():
+        # Half the chunk lands on disk before the rest runs past Upload-Length
+        yield b"x" * 60
+        yield b"x" * 60
+    with pytest.raises(HTTPException) as e:
+        await upload_service.append(upload["id"], 0, chunks(), good)
+    assert e.value.status_code == 413
+    assert upload_service.get(upload["id"])["offset"] == 0
+    assert upload_service._hashers[upload["id"]][0] == 0
+    upload_service.remove(upload["id"])
+
+def test_single_request_reference_upload(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_STORAGE_PATH", str(tmp_path))
+    data = make_wav(1)
+    resp = client.post("/api/upload", files={"file": ("../my ref.wav", data, "audio/wav")})
+    assert resp.status_code == 200
+    filename = resp.json()["filename"]
+    assert filename.startswith("ref_") and filename.endswith("_myref.wav")
+    assert (tmp_path / filename).read_bytes() == data
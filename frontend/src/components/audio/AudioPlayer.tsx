@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import Waveform from './Waveform';
 import { useAudioPlayer } from '../../hooks/useAudioPlayer';
-import { fetchAudioBuffer } from '../../utils/audio';
+import { fetchAudioBuffer, previewUrl } from '../../utils/audio';
 import clsx from 'clsx';
 
 interface AudioPlayerProps {
@@ -15,20 +15,22 @@ const AudioPlayer: React.FC<AudioPlayerProps> = ({ src, title, className }) => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [zoom, setZoom] = useState(1);
+  // Stream and decode the compressed preview instead of downloading the full WAV
+  const playbackSrc = previewUrl(src);
 
   const {
     play, pause, seek, setPlayerVolume, setSpeed,
     playing, currentTime, duration, volume, audioRef
-  } = useAudioPlayer({ src });
+  } = useAudioPlayer({ src: playbackSrc });
 
   useEffect(() => {
     let ctx: AudioContext | null = null;
     setLoading(true);
-    fetchAudioBuffer((ctx = new window.AudioContext()), src)
+    fetchAudioBuffer((ctx = new window.AudioContext()), playbackSrc)
       .then(buf => { setBuffer(buf); setLoading(false); })
       .catch(e => { setError('Failed to load audio'); setLoading(false); })
       .finally(() => ctx && ctx.close());
-  }, [src]);
+  }, [playbackSrc]);
 
   const handleSeek = (t: number) => {
     seek(t);
@@ -23,6 +23,10 @@ export interface GenerationProgressMessage extends WebSocketMessageBase {
   progress: number;
   stage: string;
   eta: number;
+  position_in_queue?: number;
+  upstream_status?: string;
+  bytes_downloaded?: number;
+  bytes_total?: number | null;
 }
 export interface GenerationCompletedMessage extends WebSocketMessageBase {
   type: 'generation_completed';
@@ -102,6 +106,11 @@ export class WebSocketClient {
     this.ws.onmessage = (event) => {
       try {
         const data = JSON.parse(event.data);
+        // Server heartbeat: answer so the connection isn't reaped as dead
+        if (data.type === 'ping') {
+          this.ws?.send(JSON.stringify({ type: 'pong' }));
+          return;
+        }
         this.onMessage(data);
       } catch (e) {
         // Ignore malformed
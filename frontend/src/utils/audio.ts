@@ -6,6 +6,15 @@ export async function fetchAudioBuffer(context: AudioContext, url: string): Prom
   return await context.decodeAudioData(arrayBuffer);
 }
 
+// Generated tracks are stored as raw WAV under /static/audio; the API serves a
+// low-bitrate preview rendition of the same file for playback and waveforms.
+export function previewUrl(src: string): string {
+  const match = src.match(/\/static\/audio\/([^/?#]+)$/);
+  if (!match) return src;
+  const apiUrl = import.meta.env.VITE_API_URL || '/api';
+  return `${apiUrl}/audio/${match[1]}?rendition=preview`;
+}
+
 export function getPeaks(buffer: AudioBuffer, samples = 1000): number[] {
   const channel = buffer.getChannelData(0);
   const blockSize = Math.floor(channel.length / samples);